@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 
-import copy
 import random
+import numpy as np
 import matplotlib.pyplot as plt
 
 # On importe les modules du modèle
@@ -10,12 +10,16 @@ import Plant_def as Pl
 import Environnement_def as Ev
 import time_loop as Ti
 import history_def as Hi
+import state_clone as Sc
+import sweep_journal as Sj
 
 def run_simulation_with_modified_env(
     species_name="Ble",
     water_initial=None, 
     base_temp=None, 
-    base_light=None
+    base_light=None,
+    seed=None,
+    antithetic=False
 ):
     """
     Lance une simulation en modifiant l'environnement initial
@@ -26,21 +30,33 @@ def run_simulation_with_modified_env(
     - water_initial : quantité d'eau initiale dans le sol (en g)
     - base_temp     : température moyenne annuelle (°C)
     - base_light    : luminosité max en été (W/m² ou autre)
+    - seed          : graine de la météo aléatoire (même graine => mêmes
+                      perturbations, quel que soit le paramètre modifié) ;
+                      l'état du générateur est restauré après la simulation
+    - antithetic    : si True, perturbations météo miroir (u -> 1 - u) de
+                      celles de la même graine
     """
-    # Sauvegarde l’environnement et la plante initiaux
-    original_env   = copy.deepcopy(Ev.Environment)
-    original_plant = copy.deepcopy(Pl.Plant)
-    original_history = copy.deepcopy(Hi.history)
-
-    # Réinitialise l’historique
-    for k in Hi.history:
-        Hi.history[k].clear()
-    
-    Pl.set_plant_species(Pl.Plant, species_name, Pl.species_db)
+    # Sauvegarde l’environnement et la plante initiaux (la simulation
+    # travaille sur des clones : les originaux ne sont pas modifiés)
+    original_env   = Ev.Environment
+    original_plant = Pl.Plant
+    # L'historique de l'appelant est mis de côté, jamais copié : la
+    # simulation écrit dans un historique vide
+    original_history = Hi.history
+    original_recording = Hi.recording_settings()
+    Hi.history = {key: [] for key in original_history}
+
+    # Seul l'état final est utilisé : profil d'enregistrement minimal
+    # (réinitialise aussi l'historique)
+    Hi.set_recording_profile("subset", keys=[], day_night=False)
 
     # Copie locale
-    local_env   = copy.deepcopy(Ev.Environment)
-    local_plant = copy.deepcopy(Pl.Plant)
+    local_env   = Sc.clone_environment(Ev.Environment)
+    local_plant = Sc.clone_plant(Pl.Plant)
+    Pl.set_plant_species(local_plant, species_name, Pl.species_db)
+    # set_plant_species référence les tables de species_db : second clone
+    # pour que la simulation ne les modifie pas
+    local_plant = Sc.clone_plant(local_plant)
 
     # Applique les changements d'environnement si demandés
     if water_initial is not None:
@@ -50,27 +66,58 @@ def run_simulation_with_modified_env(
         local_env["base_temp"] = base_temp
     if base_light is not None:
         local_env["base_light"] = base_light
+    local_env["antithetic"] = antithetic
 
     # Écrase l’environnement global par notre version locale
     Ev.Environment = local_env
     Pl.Plant       = local_plant
 
-    # Lance la simulation
-    result_history, final_plant, final_env = Ti.run_simulation_collect_data(Gl.max_cycles)
+    # Lance la simulation (météo reproductible si une graine est donnée)
+    random_state = random.getstate()
+    if seed is not None:
+        random.seed(seed)
+    try:
+        result_history, final_plant, final_env = Ti.run_simulation_collect_data(Gl.max_cycles)
+    finally:
+        if seed is not None:
+            random.setstate(random_state)
 
     # Restaure l’état initial global pour ne pas perturber les tests suivants
     Ev.Environment = original_env
     Pl.Plant       = original_plant
+    Hi.set_recording_profile(**original_recording)
     Hi.history     = original_history
 
     return final_plant, final_env
 
 
+def replicate_weather(nb_rep, seed=None, antithetic=False):
+    """
+    Réalisations météo des nb_rep répétitions : liste de (graine, antithétique).
+
+    - seed=None : météo tirée à nouveau à chaque simulation (graine None)
+    - seed=s    : répétition k -> graine s + k, réutilisée pour toutes les
+                  valeurs du gradient (nombres aléatoires communs)
+    - antithetic=True : les répétitions vont par paires (graine s + k//2,
+                  normale puis miroir) ; nb_rep doit être pair
+    """
+    if seed is None:
+        return [(None, False)] * nb_rep
+    if antithetic:
+        if nb_rep % 2:
+            raise ValueError("nb_rep doit être pair avec antithetic=True")
+        return [(seed + k // 2, k % 2 == 1) for k in range(nb_rep)]
+    return [(seed + k, False) for k in range(nb_rep)]
+
+
 def run_replicates_for_gradient(
     param_values,
     nb_rep=5,
-    species_names = "Ble",
-    mode="water"
+    species_name="Ble",
+    mode="water",
+    seed=None,
+    antithetic=False,
+    journal=None
 ):
     """
     Pour un certain gradient (liste de valeurs de paramètre),
@@ -79,9 +126,21 @@ def run_replicates_for_gradient(
     - la nécromasse min/mean/max
     - la biomasse de repro min/mean/max
 
+    Avec une graine (seed), la répétition k utilise la même météo à toutes
+    les valeurs du gradient (replicate_weather) : les écarts entre deux
+    valeurs ne contiennent plus le bruit météo, et gradient_effects les
+    estime avec beaucoup moins de répétitions. antithetic=True ajoute, pour
+    chaque graine, la réalisation miroir des perturbations météo.
+
     :param param_values: liste de valeurs du gradient (eau, T, lumière)
     :param nb_rep: nombre de répétitions par valeur
     :param mode: "water", "temp", ou "light" pour savoir quel paramètre on modifie
+    :param seed: graine de la première répétition (None : météo non reproductible)
+    :param antithetic: paires antithétiques de répétitions (nb_rep pair)
+    :param journal: fichier journal (sweep_journal) ; chaque simulation
+                    terminée y est enregistrée, et une relance avec le même
+                    fichier saute les simulations déjà faites (exige une
+                    graine : une météo non reproductible ne se rejoue pas)
 
     Retourne:
     ---------
@@ -92,9 +151,39 @@ def run_replicates_for_gradient(
       "necromass_max": [...],
       "repro_min": [...],
       "repro_mean": [...],
-      "repro_max": [...]
+      "repro_max": [...],
+      "necromass_values": [[...], ...] (valeurs par répétition),
+      "repro_values": [[...], ...],
+      "weather": [(graine, antithétique), ...]
     }
     """
+    if mode not in ("water", "temp", "light"):
+        raise ValueError("Mode inconnu !")
+    if journal is not None and seed is None:
+        raise ValueError("run_replicates_for_gradient : un journal exige une "
+                         "graine (seed), sinon les répétitions ne sont pas "
+                         "reproductibles")
+    weather = replicate_weather(nb_rep, seed, antithetic)
+    sweep = (Sj.SweepJournal(journal, {"function": "run_replicates_for_gradient",
+                                       "max_cycles": Gl.max_cycles,
+                                       "seed": seed})
+             if journal is not None else None)
+
+    def simulate(val, rep_seed, rep_antithetic):
+        if mode=="water":
+            final_plant, _ = run_simulation_with_modified_env(water_initial=val, species_name=species_name,
+                                                              seed=rep_seed, antithetic=rep_antithetic)
+        elif mode=="temp":
+            final_plant, _ = run_simulation_with_modified_env(base_temp=val, species_name=species_name,
+                                                              seed=rep_seed, antithetic=rep_antithetic)
+        else:
+            final_plant, _ = run_simulation_with_modified_env(base_light=val, species_name=species_name,
+                                                              seed=rep_seed, antithetic=rep_antithetic)
+        return {"necromass": final_plant["biomass"]["necromass"],
+                "repro": final_plant["biomass"]["repro"]}
+
+    necro_values_list = []
+    repro_values_list = []
     necro_min_list = []
     necro_mean_list = []
     necro_max_list = []
@@ -106,18 +195,17 @@ def run_replicates_for_gradient(
         necro_vals = []
         repro_vals = []
 
-        for _ in range(nb_rep):
-            if mode=="water":
-                final_plant, _ = run_simulation_with_modified_env(water_initial=val, species_names=species_names)
-            elif mode=="temp":
-                final_plant, _ = run_simulation_with_modified_env(base_temp=val, species_names=species_names)
-            elif mode=="light":
-                final_plant, _ = run_simulation_with_modified_env(base_light=val, species_names=species_names)
+        for k, (rep_seed, rep_antithetic) in enumerate(weather):
+            if sweep is None:
+                result = simulate(val, rep_seed, rep_antithetic)
             else:
-                raise ValueError("Mode inconnu !")
+                # Simulation déjà journalisée : résultat relu, pas relancée
+                key = Sj.run_key(species=species_name, mode=mode, value=val, rep=k,
+                                 seed=rep_seed, antithetic=rep_antithetic)
+                result = sweep.run(key, simulate, val, rep_seed, rep_antithetic)
 
-            necro_vals.append(final_plant["biomass"]["necromass"])
-            repro_vals.append(final_plant["biomass"]["repro"])
+            necro_vals.append(result["necromass"])
+            repro_vals.append(result["repro"])
 
         # Calcul min/mean/max
         necro_min = min(necro_vals)
@@ -136,6 +224,12 @@ def run_replicates_for_gradient(
         repro_mean_list.append(repro_mean)
         repro_max_list.append(repro_max)
 
+        necro_values_list.append(necro_vals)
+        repro_values_list.append(repro_vals)
+
+    if sweep is not None:
+        sweep.close()
+
     return {
         "x_values": param_values,
         "necromass_min": necro_min_list,
@@ -143,11 +237,53 @@ def run_replicates_for_gradient(
         "necromass_max": necro_max_list,
         "repro_min": repro_min_list,
         "repro_mean": repro_mean_list,
-        "repro_max": repro_max_list
+        "repro_max": repro_max_list,
+        "necromass_values": necro_values_list,
+        "repro_values": repro_values_list,
+        "weather": weather
     }
 
 
-def test_3_gradients_nb_rep(species_name, nb_rep=5):
+def gradient_effects(stats, output="repro"):
+    """
+    Effet moyen du passage d'une valeur du gradient à la suivante, et son
+    erreur standard, à partir des répétitions de run_replicates_for_gradient.
+
+    Avec une météo commune (seed), les différences sont appariées par
+    répétition (une paire antithétique compte pour une seule unité,
+    moyenne de ses deux membres) ; sinon les deux valeurs sont traitées
+    comme des échantillons indépendants.
+
+    Retourne:
+    ---------
+    {"x_from": [...], "x_to": [...], "effect": [...], "std_err": [...]}
+    """
+    values = np.array(stats[output + "_values"], dtype=float)
+    weather = stats["weather"]
+    paired = weather[0][0] is not None
+    if paired and any(anti for _, anti in weather):
+        # Moyenne de chaque paire antithétique
+        values = 0.5 * (values[:, 0::2] + values[:, 1::2])
+
+    effects = {"x_from": [], "x_to": [], "effect": [], "std_err": []}
+    for i in range(len(values) - 1):
+        a, b = values[i], values[i + 1]
+        n = len(a)
+        if paired:
+            diff = b - a
+            std_err = diff.std(ddof=1) / np.sqrt(n) if n > 1 else np.nan
+        else:
+            std_err = (np.sqrt(a.var(ddof=1) / n + b.var(ddof=1) / n)
+                       if n > 1 else np.nan)
+        effects["x_from"].append(stats["x_values"][i])
+        effects["x_to"].append(stats["x_values"][i + 1])
+        effects["effect"].append(float(b.mean() - a.mean()))
+        effects["std_err"].append(float(std_err))
+    return effects
+
+
+def test_3_gradients_nb_rep(species_name, nb_rep=5, seed=None, antithetic=False,
+                            journal=None):
     """
     Fait varier 3 gradients :
      1) Eau initiale
@@ -155,6 +291,10 @@ def test_3_gradients_nb_rep(species_name, nb_rep=5):
      3) Lumière max
     et fait nb_rep répétitions par valeur du gradient,
     puis affiche le tout dans UNE seule figure (3 subplots).
+    seed / antithetic : météo commune aux valeurs du gradient
+    (voir run_replicates_for_gradient).
+    journal : fichier journal partagé par les 3 gradients (reprise d'un
+    balayage interrompu, voir run_replicates_for_gradient).
     """
     # 1. Définition des gradients
     water_values = [1e5,2e5,3e5,4e5,5e5, 1e6, 2e6]
@@ -162,9 +302,12 @@ def test_3_gradients_nb_rep(species_name, nb_rep=5):
     light_values = [100,200,400, 600, 800, 1000, 1200, 1500]
 
     # 2. Récupère les stats min/mean/max
-    water_stats = run_replicates_for_gradient(water_values, nb_rep=nb_rep,species_name=species_name, mode="water")
-    temp_stats  = run_replicates_for_gradient(temp_values,  nb_rep=nb_rep,species_name=species_name, mode="temp")
-    light_stats = run_replicates_for_gradient(light_values, nb_rep=nb_rep,species_name=species_name, mode="light")
+    water_stats = run_replicates_for_gradient(water_values, nb_rep=nb_rep,species_name=species_name, mode="water",
+                                              seed=seed, antithetic=antithetic, journal=journal)
+    temp_stats  = run_replicates_for_gradient(temp_values,  nb_rep=nb_rep,species_name=species_name, mode="temp",
+                                              seed=seed, antithetic=antithetic, journal=journal)
+    light_stats = run_replicates_for_gradient(light_values, nb_rep=nb_rep,species_name=species_name, mode="light",
+                                              seed=seed, antithetic=antithetic, journal=journal)
 
     # 3. Création de la figure et des 3 sous‐graphes
     fig, axes = plt.subplots(nrows=1, ncols=3, figsize=(18, 5))
@@ -45,6 +45,23 @@ Environment = {
 }
 
 
+# Parameters that fully determine the synthetic weather (with the random seed)
+CLIMATE_PARAMS = [
+    "day_temp_amplitude",
+    "seasonal_temp_offset",
+    "base_temp",
+    "base_light",
+    "seasonal_light_var",
+    "precipitation_base",
+    "seasonal_rain_var",
+    "random_factor",
+    "soil_volume",
+]
+
+# Order of the hourly forcing variables (see synthetic_forcing / apply_forcing)
+FORCING_COLUMNS = ("temperature", "light", "rain", "Co2", "RH", "wind")
+
+
 # ---------------------------------------------------------------------------
 # Main function: update_environment
 # ---------------------------------------------------------------------------
@@ -61,6 +78,24 @@ def update_environment(time, Env):
     - simple sinusoidal patterns for temperature, light, precipitation
     - single location with temperate climate
     """
+    apply_forcing(Env, synthetic_forcing(time, Env))
+
+
+def synthetic_forcing(time, Env):
+    """
+    Computes the synthetic weather of hour 'time' from the climate parameters
+    of Env, without modifying Env.
+
+    With Env["antithetic"] set, every random perturbation u is replaced by
+    1 - u (weather_uniform): with the same seed, the run sees the mirror
+    image of the weather noise of the plain run (antithetic pair).
+
+    Returns
+    -------
+    tuple
+        Values in FORCING_COLUMNS order: air temperature (°C), light (W/m²),
+        rain added to the soil (g), CO2 (ppm), RH (0..1), wind (m/s).
+    """
     # Convert time in hours to day index and hour of day
     day_index = time // Gl.ave_day
     hour_in_day = time % Gl.ave_day
@@ -108,46 +143,60 @@ def update_environment(time, Env):
     if hour_in_day == 6:
         daily_rain_mean = Env["precipitation_base"] * precipitation_season_factor
         # random_factor => ± 30% of the mean
-        daily_rain = daily_rain_mean * (1.0 + Env["random_factor"] * (2.0 * random.random() - 1.0))
+        daily_rain = daily_rain_mean * (1.0 + Env["random_factor"] * (2.0 * weather_uniform(Env) - 1.0))
 
         # Convert from mm to grams of water, using soil_volume
         # 1 mm = 1 L/m² => for a certain area, we interpret it as:
         # daily_rain [mm] * 1000 * soil_volume [m³]
         # Simplified approach
-        water_max = (Env["soil_volume"] * 1000.0 * 1000.0) * 0.8
         added_water = daily_rain * 1000.0 * Env["soil_volume"]
-
-        if Env["soil"]["water"] < water_max:
-            Env["soil"]["water"] += added_water
-        Env["rain_event"] = added_water
     else:
-        Env["rain_event"] = 0.0
+        added_water = 0.0
 
     # -----------------------------
     # Random fluctuations on T and light
     # -----------------------------
-    rand_temp = 1.0 + Env["random_factor"] * (2.0 * random.random() - 1.0)
-    rand_light = 1.0 + 0.2 * Env["random_factor"] * (2.0 * random.random() - 1.0)
+    rand_temp = 1.0 + Env["random_factor"] * (2.0 * weather_uniform(Env) - 1.0)
+    rand_light = 1.0 + 0.2 * Env["random_factor"] * (2.0 * weather_uniform(Env) - 1.0)
 
     T_final = T_daily * rand_temp
     light_final = raw_light * rand_light
 
-    # Store results back into the environment dictionary
-    Env["atmos"]["temperature"] = T_final
-    Env["atmos"]["light"] = max(0.0, light_final)
+    # CO2 availability (~400 to 410 ppm, a minor sinus variation)
+    co2 = 400.0 + 10.0 * math.sin(time / 10.0)
+
+    return (T_final, max(0.0, light_final), added_water, co2,
+            Env["atmos"]["RH"], Env["atmos"]["wind"])
+
 
-    # Update CO2 availability
-    co2_availability(time, Env)
+def weather_uniform(Env):
+    """
+    Uniform random number of the weather perturbations: u from the global
+    generator, or 1 - u when Env["antithetic"] is set.
+    """
+    u = random.random()
+    if Env.get("antithetic", False):
+        return 1.0 - u
+    return u
 
 
-def co2_availability(time, Env):
+def apply_forcing(Env, row):
     """
-    Manages CO2 fluctuations (approx. ~400 to 410 ppm).
-    A small sine or random wave can be introduced.
+    Stores one hour of forcing (values in FORCING_COLUMNS order, e.g. a row of
+    a forcing store) into Env, and adds the rain to the soil water.
     """
-    base_co2 = 400.0
-    fluctuation = 10.0 * math.sin(time / 10.0)  # a minor sinus variation
-    Env["atmos"]["Co2"] = base_co2 + fluctuation
+    Env["atmos"]["temperature"] = row[0]
+    Env["atmos"]["light"] = row[1]
+    Env["atmos"]["Co2"] = row[3]
+    Env["atmos"]["RH"] = row[4]
+    Env["atmos"]["wind"] = row[5]
+
+    added_water = row[2]
+    if added_water != 0.0:
+        water_max = (Env["soil_volume"] * 1000.0 * 1000.0) * 0.8
+        if Env["soil"]["water"] < water_max:
+            Env["soil"]["water"] += added_water
+    Env["rain_event"] = added_water
 
 
 def calc_daily_photoperiod(day_of_year):
@@ -66,6 +66,10 @@ def set_plant_species(Plant, species_name, species_db):
     Plant["biomass_total"] = params["biomass_total"]
 
     # Once parameters are set, allocate the total biomass to subcompartments
+    # (replacing any previous allocation, e.g. when a pool worker sets the
+    # species of a Plant inherited from its parent)
+    for bf in Gl.biomass_function:
+        Plant["biomass"][bf] = 0.0
     Fu.allocate_biomass(Plant, Plant["biomass_total"])
 
 
@@ -0,0 +1,319 @@
+# calib_ABC.py
+"""
+Approximate Bayesian Computation (ABC-SMC) calibration of Plantroid
+parameters against observed trajectories.
+
+Observations are daily values of biomass_total and biomass_repro on some
+days, and the days on which phenology stages are first entered. A run is
+summarised with the "daily" recording profile (mean of each day, last
+stage of the day) and compared with the observations by 'distance'.
+
+The sampler follows Beaumont et al. (2009) / Toni et al. (2009):
+generation 0 draws particles from the prior (uniform in the normalised,
+log-scaled parameter space of optim_CMAES); each later generation lowers the
+tolerance to a quantile of the previous distances, proposes particles by
+perturbing the previous population with a Gaussian kernel (twice the
+weighted covariance), simulates them in batches (optionally on a process
+pool) and keeps those within the tolerance, weighted by
+prior / sum_j w_j K(theta | theta_j). The run stops at the simulation budget,
+at the minimal tolerance, or when the acceptance rate becomes too low.
+
+All comments in English, while variable/function names follow the project.
+"""
+
+import numpy as np
+
+import Plant_def as Pl
+import history_def as Hi
+import optim_GA as Ga
+import optim_CMAES as Cm
+
+# Compared daily series
+SERIES = ("biomass_total", "biomass_repro")
+
+# Recording of the calibration runs: daily means of the compared series and
+# last phenology stage of each day
+RECORDING = {"profile": "daily", "keys": list(SERIES) + ["phenology_stage"],
+             "day_night": False}
+
+
+def stage_transitions(stages):
+    """
+    First day (1-based) on which each stage is entered, from the stage of
+    every day (the initial stage is not a transition).
+    """
+    transitions = {}
+    for day in range(1, len(stages)):
+        stage = stages[day]
+        if stage != stages[day - 1] and stage not in transitions:
+            transitions[stage] = day + 1
+    return transitions
+
+
+def simulate(parameters, n_hours=None, settings=None, seed=None):
+    """
+    Runs the model with 'parameters' (optim_GA.run_individual) and returns
+    its summary: the daily series of SERIES and the stage transitions.
+    """
+    saved_recording = Hi.recording_settings()
+    Hi.set_recording_profile(**RECORDING)
+    try:
+        Ga.run_individual(parameters, n_hours, settings, seed)
+        summary = {key: list(Hi.daily["mean"].get(key, [])) for key in SERIES}
+        summary["transitions"] = stage_transitions(
+            Hi.daily["mean"].get("phenology_stage", []))
+    finally:
+        Hi.set_recording_profile(**saved_recording)
+    return summary
+
+
+def distance(simulated, observed, day_scale=10.0, missing_days=None):
+    """
+    Distance between a run summary and the observations: mean of
+    - for each observed series, the RMSE over the observation days divided
+      by the mean absolute observed value (days after the death of the plant
+      count as 0 biomass);
+    - if transitions are observed, the mean absolute error on their days
+      divided by 'day_scale' (a stage never reached counts 'missing_days'
+      days of error, default: length of the run).
+
+    Parameters
+    ----------
+    simulated : dict
+        Output of simulate.
+    observed : dict
+        "days" (1-based observation days), optional series among SERIES
+        (values on those days) and optional "transitions" {stage: day}.
+    """
+    terms = []
+    days = np.asarray(observed.get("days", []), dtype=int)
+    for key in SERIES:
+        if key not in observed:
+            continue
+        obs = np.asarray(observed[key], dtype=float)
+        series = np.asarray(simulated[key], dtype=float)
+        sim = np.zeros(len(days))
+        inside = days <= len(series)
+        sim[inside] = series[days[inside] - 1]
+        scale = max(np.mean(np.abs(obs)), 1e-12)
+        terms.append(np.sqrt(np.mean((sim - obs) ** 2)) / scale)
+
+    if observed.get("transitions"):
+        missing = missing_days or len(simulated[SERIES[0]])
+        errors = [abs(simulated["transitions"].get(stage, day + missing) - day)
+                  for stage, day in observed["transitions"].items()]
+        terms.append(np.mean(errors) / day_scale)
+    return float(np.mean(terms))
+
+
+def _simulate_task(args):
+    # Worker task of abc_smc (pool of optim_GA.make_pool); simulate sets its
+    # own recording profile
+    return simulate(*args)
+
+
+def _kernel_density(U, particles, weights, cov_inv, norm):
+    # Mixture density sum_j w_j N(u; particles_j, cov) at each row of U
+    diff = U[:, None, :] - particles[None, :, :]
+    mahal = np.einsum("ijk,kl,ijl->ij", diff, cov_inv, diff)
+    return (np.exp(-0.5 * mahal) / norm) @ weights
+
+
+def abc_smc(
+    observed,
+    species_name="Ble",
+    parameters=None,
+    n_particles=100,
+    max_simulations=2000,
+    quantile=0.5,
+    eps_min=0.0,
+    min_acceptance=0.02,
+    batch_size=None,
+    seed=None,
+    weather_seed=0,
+    n_workers=None,
+    n_hours=None,
+    settings=None,
+    day_scale=10.0,
+):
+    """
+    ABC-SMC calibration of 'parameters' against 'observed'.
+
+    Parameters
+    ----------
+    observed : dict
+        Observations (see distance).
+    species_name : str
+        Key of the plant species used in Plant_def.species_db.
+    parameters : dict, optional
+        Prior ranges {name: (low, high)} (dotted paths:
+        optim_GA.set_parameter); default: optim_GA.PARAM_BOUNDS.
+    n_particles : int
+        Particles per generation.
+    max_simulations : int
+        Simulation budget.
+    quantile : float
+        Tolerance of a generation: this quantile of the previous distances.
+    eps_min : float
+        Stops once the tolerance falls below this value.
+    min_acceptance : float
+        Stops when a generation accepts fewer proposals than this fraction.
+    batch_size : int, optional
+        Proposals simulated per batch (default: n_particles).
+    seed : int, optional
+        Seed of the sampler.
+    weather_seed : int
+        Weather seed of every run.
+    n_workers : int, optional
+        If > 1, batches are run on a process pool.
+    n_hours, settings :
+        Horizon and model settings of the runs (optim_GA.run_individual).
+    day_scale : float
+        Day error equivalent to a relative RMSE of 1 (see distance).
+
+    Returns
+    -------
+    dict
+        Last complete population: "particles" (parameter dicts), "weights",
+        "distances", "epsilon"; and "epsilons", "acceptance" (per
+        generation), "simulations", "status" ("eps_min", "budget" or
+        "acceptance").
+    """
+    parameters = parameters or Ga.PARAM_BOUNDS
+    space = Cm.ParameterSpace(parameters)
+    dim = space.dim
+    rng = np.random.default_rng(seed)
+    batch_size = batch_size or n_particles
+
+    Pl.set_plant_species(Pl.Plant, species_name, Pl.species_db)
+    pool = Ga.make_pool(species_name, n_workers) if n_workers and n_workers > 1 else None
+
+    def run_batch(U):
+        tasks = [(space.to_individual(u), n_hours, settings, weather_seed)
+                 for u in U]
+        summaries = pool.map(_simulate_task, tasks) if pool else [simulate(*t) for t in tasks]
+        return np.array([distance(s, observed, day_scale) for s in summaries])
+
+    result = {"epsilons": [], "acceptance": [], "simulations": 0,
+              "status": "budget"}
+    try:
+        # Generation 0: prior
+        n0 = min(n_particles, max_simulations)
+        particles = rng.random((n0, dim))
+        distances = run_batch(particles)
+        weights = np.full(n0, 1.0 / n0)
+        epsilon = np.inf
+        result["simulations"] += n0
+        result["epsilons"].append(epsilon)
+        result["acceptance"].append(1.0)
+
+        while result["simulations"] < max_simulations:
+            epsilon = float(np.quantile(distances, quantile))
+            if result["epsilons"] and epsilon >= result["epsilons"][-1]:
+                # No progress possible below the current distances
+                epsilon = float(np.min(distances))
+
+            # Perturbation kernel: twice the weighted covariance
+            mean = weights @ particles
+            cov = 2.0 * np.atleast_2d(np.cov(particles.T, aweights=weights, bias=True))
+            cov += 1e-12 * np.eye(dim)
+            cov_chol = np.linalg.cholesky(cov)
+            cov_inv = np.linalg.inv(cov)
+            norm = np.sqrt((2 * np.pi) ** dim * np.linalg.det(cov))
+
+            accepted, accepted_d = [], []
+            proposed = 0
+            while (len(accepted) < n_particles
+                   and result["simulations"] < max_simulations):
+                n_batch = min(batch_size, max_simulations - result["simulations"])
+                parents = particles[rng.choice(len(particles), size=n_batch, p=weights)]
+                U = parents + rng.standard_normal((n_batch, dim)) @ cov_chol.T
+                # Zero prior density outside the box: rejected without a run
+                U = U[np.all((U >= 0.0) & (U <= 1.0), axis=1)]
+                if len(U) == 0:
+                    continue
+                d = run_batch(U)
+                result["simulations"] += len(U)
+                proposed += len(U)
+                keep = d <= epsilon
+                accepted.extend(U[keep])
+                accepted_d.extend(d[keep])
+
+            acceptance = len(accepted) / max(proposed, 1)
+            if len(accepted) < n_particles:
+                # Budget exhausted during the generation: keep the last
+                # complete population
+                result["status"] = "budget"
+                break
+
+            new_particles = np.array(accepted[:n_particles])
+            new_weights = 1.0 / _kernel_density(new_particles, particles,
+                                                weights, cov_inv, norm)
+            particles = new_particles
+            weights = new_weights / new_weights.sum()
+            distances = np.array(accepted_d[:n_particles])
+            result["epsilons"].append(epsilon)
+            result["acceptance"].append(acceptance)
+            print(f"Generation {len(result['epsilons']) - 1} | epsilon = {epsilon:.4g}"
+                  f" | acceptance = {acceptance:.2f} | simulations = {result['simulations']}")
+
+            if epsilon <= eps_min:
+                result["status"] = "eps_min"
+                break
+            if acceptance < min_acceptance:
+                result["status"] = "acceptance"
+                break
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    result.update({
+        "particles": [space.to_individual(u) for u in particles],
+        "weights": weights,
+        "distances": distances,
+        "epsilon": result["epsilons"][-1],
+    })
+    return result
+
+
+def posterior_summary(result):
+    """
+    Weighted mean, standard deviation and 5-95 % range of each parameter of
+    an abc_smc result.
+    """
+    weights = np.asarray(result["weights"])
+    summary = {}
+    for name in result["particles"][0]:
+        values = np.array([p[name] for p in result["particles"]])
+        order = np.argsort(values)
+        cdf = np.cumsum(weights[order])
+        mean = float(weights @ values)
+        summary[name] = {
+            "mean": mean,
+            "std": float(np.sqrt(weights @ (values - mean) ** 2)),
+            "q05": float(values[order][np.searchsorted(cdf, 0.05)]),
+            "q95": float(values[order][min(np.searchsorted(cdf, 0.95), len(values) - 1)]),
+        }
+    return summary
+
+
+if __name__ == "__main__":
+    # Synthetic check: observations produced by a known parameter set
+    import global_constants as Gl
+    Pl.set_plant_species(Pl.Plant, "quercus_coccifera", Pl.species_db)
+    truth = {"watt_to_sugar_coeff": 5.3e-5, "alloc_repro_max": 0.7,
+             "stomatal_density": 5.0e7}
+    reference = simulate(truth, seed=0)
+    obs_days = list(range(30, len(reference["biomass_total"]) + 1, 30))
+    observations = {
+        "days": obs_days,
+        "biomass_total": [reference["biomass_total"][d - 1] for d in obs_days],
+        "biomass_repro": [reference["biomass_repro"][d - 1] for d in obs_days],
+        "transitions": reference["transitions"],
+    }
+    posterior = abc_smc(observations, species_name="quercus_coccifera",
+                        n_particles=50, max_simulations=500, seed=0,
+                        n_hours=Gl.max_cycles)
+    for param, stats in posterior_summary(posterior).items():
+        print(f"{param}: {stats}")
@@ -0,0 +1,327 @@
+# dual_numbers.py
+"""
+Forward-mode derivatives of Plantroid runs with dual numbers.
+
+A Dual carries a value and a tangent vector (derivatives with respect to n
+seeded parameters). Species parameters set to Duals propagate their
+tangents through the arithmetic of the process functions (photosynthesis,
+calculate_cost, calculate_potential_new_biomass, allocate_biomass, the leaf
+energy balance and its Newton solve, ...), so a single run yields the local
+derivatives of the final state with respect to every seeded parameter.
+
+Comparisons only look at the value: discrete decisions (phenology switches,
+process success or failure, leaf-angle grid search, min/max branches) are
+those of the plain run and are held fixed along the trajectory; the
+derivatives are those of the trajectory with the same sequence of
+decisions. They are not the slope of the run objectives: the hourly
+success / fail switches of the processes flip for parameter changes as
+small as 1e-11 (relative) once the plant grows, so whole-run finite
+differences do not converge (their sign changes with the step) and the
+objectives are piecewise constant or jumpy in the parameters. The
+derivatives of each process function, on the other hand, match central
+finite differences (tests/test_dual_numbers.py). forward_sensitivities
+warns about this on every call.
+
+forward_sensitivities runs the model with the Python backend and the grid
+leaf search (the compiled kernels and scipy's local search work on plain
+floats). The process functions call the elementary functions of this module
+(exp, sqrt, ...) where a parameter goes through math: they are math.* for
+floats, so plain runs are unchanged. A dual run costs about 8 times a
+plain one once the plant grows (every operation on a Dual allocates its
+tangent array).
+
+All comments in English, while variable/function names follow the project.
+"""
+
+import math
+import operator
+import warnings
+
+import numpy as np
+
+# Settings of the dual runs
+DUAL_SETTINGS = {"compute_backend": "python", "leaf_search": "grid"}
+
+
+class Dual:
+    """
+    Dual number value + tangent . eps, with eps_i eps_j = 0.
+    """
+
+    __slots__ = ("value", "tangent")
+
+    def __init__(self, value, tangent):
+        self.value = float(value)
+        self.tangent = np.asarray(tangent, dtype=float)
+
+    @classmethod
+    def variable(cls, value, index, n):
+        """
+        Seeded parameter: tangent = unit vector 'index' of size n.
+        """
+        tangent = np.zeros(n)
+        tangent[index] = 1.0
+        return cls(value, tangent)
+
+    # --- arithmetic ---
+    def __add__(self, other):
+        if isinstance(other, Dual):
+            return Dual(self.value + other.value, self.tangent + other.tangent)
+        return Dual(self.value + other, self.tangent)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, Dual):
+            return Dual(self.value - other.value, self.tangent - other.tangent)
+        return Dual(self.value - other, self.tangent)
+
+    def __rsub__(self, other):
+        return Dual(other - self.value, -self.tangent)
+
+    def __mul__(self, other):
+        if isinstance(other, Dual):
+            return Dual(self.value * other.value,
+                        self.tangent * other.value + other.tangent * self.value)
+        return Dual(self.value * other, self.tangent * other)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if isinstance(other, Dual):
+            return Dual(self.value / other.value,
+                        (self.tangent * other.value - other.tangent * self.value)
+                        / (other.value * other.value))
+        return Dual(self.value / other, self.tangent / other)
+
+    def __rtruediv__(self, other):
+        return Dual(other / self.value,
+                    -other * self.tangent / (self.value * self.value))
+
+    def __pow__(self, other):
+        if isinstance(other, Dual):
+            value = self.value ** other.value
+            return Dual(value, value * (other.tangent * math.log(self.value)
+                                        + other.value * self.tangent / self.value))
+        if other == 0:
+            return Dual(1.0, np.zeros_like(self.tangent))
+        return Dual(self.value ** other,
+                    other * self.value ** (other - 1) * self.tangent)
+
+    def __rpow__(self, other):
+        value = other ** self.value
+        return Dual(value, value * math.log(other) * self.tangent)
+
+    def __neg__(self):
+        return Dual(-self.value, -self.tangent)
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        if self.value < 0.0:
+            return -self
+        return self
+
+    # --- comparisons and conversions (value only) ---
+    def __eq__(self, other):
+        return self.value == _value(other)
+
+    def __ne__(self, other):
+        return self.value != _value(other)
+
+    def __lt__(self, other):
+        return self.value < _value(other)
+
+    def __le__(self, other):
+        return self.value <= _value(other)
+
+    def __gt__(self, other):
+        return self.value > _value(other)
+
+    def __ge__(self, other):
+        return self.value >= _value(other)
+
+    __hash__ = None
+
+    def __float__(self):
+        return self.value
+
+    def __int__(self):
+        return int(self.value)
+
+    def __bool__(self):
+        return self.value != 0.0
+
+    def __round__(self, ndigits=None):
+        return round(self.value, ndigits)
+
+    def __format__(self, spec):
+        return format(self.value, spec)
+
+    def __repr__(self):
+        return f"Dual({self.value!r}, {self.tangent!r})"
+
+    # --- elementary functions (also used by numpy on object arrays) ---
+    def exp(self):
+        value = math.exp(self.value)
+        return Dual(value, value * self.tangent)
+
+    def log(self):
+        return Dual(math.log(self.value), self.tangent / self.value)
+
+    def sqrt(self):
+        value = math.sqrt(self.value)
+        return Dual(value, self.tangent / (2.0 * value) if value else self.tangent * 0.0)
+
+    def sin(self):
+        return Dual(math.sin(self.value), math.cos(self.value) * self.tangent)
+
+    def cos(self):
+        return Dual(math.cos(self.value), -math.sin(self.value) * self.tangent)
+
+    def tanh(self):
+        value = math.tanh(self.value)
+        return Dual(value, (1.0 - value * value) * self.tangent)
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        # numpy scalar functions on Duals (np.exp(d), np.float64(2) * d, ...)
+        if method != "__call__" or kwargs or ufunc not in _UFUNCS:
+            return NotImplemented
+        function = _UFUNCS[ufunc]
+        inputs = [x.item() if isinstance(x, (np.generic, np.ndarray)) and x.ndim == 0
+                  else x for x in inputs]
+        if any(isinstance(x, np.ndarray) for x in inputs):
+            # Arrays mixed with Duals: element by element (object array)
+            return np.frompyfunc(function, len(inputs), 1)(*inputs)
+        return function(*inputs)
+
+
+def _value(x):
+    return x.value if isinstance(x, Dual) else x
+
+
+def _maximum(a, b):
+    return a if a >= b else b
+
+
+def _minimum(a, b):
+    return a if a <= b else b
+
+
+def _unary(name, function):
+    # Elementary function of a Dual or a float (math.* for floats)
+    def apply(x):
+        if isinstance(x, Dual):
+            return getattr(x, name)()
+        return function(x)
+    apply.__name__ = name
+    apply.__doc__ = f"{name} of a Dual, or math.{name} of a float."
+    return apply
+
+
+exp = _unary("exp", math.exp)
+log = _unary("log", math.log)
+sqrt = _unary("sqrt", math.sqrt)
+sin = _unary("sin", math.sin)
+cos = _unary("cos", math.cos)
+tanh = _unary("tanh", math.tanh)
+
+
+_UFUNCS = {
+    np.add: operator.add,
+    np.subtract: operator.sub,
+    np.multiply: operator.mul,
+    np.true_divide: operator.truediv,
+    np.power: operator.pow,
+    np.negative: operator.neg,
+    np.absolute: operator.abs,
+    np.maximum: _maximum,
+    np.minimum: _minimum,
+    np.greater: operator.gt,
+    np.greater_equal: operator.ge,
+    np.less: operator.lt,
+    np.less_equal: operator.le,
+    np.equal: operator.eq,
+    np.not_equal: operator.ne,
+    np.exp: exp,
+    np.log: log,
+    np.sqrt: sqrt,
+    np.sin: sin,
+    np.cos: cos,
+    np.tanh: tanh,
+}
+
+
+def value_of(x):
+    """
+    Value of a Dual (x itself otherwise).
+    """
+    return _value(x)
+
+
+def tangent_of(x, n):
+    """
+    Tangent of a Dual (zeros of size n otherwise).
+    """
+    return x.tangent if isinstance(x, Dual) else np.zeros(n)
+
+
+def forward_sensitivities(species_name, names, n_hours=None, settings=None,
+                          seed=None):
+    """
+    Final objectives of one run and their derivatives with respect to the
+    parameters 'names' (dotted paths, see optim_GA.set_parameter).
+
+    The derivatives are those of the trajectory of the plain run, with its
+    discrete decisions (process success / fail switches, phenology, leaf
+    search) held fixed: a UserWarning says so on every call. They are not
+    a substitute for finite differences or a sensitivity analysis across
+    the switches (sensitivity_Morris, sensitivity_Sobol).
+
+    Parameters
+    ----------
+    species_name : str
+        Key of the plant species used in Plant_def.species_db.
+    names : list of str
+        Differentiated parameters; they keep their species values.
+    n_hours : int, optional
+        Simulated hours (default: Gl.max_cycles).
+    settings : dict, optional
+        Extra model settings (DUAL_SETTINGS always apply).
+    seed : int, optional
+        Weather seed of the run.
+
+    Returns
+    -------
+    (dict, dict)
+        Objectives of optim_GA.run_individual (plain values), and for each
+        objective the derivatives {name: d objective / d parameter}.
+    """
+    import Plant_def as Pl
+    import optim_GA as Ga
+
+    Pl.set_plant_species(Pl.Plant, species_name, Pl.species_db)
+    n = len(names)
+    individual = {
+        name: Dual.variable(Ga.get_parameter(Pl.Plant, None, name), i, n)
+        for i, name in enumerate(names)
+    }
+    run_settings = dict(settings or {}, **DUAL_SETTINGS)
+    saved_recording = Ga.Hi.recording_settings()
+    Ga.Hi.set_recording_profile(**Ga.RECORDING)
+    try:
+        objectives = Ga.run_individual(individual, n_hours, run_settings, seed)
+    finally:
+        Ga.Hi.set_recording_profile(**saved_recording)
+
+    warnings.warn(
+        "forward_sensitivities: the derivatives ignore the success/fail "
+        "switches (and other discrete decisions) of the run, which are held "
+        "as in the plain run; the objectives jump when a switch flips, so "
+        "they can disagree with finite differences, even in sign",
+        stacklevel=2)
+    values = {key: value_of(obj) for key, obj in objectives.items()}
+    derivatives = {key: dict(zip(names, tangent_of(obj, n).tolist()))
+                   for key, obj in objectives.items()}
+    return values, derivatives
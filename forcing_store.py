@@ -0,0 +1,140 @@
+# forcing_store.py
+"""
+Memory-mapped store of precomputed hourly forcing (temperature, light, rain,
+CO2, RH, wind) shared by all the processes of a sweep.
+
+The synthetic weather of Environnement_def only depends on the climate
+parameters (Ev.CLIMATE_PARAMS) and on the random seed. It is therefore
+computed once, written to "<key>.npy" in the store directory, and opened
+read-only with np.load(mmap_mode="r"): every worker maps the same file and
+the operating system shares the pages between them. Files are keyed by a
+hash of the climate parameters and the seed, and reused between sessions.
+
+Row i of a forcing array holds hour i + 1 (the main loop starts at
+sim_time = 1), columns follow Ev.FORCING_COLUMNS.
+
+All comments in English, while variable/function names follow the project.
+"""
+
+import hashlib
+import json
+import os
+import random
+
+import numpy as np
+
+import global_constants as Gl
+import Environnement_def as Ev
+
+# Default location of the store (overridable with PLANTROID_FORCING_DIR)
+FORCING_DIR = os.environ.get(
+    "PLANTROID_FORCING_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "plantroid", "forcing"),
+)
+
+
+def climate_parameters(Env):
+    """
+    Returns the parameters of Env that determine its synthetic weather.
+    """
+    params = {name: Env[name] for name in Ev.CLIMATE_PARAMS}
+    params["RH"] = Env["atmos"]["RH"]
+    params["wind"] = Env["atmos"]["wind"]
+    if Env.get("antithetic", False):
+        params["antithetic"] = True
+    return params
+
+
+def forcing_key(Env, seed):
+    """
+    Hash identifying the forcing of a climate scenario and a seed.
+    """
+    content = {
+        "climate": climate_parameters(Env),
+        "seed": seed,
+        "model_version": Gl.MODEL_VERSION,
+    }
+    text = json.dumps(content, sort_keys=True)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def build_forcing(Env, seed, n_hours):
+    """
+    Computes 'n_hours' of synthetic forcing for Env and 'seed'.
+
+    The global random generator is seeded with 'seed' for the duration of
+    the computation, then restored, so that the rows are exactly those a
+    live run would draw after random.seed(seed).
+
+    Returns
+    -------
+    np.ndarray
+        Array of shape (n_hours, len(Ev.FORCING_COLUMNS)).
+    """
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        rows = [Ev.synthetic_forcing(t, Env) for t in range(1, n_hours + 1)]
+    finally:
+        random.setstate(state)
+    return np.array(rows, dtype=np.float64).reshape(n_hours, len(Ev.FORCING_COLUMNS))
+
+
+def get_forcing(Env, seed, n_hours, directory=None):
+    """
+    Returns the forcing of Env and 'seed' as a read-only memory-mapped array
+    of at least 'n_hours' rows, building and storing it if needed.
+
+    A stored file longer than requested is reused as is; a shorter one is
+    rebuilt to the new length (the random stream being the same, the first
+    rows do not change).
+
+    Parameters
+    ----------
+    Env : dict
+        Environment dictionary (only its climate parameters are used).
+    seed : int
+        Seed of the random weather.
+    n_hours : int
+        Number of hours needed (e.g. max_cycles).
+    directory : str, optional
+        Store directory (default: FORCING_DIR).
+
+    Returns
+    -------
+    np.memmap
+    """
+    directory = directory or FORCING_DIR
+    key = forcing_key(Env, seed)
+    path = os.path.join(directory, key + ".npy")
+
+    if os.path.exists(path):
+        forcing = np.load(path, mmap_mode="r")
+        if forcing.shape[0] >= n_hours:
+            return forcing
+
+    write_forcing(path, build_forcing(Env, seed, n_hours),
+                  {"climate": climate_parameters(Env), "seed": seed,
+                   "columns": list(Ev.FORCING_COLUMNS),
+                   "model_version": Gl.MODEL_VERSION})
+    return np.load(path, mmap_mode="r")
+
+
+def write_forcing(path, forcing, info=None):
+    """
+    Writes a forcing array to 'path' (".npy") atomically, so that concurrent
+    workers never map a partially written file. 'info' is stored alongside
+    as JSON for inspection.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, np.ascontiguousarray(forcing, dtype=np.float64))
+    os.replace(tmp_path, path)
+
+    if info is not None:
+        tmp_info = f"{path[:-4]}.{os.getpid()}.json.tmp"
+        with open(tmp_info, "w") as f:
+            json.dump(info, f, indent=1)
+        os.replace(tmp_info, path[:-4] + ".json")
@@ -11,6 +11,9 @@ import global_constants as Gl
 import history_def as Hi
 import Environnement_def as Ev
 import global_constants as Gl
+import kernels as Ke
+import phenology_def as Ph
+import dual_numbers as Du
 import math
 import numpy as np
 
@@ -298,6 +301,23 @@ def nutrient_absorption(Plant, Env):
     if water_in_soil <= 0.0:
         return
 
+    if Gl.compute_backend == "kernels":
+        water_absorbed, nutrients_absorbed, concentration = Ke.nutrient_absorption(
+            water_needed, water_in_soil, Env["soil"]["nutrient"],
+            Plant["water_nutrient_coeff"])
+        Env["soil"]["nutrient_concentration"] = concentration
+        Plant["flux_in"]["nutrient"] += nutrients_absorbed
+        Env["soil"]["water"] -= water_absorbed
+        Env["soil"]["nutrient"] -= nutrients_absorbed
+        if "diag" not in Plant:
+            Plant["diag"] = {}
+        Plant["diag"]["nutrient_absorption"] = {
+            "water_absorbed": water_absorbed,
+            "nutrients_absorbed": nutrients_absorbed,
+            "nutrient_concentration": concentration
+        }
+        return
+
     water_absorbed = min(water_needed, water_in_soil)
 
     soil_nutrient_total = Env["soil"]["nutrient"]
@@ -436,7 +456,7 @@ def compute_cell_water_draw(Plant):
     # =>  - si delta est très petit, ratio ~ delta/... => draw << delta 
     #     - si delta est grand, ratio -> 1 => draw ~ delta
     alpha = 0.02 * min_cell_water
-    ratio = 1.0 - math.exp(- delta / alpha)  
+    ratio = 1.0 - Du.exp(- delta / alpha)  
     draw_possible = delta * ratio
 
     return draw_possible
@@ -619,6 +639,18 @@ def calculate_cost(Plant, process):
         cost_factor = Plant["cost_params"]["maintenance"]["sugar"]
         Plant["cost"]["maintenance"]["sugar"] = (cost_factor * 
                                 Gl.DT * Plant["biomass_total"])
+    elif Gl.compute_backend == "kernels":
+        # Extension or secondary growth on flat arrays
+        rate = Plant["stock_growth_rate"] if process == "secondary" else 1.0
+        cost = Plant["cost"][process]
+        values = Ke.biomass_costs(
+            np.array([cost[r] for r in Gl.resource]),
+            np.array([[Plant["cost_params"][bf][r] for r in Gl.resource]
+                      for bf in Gl.biomass_function]),
+            np.array([Plant["ratio_alloc"][bf] for bf in Gl.biomass_function]),
+            rate, Plant["new_biomass"])
+        for r, value in zip(Gl.resource, values.tolist()):
+            cost[r] = value
     elif process == "secondary":
         for r in Gl.resource:
             for bf in Gl.biomass_function:
@@ -853,6 +885,16 @@ def allocate_biomass(Plant, nb):
     nb : float
         Additional biomass to allocate.
     """
+    if Gl.compute_backend == "kernels":
+        biomass = np.array([Plant["biomass"][bf] for bf in Gl.biomass_function])
+        Plant["biomass_total"] = Ke.allocate_biomass(
+            biomass,
+            np.array([Plant["ratio_alloc"][bf] for bf in Gl.biomass_function]),
+            nb)
+        for bf, value in zip(Gl.biomass_function, biomass.tolist()):
+            Plant["biomass"][bf] = value
+        return
+
     ra = Plant["ratio_alloc"]
     add_transport = nb * ra["transport"]
     add_stock = nb * ra["stock"]    
@@ -900,171 +942,32 @@ def adjust_success_cycle(Plant, process):
 
 
 def phenology_annual(Plant, Env, day_index, daily_min_temps):
-    photoperiod_today = Ev.calc_daily_photoperiod(day_index)
-    Gl.count_ph += 1
-    if Plant["phenology_stage"] == "vegetative" and  Gl.count_ph > Gl.ave_day * Gl.nb_days:
-        cost = np.array(Hi.history.get("cost_maintenance_sugar"))
-        photo = np.array(Hi.history.get("actual_sugar"))
-        delta = cost-photo
-        sugar_mean = np.mean(delta[-Gl.ave_day * Gl.nb_days:])                                
-    else:
-        sugar_mean = 0.0 
-
-    # Germination check
-    if Plant["phenology_stage"] in ["seed", "dormancy"]:
-        if len(daily_min_temps) >= Gl.ave_week and all(t > Plant["dormancy_thrs_temp"] for t in daily_min_temps[-Gl.ave_week:]):
-            Plant["phenology_stage"] = "vegetative"
-            update_phenological_parameters(Plant)
-        else:
-            pass
-        return
-
-    # Switch to reproduction if sugar slope is negative
-    if ((sugar_mean < Gl.slope_thrs) and
-        Plant["phenology_stage"] == "vegetative"):
-            Plant["reproduction_ref"] = Plant["biomass_total"]
-            Plant["phenology_stage"] = "reproduction"
-            update_phenological_parameters(Plant)
-            return
-    
-    
-    if (photoperiod_today >= 15.5 and
-        Plant["phenology_stage"] == "reproduction"):
-        Plant["phenology_stage"] = "dessication"
-        return
+    Ph.step_phenology(Plant, day_index, daily_min_temps, "annual")
 
 
 def phenology_biannual(Plant, Env, day_index, daily_min_temps):
-    photoperiod_today = Ev.calc_daily_photoperiod(day_index)
-    photoperiod_yesterday = Ev.calc_daily_photoperiod(day_index - 1)
-    sugar_slope = slope_last_hours(Hi.history["reserve_sugar"], nb_hours=Gl.ave_day * Gl.nb_days)
-    photo_slope = slope_last_hours(Hi.history["pot_sugar"], nb_hours=Gl.ave_day * Gl.nb_days)
-
-    # Germination check
-    if Plant["phenology_stage"] in ["seed"]:
-        if len(daily_min_temps) >= Gl.ave_week and all(t > Plant["dormancy_thrs_temp"] for t in daily_min_temps[-Gl.ave_week:]):
-            Plant["phenology_stage"] = "vegetative"
-            update_phenological_parameters(Plant)
-        return
-    
-    if Plant["phenology_stage"] in ["dormancy"] and day_index > 365:
-        if len(daily_min_temps) >= Gl.ave_week and all(t > Plant["dormancy_thrs_temp"] for t in daily_min_temps[-Gl.ave_week:]):
-            Plant["phenology_stage"] = "reproduction"
-            update_phenological_parameters(Plant)
-        return
-   
-    # optimize reserve build-up
-    if (photo_slope < Gl.slope_thrs and 
-        photoperiod_today < photoperiod_yesterday and
-        Plant["phenology_stage"] == "vegetative"):
-        Plant["phenology_stage"] = "making_reserve"
-        update_phenological_parameters(Plant)
-        return
-    
-    if (day_index < 365 and sugar_slope < Gl.slope_thrs and
-        Plant["phenology_stage"] == "making_reserve"):
-        Plant["phenology_stage"] = "dessication"
-        update_phenological_parameters(Plant)
-        return
-    
-    # End-of-life dessication
-    if Plant["biomass"]["photo"] < 0.001 and Plant["phenology_stage"] == "dessication":
-        Plant["phenology_stage"] = "dormancy"
-        update_phenological_parameters(Plant)
-        Plant["ratio_alloc"] = {"photo": 0.2, 
-                                     "transport": 0.1, 
-                                     "stock": 0.0,
-                                     "absorp": 0.2, 
-                                     "repro": Plant["alloc_repro_max"]}
-        check_alloc(Plant)
+    Ph.step_phenology(Plant, day_index, daily_min_temps, "biannual")
 
-def phenology_perennial(Plant, Env, day_index, daily_min_temps):
-    photoperiod_today = Ev.calc_daily_photoperiod(day_index)
-    photoperiod_yesterday = Ev.calc_daily_photoperiod(day_index - 1)
-    Gl.count_ph += 1
-    if (Gl.count_ph > Gl.ave_day * Gl.nb_days):
-        cost = np.array(Hi.history.get("cost_maintenance_sugar"))
-        photo = np.array(Hi.history.get("actual_sugar"))
-        delta = cost-photo
-        sugar_mean = np.mean(delta[-Gl.ave_day * Gl.nb_days:])                                
-    else:
-        sugar_mean = 0.0
 
-    # Germination check
-    if Plant["phenology_stage"] == "seed":
-        if len(daily_min_temps) >= Gl.ave_week and all(t > Plant["dormancy_thrs_temp"] for t in daily_min_temps[-Gl.ave_week:]):
-            Plant["phenology_stage"] = "vegetative"
-            update_phenological_parameters(Plant)
-        return
-    
-    if Plant["phenology_stage"] == "dormancy" and day_index > 365:
-        if len(daily_min_temps) >= Gl.ave_week and all(t > Plant["dormancy_thrs_temp"] for t in daily_min_temps[-Gl.ave_week:]):
-            Plant["phenology_stage"] = "reproduction"
-            Plant["dormancy_index"] = 1.0
-            Plant["cost_params"]["maintenance"]["sugar"] = 5e-7
-            update_phenological_parameters(Plant)
-        return
-    
-    if Plant["phenology_stage"] == "reproduction" and photoperiod_today > 14:
-        Plant["phenology_stage"] = "vegetative"
-        Plant["ratio_alloc"] = Plant["save_alloc"]
-        check_alloc(Plant)
-        update_phenological_parameters(Plant)
-        Gl.count_ph = 0
-        return   
-   
-    # optimize reserve build-up
-    if (sugar_mean < Gl.slope_thrs and
-        Plant["phenology_stage"] == "vegetative"):
-
-        Plant["phenology_stage"] = "making_reserve"
-        Plant["save_alloc"] = Plant["ratio_alloc"]
-        Plant["ratio_alloc"] = {"photo": 0.0, 
-                                     "transport": 0.0,
-                                     "stock": 1.0, 
-                                     "absorp": 0.0, 
-                                     "repro": 0.0}        
-        check_alloc(Plant)
-        update_phenological_parameters(Plant)
-        Gl.count_ph = 0
-        return
-    
-    if (sugar_mean < Gl.slope_thrs and
-        Plant["phenology_stage"] == "making_reserve"):
-        Plant["phenology_stage"] = "dessication"
-        update_phenological_parameters(Plant)
-        return
-    
-    # End-of-life dessication
-    if (Plant["biomass"]["photo"] < Plant["leaf_shredding_ratio"] and 
-        Plant["phenology_stage"] == "dessication"):
-        Plant["phenology_stage"] = "dormancy"
-        update_phenological_parameters(Plant)
-        Plant["ratio_alloc"] = {"photo": 0.3, 
-                                     "transport": 0.0,
-                                     "stock": 0.0,  
-                                     "absorp": 0.3, 
-                                     "repro": 0.1}
-        check_alloc(Plant)
+def phenology_perennial(Plant, Env, day_index, daily_min_temps):
+    Ph.step_phenology(Plant, day_index, daily_min_temps, "perennial")
 
 
 def manage_phenology(Plant, Env, day_index, daily_min_temps):
-    # 1) On définit un dictionnaire 'dispatch' :
-    phenology_dispatch = {
-        "annual":    phenology_annual,
-        "biannual":  phenology_biannual,
-        "perennial": phenology_perennial
-    }
-    
-    # 2) On récupère la clé (ex. "annual") depuis Plant
-    phen_type = Plant.get("growth_type", "none")
+    """
+    Daily phenology step: applies the transition table of the plant's
+    growth type ("annual", "biannual" or "perennial", see
+    phenology_def.PHENOLOGY_TABLES).
 
-    # 3) On cherche dans le dictionnaire la fonction associée
-    #    et on fournit une fonction "par défaut" si la clé est introuvable
-    handler = phenology_dispatch.get(phen_type, "none")
-    
-    # 4) On appelle cette fonction "spécialisée"
-    handler(Plant, Env, day_index, daily_min_temps)
+    Parameters
+    ----------
+    Plant : dict
+    Env : dict
+    day_index : int
+    daily_min_temps : list
+        Daily minimum temperatures of the last days.
+    """
+    Ph.step_phenology(Plant, day_index, daily_min_temps)
 
 def update_phenological_parameters(Plant):
     ph = Plant["phenology_stage"]
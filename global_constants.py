@@ -10,6 +10,25 @@ names remain in French for compatibility with other parts of the project.
 #  GLOBAL INITIALIZATION    #
 #############################
 
+# Model version, stored with exported results
+MODEL_VERSION = "1.0"
+
+# Backend of the hourly physiology: "python" (dictionary functions) or
+# "kernels" (flat-array kernels of kernels.py, compiled when Numba is installed)
+compute_backend = "python"
+
+# Search of the leaf stomatal conductance / angle each daylight hour:
+# "grid" (full grid), "local" (warm-started refinement, grid as fallback)
+# or "table" (precomputed decision table, see decision_table.use_table)
+leaf_search = "grid"
+
+# Leaf temperature solver used by the leaf search: "Newton", "fsolve",
+# "linear" or "auto" (method chosen per call, see Be.solve_leaf_temperature_auto)
+leaf_temp_method = "Newton"
+
+# Number of steps per axis of the (stomatal conductance, leaf angle) grid
+leaf_search_steps = 3
+
 # Basic global time parameters
 time = 0                # discrete simulation time (in hours)
 max_cycles = 24 * 365 * 1  # default maximum cycles if needed
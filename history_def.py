@@ -4,6 +4,8 @@ Manages the simulation's historical records (Plant and Environment states).
 All comments in English, while variable and dictionary keys remain in French.
 """
 
+import global_constants as Gl
+
 # A global dictionary named 'history' that will store lists of values
 # over time (one entry per simulation step).
 history = {
@@ -70,9 +72,222 @@ history = {
 }
 
 
+# Ordered list of every channel the recorder knows about.
+HISTORY_KEYS = list(history.keys())
+
+# Channels holding labels rather than numbers (daily aggregates keep
+# the last value of the day for them).
+CATEGORICAL_KEYS = ["phenology_stage"]
+
+# Channels read back by the model itself during a run (daily slopes,
+# stomatal adaptation, phenology triggers). Whatever the recording
+# profile, they are kept at least over the last CONTROL_WINDOW hours.
+CONTROL_KEYS = [
+    "stomatal_conductance",
+    "reserve_nutrient",
+    "reserve_sugar",
+    "pot_sugar",
+    "cost_maintenance_sugar",
+    "actual_sugar",
+]
+CONTROL_WINDOW = Gl.ave_day * Gl.nb_days
+
+# Current recording settings (see set_recording_profile).
+recorder = {
+    "profile": "full",
+    "keys": list(HISTORY_KEYS),
+    "numeric_keys": [k for k in HISTORY_KEYS
+                     if k not in CATEGORICAL_KEYS and k != "time"],
+    "label_keys": list(CATEGORICAL_KEYS),
+    "window_keys": [],
+    "day_night": False,
+    "threshold_light": 1.0,
+    "current_day": None,
+    "count": 0,
+    "acc": {},
+    "dn_count": {"day": 0, "night": 0},
+    "dn_acc": {"day": {}, "night": {}},
+}
+
+# Daily aggregates filled online by the "daily" profile:
+# daily["mean"|"min"|"max"][key] is a list with one value per simulated day,
+# daily["time"] the matching day numbers (1..N, as aggregate_day_night).
+daily = {"time": [], "mean": {}, "min": {}, "max": {}}
+
+# Day/night means filled online (same layout as aggregate_day_night output):
+# day_night["day"|"night"][key] holds one value per simulated day.
+day_night = {"day": {"time": []}, "night": {"time": []}}
+
+
+def set_recording_profile(profile="full", keys=None, window_keys=(),
+                          day_night=False, threshold_light=1.0):
+    """
+    Selects what history_update stores, and clears the history.
+
+    Parameters
+    ----------
+    profile : str
+        - "full"   : every channel, every hour (default, original behaviour).
+        - "subset" : only the channels in 'keys' (plus "time") every hour.
+        - "daily"  : no hourly storage; mean/min/max of the channels in
+                     'keys' (all channels if None) are accumulated online and
+                     appended to 'daily' once per simulated day.
+    keys : list of str, optional
+        Channels concerned by the profile (ignored for "full").
+    window_keys : iterable of str
+        Extra channels to keep over the rolling CONTROL_WINDOW only
+        (e.g. the last points used by a stability score).
+    day_night : bool
+        If True, day and night means of the profile channels are kept online
+        in 'day_night' (see day_night_tables). Off by default: only the
+        plotting scripts read these tables, and the other runs (spin-up,
+        optimisers, sweeps) would pay for them every hour.
+    threshold_light : float
+        Luminosity above which an hour counts as daytime.
+
+    Notes
+    -----
+    With "subset" and "daily", the CONTROL_KEYS still needed by the model are
+    kept in 'history' as rolling windows; all other channels stay empty.
+    """
+    if profile == "full":
+        keys = list(HISTORY_KEYS)
+    elif profile == "subset":
+        keys = ["time"] + [k for k in (keys or []) if k != "time"]
+    elif profile == "daily":
+        keys = list(HISTORY_KEYS) if keys is None else list(keys)
+    else:
+        raise ValueError(f"Unknown recording profile: {profile}")
+
+    for key in list(keys) + list(window_keys):
+        if key not in history:
+            raise ValueError(f"Unknown history channel: {key}")
+
+    recorder["profile"] = profile
+    recorder["keys"] = keys
+    recorder["numeric_keys"] = [k for k in keys
+                                if k not in CATEGORICAL_KEYS and k != "time"]
+    recorder["label_keys"] = [k for k in keys if k in CATEGORICAL_KEYS]
+    recorder["day_night"] = day_night
+    recorder["threshold_light"] = threshold_light
+    if profile == "full":
+        recorder["window_keys"] = []
+    else:
+        hourly = keys if profile == "subset" else []
+        recorder["window_keys"] = [
+            k for k in dict.fromkeys(CONTROL_KEYS + list(window_keys))
+            if k not in hourly
+        ]
+    clear_history(history)
+
+
+def recording_settings():
+    """
+    Returns the current settings as keyword arguments for set_recording_profile,
+    so that a caller can restore them after a temporary change.
+    """
+    hourly = recorder["keys"] if recorder["profile"] == "subset" else []
+    return {
+        "profile": recorder["profile"],
+        "keys": None if recorder["profile"] == "full" else list(recorder["keys"]),
+        "window_keys": [k for k in recorder["window_keys"]
+                        if k not in CONTROL_KEYS and k not in hourly],
+        "day_night": recorder["day_night"],
+        "threshold_light": recorder["threshold_light"],
+    }
+
+
+def clear_history(history):
+    """
+    Empties every channel of 'history' and the online daily / day-night aggregates.
+    """
+    for key in history:
+        history[key].clear()
+    daily["time"] = []
+    for stat in ("mean", "min", "max"):
+        daily[stat] = {}
+    for part in ("day", "night"):
+        day_night[part] = {"time": []}
+    recorder["current_day"] = None
+    recorder["count"] = 0
+    recorder["acc"] = {}
+    recorder["dn_count"] = {"day": 0, "night": 0}
+    recorder["dn_acc"] = {"day": {}, "night": {}}
+
+
+def snapshot(Plant, Environment, time):
+    """
+    Returns the current value of every history channel as a dictionary.
+    """
+    stress = Plant["stress_history"]
+    return {
+        "time": time,
+        # Biomasses
+        "biomass_total": Plant["biomass_total"],
+        "biomass_transport": Plant["biomass"]["transport"],
+        "biomass_stock": Plant["biomass"]["stock"],
+        "biomass_photo": Plant["biomass"]["photo"],
+        "biomass_absorp": Plant["biomass"]["absorp"],
+        "biomass_repro": Plant["biomass"]["repro"],
+        "biomass_necromass": Plant["biomass"]["necromass"],
+        # SLAI, health
+        "slai": Plant["slai"],
+        "health_state": Plant["health_state"],
+        # In/out fluxes
+        "sugar_in": Plant["flux_in"]["sugar"],
+        "water_in": Plant["flux_in"]["water"],
+        "nutrient_in": Plant["flux_in"]["nutrient"],
+        # Reserves
+        "reserve_sugar": Plant["reserve"]["sugar"],
+        "reserve_water": Plant["reserve"]["water"],
+        "reserve_nutrient": Plant["reserve"]["nutrient"],
+        # Soil water
+        "soil_water": Environment["soil"]["water"],
+        # Stomatal and thermal data
+        "stomatal_conductance": Plant["stomatal_conductance"],
+        "leaf_angle": Plant["leaf_angle"],
+        "nutrient_index": Plant["nutrient_index"],
+        "atmos_temperature": Environment["atmos"]["temperature"],
+        "leaf_temperature_after": Plant["temperature"]["photo"],
+        # Success cycles
+        "success_extension": Plant["success_cycle"]["extension"],
+        "success_reproduction": Plant["success_cycle"]["reproduction"],
+        "max_transpiration_capacity": Plant["max_transpiration_capacity"],
+        # Photosynthesis details
+        "raw_sugar_flux": Plant["diag"].get("raw_sugar_flux", 0.0),
+        "pot_sugar": Plant["diag"].get("pot_sugar", 0.0),
+        "actual_sugar": Plant["diag"].get("actual_sugar", 0.0),
+        # Environmental data
+        "atmos_light": Environment["atmos"]["light"],
+        "rain_event": Environment["rain_event"],
+        # Resource usage flags
+        "reserve_used_maintenance": int(Plant["reserve_used"]["maintenance"]),
+        "reserve_used_extension": int(Plant["reserve_used"]["extension"]),
+        "reserve_used_transpiration": int(Plant["reserve_used"]["transpiration"]),
+        # Process costs
+        "cost_transpiration_water": Plant["cost"]["transpiration"]["water"],
+        "cost_maintenance_sugar": Plant["cost"]["maintenance"]["sugar"],
+        "dormancy_index": Plant["dormancy_index"],
+        "cost_extension_sugar": Plant["cost"]["extension"]["sugar"],
+        "cost_extension_water": Plant["cost"]["extension"]["water"],
+        "cost_extension_nutrient": Plant["cost"]["extension"]["nutrient"],
+        # alloc ratios
+        "ratio_transport": Plant["ratio_alloc"]["transport"],
+        "ratio_stock": Plant["ratio_alloc"]["stock"],
+        "ratio_photo": Plant["ratio_alloc"]["photo"],
+        "ratio_absorp": Plant["ratio_alloc"]["absorp"],
+        "ratio_repro": Plant["ratio_alloc"]["repro"],
+        # Stress
+        "stress_sugar": stress["sugar"][-1] if stress["sugar"] else 0.0,
+        "stress_water": stress["water"][-1] if stress["water"] else 0.0,
+        "phenology_stage": Plant["phenology_stage"],
+    }
+
+
 def history_update(Plant, history, Environment, time):
     """
-    Appends the current state of 'Plant' and 'Environment' to the history dictionary.
+    Appends the current state of 'Plant' and 'Environment' to the history dictionary,
+    according to the active recording profile (see set_recording_profile).
 
     Parameters
     ----------
@@ -85,83 +300,130 @@ def history_update(Plant, history, Environment, time):
     time : int or float
         The current simulation time (in hours).
     """
-    # Time
-    history["time"].append(time)
+    values = snapshot(Plant, Environment, time)
+    profile = recorder["profile"]
 
-    # Biomasses
-    history["biomass_total"].append(Plant["biomass_total"])
-    history["phenology_stage"].append(Plant["phenology_stage"])
-    history["biomass_transport"].append(Plant["biomass"]["transport"])
-    history["biomass_stock"].append(Plant["biomass"]["stock"])   
-    history["biomass_photo"].append(Plant["biomass"]["photo"])
-    history["biomass_absorp"].append(Plant["biomass"]["absorp"])
-    history["biomass_repro"].append(Plant["biomass"]["repro"])
-    history["biomass_necromass"].append(Plant["biomass"]["necromass"])
-
-    # SLAI, health
-    history["slai"].append(Plant["slai"])
-    history["health_state"].append(Plant["health_state"])
-
-    # In/out fluxes
-    history["sugar_in"].append(Plant["flux_in"]["sugar"])
-    history["water_in"].append(Plant["flux_in"]["water"])
-    history["nutrient_in"].append(Plant["flux_in"]["nutrient"])
-
-    # Reserves
-    history["reserve_sugar"].append(Plant["reserve"]["sugar"])
-    history["reserve_water"].append(Plant["reserve"]["water"])
-    history["reserve_nutrient"].append(Plant["reserve"]["nutrient"])
+    if profile == "full":
+        for key, val in values.items():
+            history[key].append(val)
+    else:
+        if profile == "subset":
+            for key in recorder["keys"]:
+                history[key].append(values[key])
 
-    # Soil water
-    history["soil_water"].append(Environment["soil"]["water"])
+        # Rolling windows, trimmed by blocks to keep appends O(1)
+        for key in recorder["window_keys"]:
+            buf = history[key]
+            buf.append(values[key])
+            if len(buf) > 2 * CONTROL_WINDOW:
+                del buf[:-CONTROL_WINDOW]
 
-    # Stomatal and thermal data
-    history["stomatal_conductance"].append(Plant["stomatal_conductance"])
-    history["leaf_angle"].append(Plant["leaf_angle"])
-    history["nutrient_index"].append(Plant["nutrient_index"])
-    history["atmos_temperature"].append(Environment["atmos"]["temperature"])
-    history["leaf_temperature_after"].append(Plant["temperature"]["photo"])
+    if profile != "daily" and not recorder["day_night"]:
+        return
 
-    # Success cycles
-    history["success_extension"].append(Plant["success_cycle"]["extension"])
-    history["success_reproduction"].append(Plant["success_cycle"]["reproduction"])
+    # Online aggregates: close the previous day when entering a new one
+    day_index = time // Gl.ave_day
+    if recorder["current_day"] != day_index:
+        history_flush()
+        recorder["current_day"] = day_index
 
-    # Photosynthesis details
-    history["max_transpiration_capacity"].append(Plant["max_transpiration_capacity"])
-    history["raw_sugar_flux"].append(Plant["diag"].get("raw_sugar_flux", 0.0))
-    history["pot_sugar"].append(Plant["diag"].get("pot_sugar", 0.0))
-    history["actual_sugar"].append(Plant["diag"].get("actual_sugar", 0.0))
-
-    # Environmental data
-    history["atmos_light"].append(Environment["atmos"]["light"])
-    history["rain_event"].append(Environment["rain_event"])
-
-    # Resource usage flags
-    history["reserve_used_maintenance"].append(int(Plant["reserve_used"]["maintenance"]))
-    history["reserve_used_extension"].append(int(Plant["reserve_used"]["extension"]))
-    history["reserve_used_transpiration"].append(int(Plant["reserve_used"]["transpiration"]))
-    # Process costs
-    history["cost_transpiration_water"].append(Plant["cost"]["transpiration"]["water"])
-    history["cost_maintenance_sugar"].append(Plant["cost"]["maintenance"]["sugar"])
-    history["dormancy_index"].append(Plant["dormancy_index"])    
-    history["cost_extension_sugar"].append(Plant["cost"]["extension"]["sugar"])
-    history["cost_extension_water"].append(Plant["cost"]["extension"]["water"])
-    history["cost_extension_nutrient"].append(Plant["cost"]["extension"]["nutrient"])
+    if profile == "daily":
+        accumulate_daily(values)
+    if recorder["day_night"]:
+        accumulate_day_night(values)
 
-    # alloc ratios
-    history["ratio_transport"].append(Plant["ratio_alloc"]["transport"])
-    history["ratio_stock"].append(Plant["ratio_alloc"]["stock"])    
-    history["ratio_photo"].append(Plant["ratio_alloc"]["photo"])
-    history["ratio_absorp"].append(Plant["ratio_alloc"]["absorp"])
-    history["ratio_repro"].append(Plant["ratio_alloc"]["repro"])
 
-    # Stress
-    if Plant["stress_history"]["sugar"]:
-        history["stress_sugar"].append(Plant["stress_history"]["sugar"][-1])
-    else:
-        history["stress_sugar"].append(0.0)
+def accumulate_daily(values):
+    """
+    Adds one hourly snapshot to the running daily sums/min/max.
+    """
+    acc = recorder["acc"]
+    recorder["count"] += 1
+    for key in recorder["keys"]:
+        val = values[key]
+        stats = acc.get(key)
+        if key in CATEGORICAL_KEYS:
+            acc[key] = val
+        elif stats is None:
+            acc[key] = [val, val, val]
+        else:
+            stats[0] += val
+            if val < stats[1]:
+                stats[1] = val
+            if val > stats[2]:
+                stats[2] = val
 
-    if Plant["stress_history"]["water"]:
-        history["stress_water"].append(Plant["stress_history"]["water"][-1])
+
+def accumulate_day_night(values):
+    """
+    Adds one hourly snapshot to the running day or night sums of the current
+    day, depending on the light level (same rule as aggregate_day_night).
+    """
+    if values["atmos_light"] > recorder["threshold_light"]:
+        part = "day"
     else:
-        history["stress_water"].append(0.0)
+        part = "night"
+    recorder["dn_count"][part] += 1
+    sums = recorder["dn_acc"][part]
+    if not sums:
+        sums.update(dict.fromkeys(recorder["numeric_keys"], 0.0))
+    for key in recorder["numeric_keys"]:
+        sums[key] += values[key]
+    for key in recorder["label_keys"]:
+        sums[key] = values[key]
+
+
+def history_flush():
+    """
+    Closes the day being accumulated online (if any) and appends its
+    aggregates to 'daily' and 'day_night'. Called automatically on day change,
+    and once at the end of a run to store the last (possibly partial) day.
+    """
+    if recorder["current_day"] is None:
+        return
+    day_number = recorder["current_day"] + 1
+
+    count = recorder["count"]
+    if count > 0:
+        daily["time"].append(day_number)
+        for key, stats in recorder["acc"].items():
+            if key in CATEGORICAL_KEYS:
+                for stat in ("mean", "min", "max"):
+                    daily[stat].setdefault(key, []).append(stats)
+            else:
+                daily["mean"].setdefault(key, []).append(stats[0] / count)
+                daily["min"].setdefault(key, []).append(stats[1])
+                daily["max"].setdefault(key, []).append(stats[2])
+
+    if recorder["dn_count"]["day"] + recorder["dn_count"]["night"] > 0:
+        for part in ("day", "night"):
+            table = day_night[part]
+            n = recorder["dn_count"][part]
+            sums = recorder["dn_acc"][part]
+            table["time"].append(day_number)
+            for key in recorder["keys"]:
+                if key == "time":
+                    continue
+                if key in CATEGORICAL_KEYS:
+                    val = sums.get(key, "")
+                else:
+                    val = sums[key] / n if n > 0 else 0.0
+                table.setdefault(key, []).append(val)
+
+    recorder["current_day"] = None
+    recorder["count"] = 0
+    recorder["acc"] = {}
+    recorder["dn_count"] = {"day": 0, "night": 0}
+    recorder["dn_acc"] = {"day": {}, "night": {}}
+
+
+def day_night_tables():
+    """
+    Returns (day_data, night_data) built online during the run, with the
+    same layout as aggregate_day_night: one value per day for each channel,
+    and "time" = [1..total_days]. The tables are only filled when the
+    recording profile was set with day_night=True.
+    """
+    day_data = {key: list(values) for key, values in day_night["day"].items()}
+    night_data = {key: list(values) for key, values in day_night["night"].items()}
+    return day_data, night_data
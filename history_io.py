@@ -0,0 +1,261 @@
+# history_io.py
+"""
+Columnar binary export of simulation histories (one run or a batch of runs).
+
+Supported formats (chosen from the file extension):
+  - ".npz"               : compressed NumPy archive (compact, no memory mapping)
+  - ".parquet"           : compressed Parquet file (requires pyarrow)
+  - ".arrow"/".feather"  : Arrow IPC file, memory-mappable, zero-copy when
+                           written with compression=None (requires pyarrow)
+  - any other path       : directory with one ".npy" file per channel plus
+                           "metadata.json", memory-mappable with NumPy only
+
+A batch stores all runs one after the other in the same columns, with a
+"run_index" column and the per-run offsets in the metadata, so that reading
+one run back is a slice (a view when the file is memory mapped).
+
+All comments in English, while history keys remain in French.
+"""
+
+import json
+import os
+import time as _time
+
+import numpy as np
+
+import global_constants as Gl
+import Plant_def as Pl
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = None
+    pq = None
+
+
+METADATA_KEY = b"plantroid"
+
+
+def run_metadata(species_name, parameters=None, seed=None, **extra):
+    """
+    Builds the metadata stored with a run.
+
+    Parameters
+    ----------
+    species_name : str
+        Key of the species in Plant_def.species_db.
+    parameters : dict, optional
+        Parameters actually used (default: the species_db entry).
+    seed : int, optional
+        Seed of the random weather, if any.
+    **extra
+        Any other JSON-serialisable information (environment settings, ...).
+
+    Returns
+    -------
+    dict
+    """
+    if parameters is None:
+        parameters = Pl.species_db.get(species_name, {})
+    meta = {
+        "species": species_name,
+        "parameters": parameters,
+        "seed": seed,
+        "model_version": Gl.MODEL_VERSION,
+        "created": _time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    meta.update(extra)
+    return meta
+
+
+def history_to_columns(history):
+    """
+    Converts a history dictionary (lists of values) into NumPy columns.
+    Only the channels recorded at every step (same length as "time") are kept.
+    """
+    n = len(history["time"])
+    return {key: np.asarray(values)
+            for key, values in history.items() if len(values) == n}
+
+
+def save_history(path, history, metadata=None, compression="zstd"):
+    """
+    Writes one run's history (see module docstring for the formats).
+
+    Parameters
+    ----------
+    path : str
+        Output file or directory.
+    history : dict
+        History dictionary (e.g. Hi.history) or already built columns.
+    metadata : dict, optional
+        Run metadata, typically from run_metadata().
+    compression : str or None
+        Codec for Parquet / Arrow outputs.
+    """
+    save_batch(path, [(history, metadata)], compression=compression)
+
+
+def save_batch(path, runs, compression="zstd"):
+    """
+    Writes several runs into the same columnar file.
+
+    Parameters
+    ----------
+    path : str
+        Output file or directory.
+    runs : iterable of (history, metadata)
+        Histories must share their channels.
+    compression : str or None
+        Codec for Parquet / Arrow outputs.
+    """
+    parts = []
+    run_meta = []
+    for history, meta in runs:
+        parts.append(history_to_columns(history))
+        run_meta.append(meta or {})
+    if not parts:
+        raise ValueError("No run to save")
+
+    keys = [key for key in parts[0] if all(key in part for part in parts)]
+    lengths = [len(part["time"]) for part in parts]
+    offsets = np.concatenate(([0], np.cumsum(lengths))).tolist()
+
+    columns = {key: np.concatenate([part[key] for part in parts]) for key in keys}
+    columns["run_index"] = np.repeat(np.arange(len(parts), dtype=np.int32), lengths)
+    metadata = {
+        "model_version": Gl.MODEL_VERSION,
+        "offsets": offsets,
+        "runs": run_meta,
+    }
+    _write_columns(path, columns, metadata, compression)
+
+
+def load_history(path, mmap=True):
+    """
+    Reads back a single-run file written by save_history.
+
+    Returns
+    -------
+    (columns, metadata) : (dict of np.ndarray, dict)
+    """
+    columns, metadata = load_batch(path, mmap=mmap)
+    columns.pop("run_index", None)
+    runs = metadata.get("runs", [{}])
+    return columns, runs[0] if runs else {}
+
+
+def load_batch(path, mmap=True):
+    """
+    Reads back a file written by save_batch.
+
+    Parameters
+    ----------
+    path : str
+        File or directory to read.
+    mmap : bool
+        Memory map the data instead of loading it (".npy" directories and
+        uncompressed Arrow files; ignored for ".npz").
+
+    Returns
+    -------
+    (columns, metadata) : (dict of np.ndarray, dict)
+        metadata["runs"] holds the per-run metadata and metadata["offsets"]
+        the row boundaries of each run (see iter_runs).
+    """
+    fmt = _format_of(path)
+    if fmt == "npz":
+        with np.load(path) as data:
+            columns = {key: data[key] for key in data.files if key != "__metadata__"}
+            metadata = json.loads(str(data["__metadata__"]))
+        return columns, metadata
+
+    if fmt == "npy":
+        with open(os.path.join(path, "metadata.json")) as f:
+            metadata = json.load(f)
+        mode = "r" if mmap else None
+        columns = {key: np.load(os.path.join(path, key + ".npy"), mmap_mode=mode)
+                   for key in metadata["columns"]}
+        return columns, metadata
+
+    _require_pyarrow()
+    if fmt == "parquet":
+        table = pq.read_table(path, memory_map=mmap)
+    else:
+        source = pa.memory_map(path, "r") if mmap else pa.OSFile(path, "rb")
+        table = pa.ipc.open_file(source).read_all()
+    metadata = json.loads(table.schema.metadata[METADATA_KEY])
+    columns = {name: table.column(name).to_numpy() for name in table.column_names}
+    return columns, metadata
+
+
+def iter_runs(columns, metadata):
+    """
+    Yields (columns_of_run, run_metadata) for each run of a batch,
+    slicing the columns without copying them.
+    """
+    offsets = metadata["offsets"]
+    for i, meta in enumerate(metadata["runs"]):
+        start, stop = offsets[i], offsets[i + 1]
+        yield ({key: col[start:stop] for key, col in columns.items()
+                if key != "run_index"}, meta)
+
+
+###############################################
+#               FORMAT BACKENDS               #
+###############################################
+
+def _format_of(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".npz":
+        return "npz"
+    if ext == ".parquet":
+        return "parquet"
+    if ext in (".arrow", ".feather"):
+        return "arrow"
+    return "npy"
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("Parquet/Arrow export requires the 'pyarrow' package; "
+                          "use a .npz file or a .npy directory instead")
+
+
+def _json_default(obj):
+    # NumPy scalars and arrays found in Plant parameters
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Not JSON serialisable: {type(obj).__name__}")
+
+
+def _write_columns(path, columns, metadata, compression):
+    fmt = _format_of(path)
+    meta_json = json.dumps(metadata, default=_json_default)
+
+    if fmt == "npz":
+        np.savez_compressed(path, __metadata__=np.array(meta_json), **columns)
+        return
+
+    if fmt == "npy":
+        os.makedirs(path, exist_ok=True)
+        for key, col in columns.items():
+            np.save(os.path.join(path, key + ".npy"), col)
+        full_meta = dict(json.loads(meta_json), columns=list(columns))
+        with open(os.path.join(path, "metadata.json"), "w") as f:
+            json.dump(full_meta, f)
+        return
+
+    _require_pyarrow()
+    table = pa.table({key: pa.array(col) for key, col in columns.items()})
+    table = table.replace_schema_metadata({METADATA_KEY: meta_json.encode()})
+    if fmt == "parquet":
+        pq.write_table(table, path, compression=compression or "none")
+    else:
+        options = pa.ipc.IpcWriteOptions(compression=compression)
+        with pa.OSFile(path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+                writer.write_table(table)
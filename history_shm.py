@@ -0,0 +1,267 @@
+# history_shm.py
+"""
+Shared-memory return of run histories from worker processes.
+
+A worker of a process pool returns its objectives and a small handle instead
+of the history itself: the hourly channels (the columns of
+history_io.history_to_columns, phenology stages stored as int8 codes of
+phenology_def.STAGE_CODES) are written into one
+multiprocessing.shared_memory block, and only the block name and the
+column layout travel back through the pool. The parent maps the block
+(SharedHistory): its columns are NumPy views of the shared memory, with no
+copy and no unpickling of millions of Python floats.
+
+The parent owns the blocks: a SharedHistory unlinks its block on release()
+(or at garbage collection); columns still needed afterwards must be copied
+first. If a batch fails, the blocks already exported by its other runs are
+unlinked before the error is raised. Columns can be written to disk directly
+(history_io.save_batch accepts SharedHistory.columns as a history).
+
+Only numeric channels fit in a block: a text channel other than the stage
+channels of STAGE_KEYS is refused (ValueError) rather than dropped.
+
+All comments in English, while history keys remain in French.
+"""
+
+import weakref
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+import Plant_def as Pl
+import history_def as Hi
+import history_io as Io
+import phenology_def as Ph
+import optim_GA as Ga
+
+# Recording of the runs whose histories are returned: every channel, every hour
+RECORDING = {"profile": "full", "day_night": False}
+
+# Categorical channels stored as stage codes
+STAGE_KEYS = ("phenology_stage",)
+
+# Code of a stage missing from STAGE_CODES (e.g. "dead")
+UNKNOWN_STAGE = -1
+
+_ALIGN = 8
+
+
+def encode_history(history):
+    """
+    NumPy columns of a history (channels recorded every hour), the stage
+    channels as int8 codes.
+    """
+    columns = Io.history_to_columns(history)
+    for key in STAGE_KEYS:
+        if key in columns:
+            columns[key] = np.array(
+                [Ph.STAGE_CODES.get(stage, UNKNOWN_STAGE) for stage in history[key]],
+                dtype=np.int8)
+    return columns
+
+
+def decode_stages(codes):
+    """
+    Stage names of an array of stage codes (None for UNKNOWN_STAGE).
+    """
+    return [Ph.STAGES[code] if code >= 0 else None for code in codes.tolist()]
+
+
+def export_columns(columns):
+    """
+    Writes columns into a new shared memory block and returns its handle
+    {"name", "length", "channels": [(key, dtype, offset), ...]}.
+
+    Raises ValueError for a text or object column (encode the stage
+    channels first, see encode_history).
+
+    The block is left to the process that attaches it (SharedHistory), which
+    unlinks it.
+    """
+    layout, size = [], 0
+    for key, values in columns.items():
+        values = np.ascontiguousarray(values)
+        if values.dtype.kind in "OSU":
+            raise ValueError(
+                f"Channel {key!r} is not numeric ({values.dtype}) and cannot "
+                f"be shared; only {STAGE_KEYS} are encoded")
+        layout.append((key, values, size))
+        size += -(-values.nbytes // _ALIGN) * _ALIGN
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    try:
+        for key, values, offset in layout:
+            target = np.ndarray(values.shape, values.dtype, buffer=shm.buf,
+                                offset=offset)
+            target[...] = values
+            del target
+    finally:
+        shm.close()
+    # Ownership goes to the parent: this process must not unlink the block
+    # when it exits
+    resource_tracker.unregister(shm._name, "shared_memory")
+    n = len(columns["time"]) if "time" in columns else 0
+    return {"name": shm.name, "length": n,
+            "channels": [(key, values.dtype.str, offset)
+                         for key, values, offset in layout]}
+
+
+def _unlink(shm):
+    try:
+        shm.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def discard_handle(handle):
+    """
+    Unlinks the block of a handle that will not be attached.
+    """
+    try:
+        shm = shared_memory.SharedMemory(name=handle["name"])
+    except FileNotFoundError:
+        return
+    shm.close()
+    _unlink(shm)
+
+
+class SharedHistory:
+    """
+    History of one run mapped from a shared memory block (export_columns).
+
+    Attributes
+    ----------
+    columns : dict of ndarray
+        Views of the shared memory, one per channel (stage codes for
+        STAGE_KEYS).
+    length : int
+        Number of recorded hours.
+    """
+
+    def __init__(self, handle):
+        self.length = handle["length"]
+        self._shm = shared_memory.SharedMemory(name=handle["name"])
+        self.columns = {
+            key: np.ndarray((self.length,), np.dtype(dtype), buffer=self._shm.buf,
+                            offset=offset)
+            for key, dtype, offset in handle["channels"]
+        }
+        self._finalizer = weakref.finalize(self, _unlink, self._shm)
+
+    def stages(self, key="phenology_stage"):
+        """
+        Stage names of a stage channel.
+        """
+        return decode_stages(self.columns[key])
+
+    def to_history(self):
+        """
+        Copy as a history dictionary of lists (the format of Hi.history).
+        """
+        history = {key: values.tolist() for key, values in self.columns.items()}
+        for key in STAGE_KEYS:
+            if key in history:
+                history[key] = self.stages(key)
+        return history
+
+    def release(self):
+        """
+        Unmaps and unlinks the block; the columns are no longer usable.
+        """
+        self.columns = {}
+        self._shm.close()
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+
+def run_with_history(individual, n_hours=None, settings=None, seed=None,
+                     recording=None):
+    """
+    optim_GA.run_individual with a recording profile keeping the hourly
+    history (default: RECORDING); returns (objectives, handle).
+    """
+    saved_recording = Hi.recording_settings()
+    Hi.set_recording_profile(**(recording or RECORDING))
+    try:
+        objectives = Ga.run_individual(individual, n_hours, settings, seed)
+        handle = export_columns(encode_history(Hi.history))
+    finally:
+        Hi.set_recording_profile(**saved_recording)
+    return objectives, handle
+
+
+def _run_task(args):
+    return run_with_history(*args)
+
+
+def evaluate_batch_with_histories(individuals, species_name, n_hours=None,
+                                  settings=None, n_workers=None, pool=None,
+                                  seeds=None, recording=None):
+    """
+    Objectives and histories of a batch of individuals (arguments of
+    optim_GA.evaluate_batch, plus the recording profile of the runs).
+
+    Returns
+    -------
+    list of (dict, SharedHistory)
+        Release the histories (SharedHistory.release or a with block) once
+        they are no longer needed. If a run fails, no block of the batch is
+        left behind and the error of the first failed run is raised.
+    """
+    if seeds is None or isinstance(seeds, int):
+        seeds = [seeds] * len(individuals)
+    tasks = [(ind, n_hours, settings, seed, recording)
+             for ind, seed in zip(individuals, seeds)]
+    if pool is not None:
+        return _collect(tasks, pool)
+    if n_workers is not None and n_workers > 1:
+        with Ga.make_pool(species_name, n_workers) as new_pool:
+            return _collect(tasks, new_pool)
+    return _collect(tasks)
+
+
+def _collect(tasks, pool=None):
+    # Runs the tasks and maps their blocks. On an error, the blocks of the
+    # runs already finished are unlinked before the error is raised (with a
+    # pool, the other runs are waited for, so that none of their blocks is
+    # left behind)
+    pending = ([pool.apply_async(_run_task, (task,)) for task in tasks]
+               if pool is not None else None)
+    results, batch, error = [], [], None
+    try:
+        for i, task in enumerate(tasks):
+            try:
+                results.append(pending[i].get() if pending is not None
+                               else _run_task(task))
+            except Exception as exc:
+                error = error or exc
+                if pending is None:
+                    break
+        if error is not None:
+            raise error
+        for objectives, handle in results:
+            batch.append((objectives, SharedHistory(handle)))
+        return batch
+    except BaseException:
+        for _, shared in batch:
+            shared.release()
+        for _, handle in results[len(batch):]:
+            discard_handle(handle)
+        raise
+
+
+if __name__ == "__main__":
+    import global_constants as Gl
+    Pl.set_plant_species(Pl.Plant, "quercus_coccifera", Pl.species_db)
+    batch = evaluate_batch_with_histories(
+        [{"alloc_repro_max": a} for a in (0.3, 0.6, 0.9)], "quercus_coccifera",
+        n_hours=Gl.max_cycles, n_workers=2, seeds=0)
+    for objectives, shared in batch:
+        with shared:
+            print(objectives, shared.length,
+                  float(shared.columns["biomass_total"].max()))
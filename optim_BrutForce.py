@@ -1,16 +1,30 @@
 
 import time_loop as Ti
 import global_constants as Gl
-import copy
+import itertools
+import random
 import numpy as np
 import Plant_def as Pl
+import Environnement_def as Ev
+import state_clone as Sc
+import sweep_journal as Sj
 
-def optimize_parameters():
+# Grille par défaut : valeurs testées pour chaque paramètre
+# (vous pouvez ajuster les min, max et pas selon vos besoins)
+PARAM_GRID = {
+    "r_max": np.linspace(0.001, 0.01, 3),
+    "alpha": np.linspace(0.0001, 0.001, 3),
+    "light_absorption_fraction": np.linspace(0.5, 0.9, 3),
+    "root_absorption_coefficient": np.linspace(0.001, 0.01, 3),
+    "transpiration_coefficient": np.linspace(0.001, 0.01, 3),
+}
+
+def optimize_parameters(journal=None, seed=None, species_name=None, grid=None):
     """
     Effectue une recherche par grille (grid search) pour trouver la 
     combinaison de 5 paramètres qui maximise la biomasse totale finale.
     
-    Paramètres à optimiser:
+    Paramètres à optimiser (PARAM_GRID):
       1) r_max
       2) alpha
       3) light_absorption_fraction
@@ -19,83 +33,127 @@ def optimize_parameters():
 
     Retourne un dictionnaire contenant la meilleure configuration 
     et la biomasse finale associée.
+
+    journal : fichier journal (sweep_journal), optionnel. Chaque
+    combinaison simulée y est enregistrée avec sa biomasse finale ; une
+    recherche interrompue puis relancée avec le même fichier ne refait que
+    les combinaisons manquantes. L'espèce, la grille, la durée et la graine
+    sont décrites dans le journal : une recherche relancée avec d'autres
+    valeurs est refusée.
+
+    seed : graine de la météo synthétique, la même pour toutes les
+    combinaisons (random.seed avant chaque simulation, l'état aléatoire de
+    l'appelant est restauré ensuite). Obligatoire avec un journal : sans
+    graine, une biomasse relue du journal ne serait pas comparable à une
+    biomasse recalculée.
+
+    species_name : espèce de départ (clé de Pl.species_db), appliquée à une
+    copie de Pl.Plant ; par défaut la plante courante Pl.Plant.
+    Obligatoire avec un journal.
+
+    grid : {paramètre: valeurs testées}, par défaut PARAM_GRID.
     """
+    if journal is not None and (seed is None or species_name is None):
+        raise ValueError("optimize_parameters : un journal exige une graine "
+                         "(seed) et une espèce (species_name), sinon les "
+                         "simulations ne sont pas reproductibles")
+
+    grid = {name: [float(v) for v in values]
+            for name, values in (grid or PARAM_GRID).items()}
 
-    # -- Définition des plages de valeurs à tester pour chaque paramètre --
-    # Vous pouvez ajuster les min, max et pas selon vos besoins.
-    r_max_values   = np.linspace(0.001, 0.01, 3)     # exemple: 3 valeurs
-    alpha_values   = np.linspace(0.0001, 0.001, 3)
-    light_abs_values = np.linspace(0.5, 0.9, 3)
-    root_abs_values  = np.linspace(0.001, 0.01, 3)
-    trans_coef_values = np.linspace(0.001, 0.01, 3)
+    # Plante de départ, commune à toutes les combinaisons
+    if species_name is None:
+        base_plant = Pl.Plant
+    else:
+        base_plant = Sc.clone_plant(Pl.Plant)
+        Pl.set_plant_species(base_plant, species_name, Pl.species_db)
+        # set_plant_species référence les tables de species_db : second
+        # clone pour que les simulations ne les modifient pas
+        base_plant = Sc.clone_plant(base_plant)
+
+    # Seule la biomasse finale est utilisée : on n'enregistre presque rien
+    import history_def as Hi
+    saved_recording = Hi.recording_settings()
+    Hi.set_recording_profile("subset", keys=[], day_night=False)
 
     # Variable pour suivre le maximum
     best_config = None
     best_biomass = -1.0
 
-    # -- Parcours de toutes les combinaisons possibles --
-    for r_max in r_max_values:
-        for alpha in alpha_values:
-            for light_abs in light_abs_values:
-                for root_abs in root_abs_values:
-                    for trans_coef in trans_coef_values:
-                        
-                        # Copie profonde de la plante initiale
-                        Plant_copy = copy.deepcopy(Pl.Plant)
-                        
-                        # Réinitialiser l'environnement également si besoin
-                        # (cela dépend si on veut que l'environnement reparte
-                        #  de zéro ou continue tel quel).
-                        # Par exemple:
-                        # Environment_copy = copy.deepcopy(Ev.Environment)
-
-                        # -- Modifier les paramètres --
-                        Plant_copy["r_max"] = r_max
-                        Plant_copy["alpha"] = alpha
-                        Plant_copy["light_absorption_fraction"] = light_abs
-                        Plant_copy["root_absorption_coefficient"] = root_abs
-                        Plant_copy["transpiration_coefficient"]  = trans_coef
-
-                        # -- Lancer la simulation --
-                        # On utilise la structure 'run_simulation_collect_data',
-                        # mais on doit passer la copie de Plant et un nouveau history.
-                        # Pour rendre cela possible, il faut éventuellement adapter
-                        # la fonction dans time_loop.py 
-                        # ou bien affecter à Pl.Plant = Plant_copy avant l’appel.
-                        # Ici, on fait une "astuce" : on écrase la Pl.Plant globale
-                        # TEMPORAIREMENT, puis on la restaure ensuite.
-                        
-                        original_plant = Pl.Plant  # on garde l'original
-                        Pl.Plant = Plant_copy      # on met la copie
-                        
-                        # Remettre l'historique à zéro si la fonction time_loop l'utilise directement
-                        # (Dans le code existant, 'history' est global aussi, donc à voir
-                        #  s'il faut également le réinitialiser. Cela dépend de l'implémentation.)
-                        # Par exemple:
-                        import history_def as Hi
-                        for key in Hi.history:
-                            Hi.history[key].clear()
-
-                        # Paramètre max_cycles éventuellement plus petit pour accélérer l'optim
-                        # (sinon vous faites l'optim sur la durée complète).
-                        data, final_Plant, final_Env = Ti.run_simulation_collect_data(Gl.max_cycles)
-
-                        # Restaure la Plant globale
-                        Pl.Plant = original_plant
-
-                        # -- Évalue la biomasse finale --
-                        final_biomass = final_Plant["biomass_total"]
-
-                        # -- Compare et stocke la meilleure config --
-                        if final_biomass > best_biomass:
-                            best_biomass = final_biomass
-                            best_config = {
-                                "r_max": r_max,
-                                "alpha": alpha,
-                                "light_absorption_fraction": light_abs,
-                                "root_absorption_coefficient": root_abs,
-                                "transpiration_coefficient": trans_coef
-                            }
+    def simulate(config):
+        """
+        Simule une combinaison de paramètres et renvoie la biomasse finale.
+        """
+        # Copies de la plante et de l'environnement initiaux : chaque
+        # combinaison repart du même état (sol, horloge...)
+        Plant_copy = Sc.clone_plant(base_plant)
+        Environment_copy = Sc.clone_environment(Ev.Environment)
+
+        # -- Modifier les paramètres --
+        for name, value in config.items():
+            Plant_copy[name] = value
+
+        # -- Lancer la simulation --
+        # Ici, on fait une "astuce" : on écrase Pl.Plant et Ev.Environment
+        # globaux TEMPORAIREMENT, puis on les restaure ensuite.
+        original_plant = Pl.Plant  # on garde les originaux
+        original_env = Ev.Environment
+        Pl.Plant = Plant_copy      # on met les copies
+        Ev.Environment = Environment_copy
+
+        # Remettre l'historique à zéro (l'historique est global)
+        Hi.clear_history(Hi.history)
+
+        # Même météo pour toutes les combinaisons ; le flux aléatoire de
+        # l'appelant est laissé tel quel
+        random_state = random.getstate()
+        if seed is not None:
+            random.seed(seed)
+        try:
+            # Paramètre max_cycles éventuellement plus petit pour accélérer
+            # l'optim (sinon vous faites l'optim sur la durée complète).
+            data, final_Plant, final_Env = Ti.run_simulation_collect_data(Gl.max_cycles)
+        finally:
+            if seed is not None:
+                random.setstate(random_state)
+            # Restaure les états globaux
+            Pl.Plant = original_plant
+            Ev.Environment = original_env
+
+        # -- Évalue la biomasse finale --
+        return final_Plant["biomass_total"]
+
+    # Journal des combinaisons déjà simulées (reprise après interruption)
+    sweep = (Sj.SweepJournal(journal, {"function": "optimize_parameters",
+                                       "species": species_name,
+                                       "grid": grid,
+                                       "max_cycles": Gl.max_cycles,
+                                       "seed": seed})
+             if journal is not None else None)
+
+    try:
+        # -- Parcours de toutes les combinaisons possibles --
+        # (le dernier paramètre varie le plus vite)
+        for values in itertools.product(*grid.values()):
+            config = dict(zip(grid, values))
+            if sweep is None:
+                final_biomass = simulate(config)
+            else:
+                # Combinaison déjà journalisée : biomasse relue
+                final_biomass = sweep.run(
+                    Sj.run_key(species=species_name, seed=seed, **config),
+                    simulate, config)
+
+            # -- Compare et stocke la meilleure config --
+            if final_biomass > best_biomass:
+                best_biomass = final_biomass
+                best_config = config
+    finally:
+        # Journal fermé et profil d'enregistrement de l'appelant restauré,
+        # même si la recherche est interrompue
+        if sweep is not None:
+            sweep.close()
+        Hi.set_recording_profile(**saved_recording)
 
     # -- Affichage du résultat --
     print("================================================")
@@ -0,0 +1,227 @@
+# optim_CMAES.py
+"""
+CMA-ES (covariance matrix adaptation evolution strategy) optimiser for
+Plantroid model parameters.
+
+The search runs in a normalised space: each parameter is mapped to [0, 1]
+between its bounds, on a log scale when its bounds are positive and span at
+least one decade (e.g. watt_to_sugar_coeff, stomatal_density), linearly
+otherwise. Every generation is sampled at once and evaluated as one batch
+(optim_GA.evaluate_batch, optionally on a process pool). The fitness is the
+GA one (optim_GA.fitness_from_objectives), maximised.
+
+Out-of-bounds samples are evaluated at their projection on the bounds; the
+fitness used for the ranking is lowered by the squared distance to the
+projection, so that the distribution moves back inside the box.
+
+All comments in English, while variable/function names follow the project.
+"""
+
+import math
+
+import numpy as np
+
+import Plant_def as Pl
+import optim_GA as Ga
+
+
+def log_scaled(bounds, min_ratio=10.0):
+    """
+    True if a parameter is searched on a log scale: positive bounds spanning
+    at least 'min_ratio'.
+    """
+    low, high = sorted(bounds)
+    return low > 0.0 and high / low >= min_ratio
+
+
+class ParameterSpace:
+    """
+    Mapping between parameter dictionaries and points of the unit box.
+    """
+
+    def __init__(self, param_bounds):
+        self.names = list(param_bounds)
+        self.log = np.array([log_scaled(param_bounds[n]) for n in self.names])
+        bounds = np.array([sorted(param_bounds[n]) for n in self.names], dtype=float)
+        bounds[self.log] = np.log(bounds[self.log])
+        self.low = bounds[:, 0]
+        self.span = bounds[:, 1] - bounds[:, 0]
+
+    @property
+    def dim(self):
+        return len(self.names)
+
+    def to_unit(self, individual):
+        x = np.array([individual[n] for n in self.names], dtype=float)
+        x[self.log] = np.log(x[self.log])
+        return (x - self.low) / self.span
+
+    def to_individual(self, u):
+        x = self.low + np.clip(u, 0.0, 1.0) * self.span
+        x[self.log] = np.exp(x[self.log])
+        return {n: float(v) for n, v in zip(self.names, x)}
+
+
+def cmaes_optimization(
+    species_name="Ble",
+    population_size=None,
+    max_evaluations=200,
+    sigma0=0.3,
+    x0=None,
+    param_bounds=None,
+    seed=None,
+    weather_seed=0,
+    n_workers=None,
+    n_hours=None,
+    settings=None,
+    tol_sigma=1e-4,
+    **fitness_params
+):
+    """
+    Maximises the GA fitness with CMA-ES.
+
+    Parameters
+    ----------
+    species_name : str
+        Key of the plant species used in Plant_def.species_db.
+    population_size : int, optional
+        Samples per generation (default: 4 + floor(3 ln n), n = number of
+        parameters).
+    max_evaluations : int
+        Budget of simulations; must cover at least one generation
+        (population_size simulations).
+    sigma0 : float
+        Initial step size, in the unit box.
+    x0 : dict, optional
+        Initial mean (parameter values); default: centre of the box.
+    param_bounds : dict, optional
+        Parameter bounds (default: optim_GA.PARAM_BOUNDS).
+    seed : int, optional
+        Seed of the sampling.
+    weather_seed : int
+        Weather seed shared by all runs, so that samples are compared under
+        the same synthetic weather in every generation.
+    n_workers : int, optional
+        If > 1, generations are evaluated on a process pool.
+    n_hours, settings :
+        Horizon and model settings of the runs (optim_GA.run_individual).
+    tol_sigma : float
+        Stops when the step size times the largest standard deviation of
+        the distribution falls below this value.
+    **fitness_params
+        Constraints and weights of optim_GA.fitness_from_objectives.
+
+    Returns
+    -------
+    tuple
+        (best_solution, best_fitness, info); info holds "evaluations",
+        "generations", "best_per_generation" and "sigma" (step size at the
+        end of each generation).
+    """
+    param_bounds = param_bounds or Ga.PARAM_BOUNDS
+    space = ParameterSpace(param_bounds)
+    n = space.dim
+    rng = np.random.default_rng(seed)
+
+    # Strategy parameters (Hansen's defaults)
+    lam = population_size or 4 + int(3 * math.log(n))
+    if max_evaluations < lam:
+        raise ValueError(
+            f"max_evaluations={max_evaluations} is smaller than one "
+            f"generation ({lam} simulations)")
+    mu = lam // 2
+    weights = math.log(mu + 0.5) - np.log(np.arange(1, mu + 1))
+    weights /= weights.sum()
+    mueff = 1.0 / np.sum(weights ** 2)
+    cc = (4 + mueff / n) / (n + 4 + 2 * mueff / n)
+    cs = (mueff + 2) / (n + mueff + 5)
+    c1 = 2 / ((n + 1.3) ** 2 + mueff)
+    cmu = min(1 - c1, 2 * (mueff - 2 + 1 / mueff) / ((n + 2) ** 2 + mueff))
+    damps = 1 + 2 * max(0.0, math.sqrt((mueff - 1) / (n + 1)) - 1) + cs
+    chi_n = math.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n ** 2))
+
+    # Distribution state
+    mean = space.to_unit(x0) if x0 else np.full(n, 0.5)
+    sigma = sigma0
+    C = np.eye(n)
+    B = np.eye(n)
+    D = np.ones(n)
+    pc = np.zeros(n)
+    ps = np.zeros(n)
+
+    Pl.set_plant_species(Pl.Plant, species_name, Pl.species_db)
+    pool = Ga.make_pool(species_name, n_workers) if n_workers and n_workers > 1 else None
+
+    info = {"evaluations": 0, "generations": 0, "best_per_generation": [],
+            "sigma": []}
+    best_solution, best_fitness = None, -np.inf
+    try:
+        while info["evaluations"] + lam <= max_evaluations:
+            # Sample and evaluate one generation
+            z = rng.standard_normal((lam, n))
+            y = z @ (B * D).T
+            u = mean + sigma * y
+            individuals = [space.to_individual(ui) for ui in u]
+            objectives = Ga.evaluate_batch(individuals, species_name, n_hours,
+                                           settings, pool=pool,
+                                           seeds=weather_seed)
+            fitness = np.array([Ga.fitness_from_objectives(obj, **fitness_params)
+                                for obj in objectives])
+            info["evaluations"] += lam
+            info["generations"] += 1
+
+            i_best = int(np.argmax(fitness))
+            if fitness[i_best] > best_fitness:
+                best_fitness = float(fitness[i_best])
+                best_solution = individuals[i_best]
+            info["best_per_generation"].append(float(fitness[i_best]))
+            print(f"Generation {info['generations']} | Best Fitness = "
+                  f"{fitness[i_best]:.3f} | sigma = {sigma:.3g}")
+
+            # Ranking with a penalty on the distance to the box
+            outside = np.sum((u - np.clip(u, 0.0, 1.0)) ** 2, axis=1)
+            order = np.argsort(-(fitness - outside), kind="stable")[:mu]
+
+            # Mean, evolution paths, covariance and step size updates
+            old_mean = mean
+            y_w = weights @ y[order]
+            mean = old_mean + sigma * y_w
+            C_inv_sqrt = B @ np.diag(1 / D) @ B.T
+            ps = (1 - cs) * ps + math.sqrt(cs * (2 - cs) * mueff) * (C_inv_sqrt @ y_w)
+            gen = info["generations"]
+            hsig = (np.linalg.norm(ps) / math.sqrt(1 - (1 - cs) ** (2 * gen))
+                    < (1.4 + 2 / (n + 1)) * chi_n)
+            pc = (1 - cc) * pc + hsig * math.sqrt(cc * (2 - cc) * mueff) * y_w
+            rank_mu = (y[order].T * weights) @ y[order]
+            C = ((1 - c1 - cmu) * C
+                 + c1 * (np.outer(pc, pc) + (1 - hsig) * cc * (2 - cc) * C)
+                 + cmu * rank_mu)
+            sigma *= math.exp((cs / damps) * (np.linalg.norm(ps) / chi_n - 1))
+
+            C = np.triu(C) + np.triu(C, 1).T
+            eigenvalues, B = np.linalg.eigh(C)
+            D = np.sqrt(np.maximum(eigenvalues, 1e-20))
+            info["sigma"].append(sigma)
+
+            if sigma * D.max() < tol_sigma:
+                break
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    print("==============================================")
+    print("Best solution found:")
+    for p in best_solution:
+        print(f"{p} = {best_solution[p]:.6g}")
+    print(f"Max score = {best_fitness:.3f} ({info['evaluations']} simulations)")
+    print("==============================================")
+    return best_solution, best_fitness, info
+
+
+if __name__ == "__main__":
+    best_config, best_score, cma_info = cmaes_optimization(
+        species_name="quercus_coccifera",
+        max_evaluations=120,
+        seed=0,
+    )
@@ -5,16 +5,542 @@ Comments and docstrings are in English; variable/function names remain in French
 """
 
 import copy
+import os
+import queue
 import random
+import time
+from contextlib import contextmanager
+from multiprocessing import Pool
 
 import time_loop as Ti
 import Plant_def as Pl
 import Environnement_def as Ev
 import history_def as Hi
+import state_clone as Sc
 import global_constants as Gl
 import run_and_plot_v2 as Rp
 
 
+# Parameter bounds: dictionary that sets a lower and upper limit for each GA parameter
+PARAM_BOUNDS = {
+    # example: "watt_to_sugar_coeff" : (min_val, max_val)
+    "watt_to_sugar_coeff": (1e-4, 1e-6),
+    "alloc_repro_max": (0.5, 1.0),
+    "stomatal_density": (5.0e6, 5.0e8)
+}
+
+# Recording profile of the optimisation runs: only the final state and the
+# last points used by the stability score are needed
+RECORDING = {"profile": "subset", "keys": [], "day_night": False,
+             "window_keys": ["biomass_repro", "biomass_necromass"]}
+
+
+def random_individual(param_bounds=PARAM_BOUNDS, rng=random):
+    """
+    Creates a random individual by sampling each parameter
+    uniformly between its bounds.
+    """
+    ind = {}
+    for name in param_bounds:
+        low, high = param_bounds[name]
+        # Note: the upper is smaller than the lower for "watt_to_sugar_coeff" in original code
+        # we might fix this logic or keep as is. Here we do random.uniform(low, high) as intended.
+        # If (low > high), might need to swap or fix.
+        if low > high:
+            low, high = high, low
+        ind[name] = rng.uniform(low, high)
+    return ind
+
+
+def tournament_selection(pop, fits, k=3, rng=random):
+    """
+    Randomly picks k individuals from 'pop', returns the best one based on 'fits'.
+    """
+    chosen_indices = rng.sample(range(len(pop)), k)
+    best_ind = None
+    best_fit = -1e9
+    for idx in chosen_indices:
+        if fits[idx] > best_fit:
+            best_fit = fits[idx]
+            best_ind = pop[idx]
+    return best_ind
+
+
+def crossover(p1, p2, param_names, rng=random):
+    """
+    Uniform crossover: each parameter is taken from p1 or p2 with 50% chance.
+    """
+    child = {}
+    for name in param_names:
+        if rng.random() < 0.5:
+            child[name] = p1[name]
+        else:
+            child[name] = p2[name]
+    return child
+
+
+def mutate(ind, param_bounds, mutation_rate, rng=random):
+    """
+    Mutates each parameter with 'mutation_rate', picking a random value in bounds.
+    """
+    for name in param_bounds:
+        if rng.random() < mutation_rate:
+            low, high = param_bounds[name]
+            # If low > high in param_bounds, swap to ensure random.uniform is valid
+            if low > high:
+                low, high = high, low
+            ind[name] = rng.uniform(low, high)
+
+
+@contextmanager
+def model_settings(settings=None):
+    """
+    Temporarily sets global model settings (Gl attributes, e.g.
+    {"leaf_temp_method": "linear", "leaf_search_steps": 1}).
+    """
+    settings = settings or {}
+    saved = {name: getattr(Gl, name) for name in settings}
+    for name, value in settings.items():
+        setattr(Gl, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(Gl, name, value)
+
+
+def set_parameter(Plant, Env, name, value):
+    """
+    Sets a model parameter. 'name' is a Plant key ("stomatal_density") or a
+    dotted path starting with "Plant." or "Environment." for nested entries
+    ("Plant.cost_params.photo.sugar", "Environment.soil.water").
+
+    The nested dictionaries along the path are copied before the write, so
+    that tables shared between clones (state_clone) or with
+    Plant_def.species_db are never modified.
+    """
+    path = name.split(".")
+    if path[0] == "Environment":
+        target, path = Env, path[1:]
+    elif path[0] == "Plant":
+        target, path = Plant, path[1:]
+    else:
+        target = Plant
+    for key in path[:-1]:
+        target[key] = dict(target[key])
+        target = target[key]
+    target[path[-1]] = value
+
+
+def get_parameter(Plant, Env, name):
+    """
+    Value of a model parameter named as in set_parameter.
+    """
+    path = name.split(".")
+    if path[0] == "Environment":
+        target, path = Env, path[1:]
+    elif path[0] == "Plant":
+        target, path = Plant, path[1:]
+    else:
+        target = Plant
+    for key in path:
+        target = target[key]
+    return target
+
+
+def run_individual(individual, n_hours=None, settings=None, seed=None):
+    """
+    Runs a Plantroid simulation with the individual's parameters (on clones
+    of the global Plant and Environment, see state_clone) and returns its
+    raw objectives.
+
+    Parameters
+    ----------
+    individual : dict
+        Parameter values (Plant keys or dotted paths, see set_parameter).
+    n_hours : int, optional
+        Simulated hours (default: Gl.max_cycles).
+    settings : dict, optional
+        Model settings of the run (see model_settings).
+    seed : int, optional
+        Seed of the synthetic weather (random.seed before the run; the
+        random state is restored afterwards).
+
+    Returns
+    -------
+    dict
+        "repro" (final reproductive biomass), "necromass", "living"
+        (final living biomass) and "stability" (compute_stability_score).
+    """
+    # The run works on clones: the global states are left untouched
+    original_plant = Pl.Plant
+    original_env = Ev.Environment
+
+    # Copy for local changes
+    plant_copy = Sc.clone_plant(Pl.Plant)
+    env_copy = Sc.clone_environment(Ev.Environment)
+
+    # Apply individual's parameters
+    for name, value in individual.items():
+        set_parameter(plant_copy, env_copy, name, value)
+
+    # Replace global references with copies
+    Pl.Plant = plant_copy
+    Ev.Environment = env_copy
+
+    # Clear the history
+    Hi.clear_history(Hi.history)
+
+    # Run simulation (a seeded run leaves the caller's random stream as is)
+    random_state = random.getstate()
+    if seed is not None:
+        random.seed(seed)
+    try:
+        with model_settings(settings):
+            data, final_plant, final_env = Ti.run_simulation_collect_data(
+                Gl.max_cycles if n_hours is None else n_hours)
+    finally:
+        if seed is not None:
+            random.setstate(random_state)
+
+    # Restore global states
+    Pl.Plant = original_plant
+    Ev.Environment = original_env
+
+    return {
+        "repro": final_plant["biomass"]["repro"],
+        "necromass": final_plant["biomass"]["necromass"],
+        "living": final_plant["biomass_total"],
+        "stability": compute_stability_score(Hi.history, last_n=10),
+    }
+
+
+def constraint_penalty(objectives, B_min=1.0, B_max=4.0, BT_min=0.4,
+                       BT_max=0.6, BL_min=0.0, BL_max=0.1):
+    """
+    Sum of the squared distances of the final values to their allowed
+    ranges (0 when every constraint is met).
+    """
+    B_final = objectives["repro"]
+    BT_final = objectives["necromass"]
+    BL_final = objectives["living"]
+    penalty = 0.0
+
+    # B_final in [B_min .. B_max]
+    if B_final < B_min:
+        penalty += (B_min - B_final) ** 2
+    elif B_final > B_max:
+        penalty += (B_final - B_max) ** 2
+
+    # fraction_sucre in [BT_min..BT_max]
+    if BT_final < BT_min:
+        penalty += (BT_min - BT_final) ** 2
+    elif BT_final > BT_max:
+        penalty += (BT_final - BT_max) ** 2
+
+    # fraction in [BL_min..BL_max]
+    if BL_final < BL_min:
+        penalty += (BL_min - BL_final) ** 2
+    elif BL_final > BL_max:
+        penalty += (BL_final - BL_max) ** 2
+
+    return penalty
+
+
+def fitness_from_objectives(objectives, B_min=1.0, B_max=4.0, BT_min=0.4,
+                            BT_max=0.6, BL_min=0.0, BL_max=0.1,
+                            alpha_biomass=1.0, alpha_leaving=1.0,
+                            alpha_sugar=1.0, alpha_stability=1.0):
+    """
+    GA fitness of a run: weighted score of the final values, divided by
+    (1 + penalty) where the penalty sums the squared distances to the
+    allowed ranges.
+    """
+    # Retrieve final values
+    B_final = objectives["repro"]  # example usage
+    BT_final = objectives["necromass"]
+    BL_final = objectives["living"]
+
+    # 1) Base score
+    score_base = (alpha_biomass * B_final
+                  + alpha_sugar * BT_final
+                  + alpha_leaving * BL_final
+                  + alpha_stability * objectives["stability"])
+
+    # 2) Penalty for constraints
+    penalty = constraint_penalty(objectives, B_min, B_max, BT_min, BT_max,
+                                 BL_min, BL_max)
+
+    # 3) Final fitness
+    if score_base < 0:
+        score_base = 0.0
+    fitness = score_base / (1.0 + penalty)
+
+    return fitness
+
+
+def compute_stability_score(history, last_n=10):
+    """
+    Example: compute the slope of the last 'last_n' points of
+    "biomass_repro" and "biomass_necromass", average their absolute slopes,
+    and transform it into [0..1] (the less slope, the higher the stability).
+    """
+    B_list = history["biomass_repro"][-last_n:]
+    S_list = history["biomass_necromass"][-last_n:]
+
+    if len(B_list) < 2 or len(S_list) < 2:
+        return 1.0
+
+    slope_B = linear_slope(B_list)
+    slope_S = linear_slope(S_list)
+    abs_slope = (abs(slope_B) + abs(slope_S)) / 2.0
+
+    stability = 1.0 / (1.0 + abs_slope)
+    return stability
+
+
+def linear_slope(values):
+    """
+    Returns the slope of a simple linear regression on 'values'.
+    """
+    n = len(values)
+    if n < 2:
+        return 0.0
+    x_vals = range(n)
+    sum_x = sum(x_vals)
+    sum_y = sum(values)
+    sum_xy = sum(x * y for x, y in zip(x_vals, values))
+    sum_x2 = sum(x * x for x in x_vals)
+
+    denom = n * sum_x2 - sum_x * sum_x
+    if abs(denom) < 1e-12:
+        return 0.0
+    slope_val = (n * sum_xy - sum_x * sum_y) / denom
+    return slope_val
+
+
+def _init_worker(species_name):
+    # Worker process of evaluate_batch: plant species and recording profile
+    Pl.set_plant_species(Pl.Plant, species_name, Pl.species_db)
+    Hi.set_recording_profile(**RECORDING)
+
+
+def _run_task(args):
+    return run_individual(*args)
+
+
+def _timed_task(args):
+    # run_individual and its duration in the worker
+    start = time.perf_counter()
+    objectives = run_individual(*args)
+    return objectives, time.perf_counter() - start
+
+
+def evaluate_batch(individuals, species_name, n_hours=None, settings=None,
+                   n_workers=None, pool=None, seeds=None):
+    """
+    Raw objectives (run_individual) of a batch of individuals.
+
+    Parameters
+    ----------
+    individuals : list of dict
+    species_name : str
+        Species of the runs (Pl.Plant must already hold it when the batch
+        is evaluated in this process).
+    n_hours, settings :
+        See run_individual.
+    n_workers : int, optional
+        If > 1, the batch is spread over a new process pool of that size.
+    pool : multiprocessing.Pool, optional
+        Existing pool created with make_pool (takes precedence).
+    seeds : int or list of int, optional
+        Weather seed of every run, or one seed per individual (see
+        run_individual).
+
+    Returns
+    -------
+    list of dict
+    """
+    if seeds is None or isinstance(seeds, int):
+        seeds = [seeds] * len(individuals)
+    tasks = [(ind, n_hours, settings, seed)
+             for ind, seed in zip(individuals, seeds)]
+    if pool is not None:
+        return pool.map(_run_task, tasks)
+    if n_workers is not None and n_workers > 1:
+        with make_pool(species_name, n_workers) as new_pool:
+            return new_pool.map(_run_task, tasks)
+    saved_recording = Hi.recording_settings()
+    Hi.set_recording_profile(**RECORDING)
+    try:
+        return [run_individual(*task) for task in tasks]
+    finally:
+        Hi.set_recording_profile(**saved_recording)
+
+
+def make_pool(species_name, n_workers=None):
+    """
+    Process pool whose workers evaluate individuals of 'species_name'
+    (for evaluate_batch).
+    """
+    return Pool(n_workers, initializer=_init_worker, initargs=(species_name,))
+
+
+def ga_steady_state(
+    species_name="Ble",
+    population_size=20,
+    evaluations=200,
+    crossover_rate=0.7,
+    mutation_rate=0.1,
+    n_workers=None,
+    param_bounds=None,
+    seed=None,
+    weather_seed=0,
+    n_hours=None,
+    settings=None,
+    **fitness_params
+):
+    """
+    Asynchronous steady-state variant of ga_multi_criteria_optimization.
+
+    There are no generations: the workers of a process pool are kept busy
+    with one offspring each, and every finished evaluation immediately
+    enters the population (while it is not full) or replaces its worst
+    member if it is better. A new offspring (tournament selection,
+    uniform crossover, mutation on the current population) is then
+    submitted, so that runs of very different durations (early deaths,
+    full-length perennials) never leave a worker waiting for the others.
+
+    Parameters
+    ----------
+    species_name : str
+        Key of the plant species used in Plant_def.species_db.
+    population_size : int
+        Size of the population (at least 3, for the tournaments).
+    evaluations : int
+        Total number of simulations.
+    crossover_rate, mutation_rate : float
+        As in ga_multi_criteria_optimization.
+    n_workers : int, optional
+        Number of worker processes (default: os.cpu_count()); 1 evaluates
+        the offspring one at a time in this process.
+    param_bounds : dict, optional
+        Parameter bounds (default: PARAM_BOUNDS).
+    seed : int, optional
+        Seed of the GA operators (the order in which evaluations finish
+        still depends on the run times).
+    weather_seed : int
+        Weather seed shared by all runs, so that offspring are compared
+        under the same synthetic weather.
+    n_hours, settings :
+        Horizon and model settings of the runs (run_individual).
+    **fitness_params
+        Constraints and weights of fitness_from_objectives.
+
+    Returns
+    -------
+    tuple
+        (best_solution, best_fitness, info); info holds "evaluations",
+        "replacements", "wall_time" and "utilisation" (simulation time
+        summed over the runs / (wall time x workers)).
+    """
+    param_bounds = param_bounds or PARAM_BOUNDS
+    param_names = list(param_bounds)
+    rng = random.Random(seed)
+    n_workers = n_workers or os.cpu_count()
+
+    Pl.set_plant_species(Pl.Plant, species_name, Pl.species_db)
+
+    population, fitnesses = [], []
+    best_solution, best_fitness = None, -1.0
+    info = {"evaluations": 0, "replacements": 0, "wall_time": 0.0,
+            "utilisation": 0.0}
+    busy_time = 0.0
+
+    def next_individual():
+        # Random initial population, offspring once tournaments are possible
+        if submitted < population_size or len(population) < 3:
+            return random_individual(param_bounds, rng)
+        parent1 = tournament_selection(population, fitnesses, 3, rng)
+        parent2 = tournament_selection(population, fitnesses, 3, rng)
+        if rng.random() < crossover_rate:
+            child = crossover(parent1, parent2, param_names, rng)
+        else:
+            child = copy.deepcopy(parent1)
+        mutate(child, param_bounds, mutation_rate, rng)
+        return child
+
+    def insert(individual, fit):
+        # Steady-state replacement of the worst member
+        nonlocal best_solution, best_fitness
+        if len(population) < population_size:
+            population.append(individual)
+            fitnesses.append(fit)
+        else:
+            worst = min(range(len(population)), key=lambda i: fitnesses[i])
+            if fit > fitnesses[worst]:
+                population[worst] = individual
+                fitnesses[worst] = fit
+                info["replacements"] += 1
+        if fit > best_fitness:
+            best_fitness = fit
+            best_solution = copy.deepcopy(individual)
+            print(f"Evaluation {info['evaluations']}/{evaluations} | "
+                  f"Best Fitness = {best_fitness:.3f}")
+
+    submitted = 0
+    start = time.perf_counter()
+    if n_workers <= 1:
+        saved_recording = Hi.recording_settings()
+        Hi.set_recording_profile(**RECORDING)
+        try:
+            while submitted < evaluations:
+                individual = next_individual()
+                submitted += 1
+                objectives, duration = _timed_task(
+                    (individual, n_hours, settings, weather_seed))
+                busy_time += duration
+                info["evaluations"] += 1
+                insert(individual, fitness_from_objectives(objectives, **fitness_params))
+        finally:
+            Hi.set_recording_profile(**saved_recording)
+    else:
+        done = queue.Queue()
+        with make_pool(species_name, n_workers) as pool:
+            def submit():
+                nonlocal submitted
+                individual = next_individual()
+                submitted += 1
+                pool.apply_async(
+                    _timed_task, ((individual, n_hours, settings, weather_seed),),
+                    callback=lambda result: done.put((individual, result)),
+                    error_callback=lambda error: done.put((None, error)))
+
+            while submitted < min(n_workers, evaluations):
+                submit()
+            while info["evaluations"] < evaluations:
+                individual, result = done.get()
+                if individual is None:
+                    raise result
+                objectives, duration = result
+                busy_time += duration
+                info["evaluations"] += 1
+                insert(individual, fitness_from_objectives(objectives, **fitness_params))
+                if submitted < evaluations:
+                    submit()
+
+    info["wall_time"] = time.perf_counter() - start
+    info["utilisation"] = busy_time / (info["wall_time"] * max(1, n_workers))
+
+    print("==============================================")
+    print("Best solution found:")
+    for p in best_solution:
+        print(f"{p} = {best_solution[p]:.6f}")
+    print(f"Max score = {best_fitness:.3f}")
+    print("==============================================")
+    return best_solution, best_fitness, info
+
+
 def ga_multi_criteria_optimization(
     species_name="Ble",
     population_size=20,
@@ -87,207 +613,38 @@ def ga_multi_criteria_optimization(
     # Load species default parameters into the global Plant object
     Pl.set_plant_species(Pl.Plant, species_name, Pl.species_db)
 
+    # Only the final state and the last points used by the stability score
+    # are needed: record almost nothing during the GA runs
+    saved_recording = Hi.recording_settings()
+    Hi.set_recording_profile(**RECORDING)
+
     # 1) Parameter bounds: dictionary that sets a lower and upper limit for each GA parameter
-    param_bounds = {
-        # example: "watt_to_sugar_coeff" : (min_val, max_val)
-        "watt_to_sugar_coeff": (1e-4, 1e-6),
-        "alloc_repro_max": (0.5, 1.0),
-        "stomatal_density": (5.0e6, 5.0e8)
-    }
+    param_bounds = PARAM_BOUNDS
     param_names = list(param_bounds.keys())
+    fitness_params = {
+        "B_min": B_min, "B_max": B_max, "BT_min": BT_min, "BT_max": BT_max,
+        "BL_min": BL_min, "BL_max": BL_max,
+        "alpha_biomass": alpha_biomass, "alpha_leaving": alpha_leaving,
+        "alpha_sugar": alpha_sugar, "alpha_stability": alpha_stability,
+    }
 
     # ----------------------------------------------------------------
     # Population initialization
     # ----------------------------------------------------------------
-    def random_individual():
-        """
-        Creates a random individual by sampling each parameter
-        uniformly between its bounds.
-        """
-        ind = {}
-        for name in param_names:
-            low, high = param_bounds[name]
-            # Note: the upper is smaller than the lower for "watt_to_sugar_coeff" in original code
-            # we might fix this logic or keep as is. Here we do random.uniform(low, high) as intended.
-            # If (low > high), might need to swap or fix.
-            if low > high:
-                low, high = high, low
-            ind[name] = random.uniform(low, high)
-        return ind
-
-    population = [random_individual() for _ in range(population_size)]
+    population = [random_individual(param_bounds) for _ in range(population_size)]
 
     # ----------------------------------------------------------------
     # Evaluation function
     # ----------------------------------------------------------------
     def evaluate(individual):
         """
-        Runs a Plantroid simulation with the individual's parameters, then computes a score.
-
-        Steps:
-          - Copy the global Plant and Environment states
-          - Apply individual's parameters
-          - Run the simulation
-          - Compute final constraints and a final score
-          - Return the fitness
+        Runs a Plantroid simulation with the individual's parameters, then computes a score
+        (run_individual, fitness_from_objectives).
 
         Fitness function is influenced by alpha_biomass, alpha_sugar, alpha_stability, etc.
         Constraints penalize the fitness if outside specified ranges.
         """
-        # Backup global states
-        original_plant = copy.deepcopy(Pl.Plant)
-        original_env = copy.deepcopy(Ev.Environment)
-
-        # Copy for local changes
-        plant_copy = copy.deepcopy(Pl.Plant)
-        env_copy = copy.deepcopy(Ev.Environment)
-
-        # Apply individual's parameters
-        plant_copy["watt_to_sugar_coeff"] = individual["watt_to_sugar_coeff"]
-        plant_copy["alloc_repro_max"] = individual["alloc_repro_max"]
-        plant_copy["stomatal_density"] = individual["stomatal_density"]
-
-        # Replace global references with copies
-        Pl.Plant = plant_copy
-        Ev.Environment = env_copy
-
-        # Clear the history
-        for k in Hi.history:
-            Hi.history[k].clear()
-
-        # Run simulation
-        data, final_plant, final_env = Ti.run_simulation_collect_data(Gl.max_cycles)
-
-        # Restore global states
-        Pl.Plant = original_plant
-        Ev.Environment = original_env
-
-        # Retrieve final values
-        B_final = final_plant["biomass"]["repro"]  # example usage
-        BT_final = final_plant["biomass"]["necromass"]
-        BL_final = final_plant["biomass_total"]
-
-        # 1) Base score
-        stability_score = compute_stability_score(Hi.history, last_n=10)
-        score_base = (alpha_biomass * B_final
-                      + alpha_sugar * BT_final
-                      + alpha_leaving * BL_final
-                      + alpha_stability * stability_score)
-
-        # 2) Penalty for constraints
-        penalty = 0.0
-
-        # B_final in [B_min .. B_max]
-        if B_final < B_min:
-            penalty += (B_min - B_final) ** 2
-        elif B_final > B_max:
-            penalty += (B_final - B_max) ** 2
-
-        # fraction_sucre in [BT_min..BT_max]
-        if BT_final < BT_min:
-            penalty += (BT_min - BT_final) ** 2
-        elif BT_final > BT_max:
-            penalty += (BT_final - BT_max) ** 2
-
-        # fraction in [BL_min..BL_max]
-        if BL_final < BL_min:
-            penalty += (BL_min - BL_final) ** 2
-        elif BL_final > BL_max:
-            penalty += (BL_final - BL_max) ** 2
-
-        # 3) Final fitness
-        if score_base < 0:
-            score_base = 0.0
-        fitness = score_base / (1.0 + penalty)
-
-        return fitness
-
-    # ----------------------------------------------------------------
-    # Stability measure (pente finale)
-    # ----------------------------------------------------------------
-    def compute_stability_score(history, last_n=10):
-        """
-        Example: compute the slope of the last 'last_n' points of
-        "biomass_repro" and "biomass_necromass", average their absolute slopes,
-        and transform it into [0..1] (the less slope, the higher the stability).
-        """
-        B_list = history["biomass_repro"][-last_n:]
-        S_list = history["biomass_necromass"][-last_n:]
-
-        if len(B_list) < 2 or len(S_list) < 2:
-            return 1.0
-
-        slope_B = linear_slope(B_list)
-        slope_S = linear_slope(S_list)
-        abs_slope = (abs(slope_B) + abs(slope_S)) / 2.0
-
-        stability = 1.0 / (1.0 + abs_slope)
-        return stability
-
-    def linear_slope(values):
-        """
-        Returns the slope of a simple linear regression on 'values'.
-        """
-        n = len(values)
-        if n < 2:
-            return 0.0
-        x_vals = range(n)
-        sum_x = sum(x_vals)
-        sum_y = sum(values)
-        sum_xy = sum(x * y for x, y in zip(x_vals, values))
-        sum_x2 = sum(x * x for x in x_vals)
-
-        denom = n * sum_x2 - sum_x * sum_x
-        if abs(denom) < 1e-12:
-            return 0.0
-        slope_val = (n * sum_xy - sum_x * sum_y) / denom
-        return slope_val
-
-    # ----------------------------------------------------------------
-    # Selection (tournament)
-    # ----------------------------------------------------------------
-    def tournament_selection(pop, fits, k=3):
-        """
-        Randomly picks k individuals from 'pop', returns the best one based on 'fits'.
-        """
-        chosen_indices = random.sample(range(len(pop)), k)
-        best_ind = None
-        best_fit = -1e9
-        for idx in chosen_indices:
-            if fits[idx] > best_fit:
-                best_fit = fits[idx]
-                best_ind = pop[idx]
-        return best_ind
-
-    # ----------------------------------------------------------------
-    # Crossover
-    # ----------------------------------------------------------------
-    def crossover(p1, p2):
-        """
-        Uniform crossover: each parameter is taken from p1 or p2 with 50% chance.
-        """
-        child = {}
-        for name in param_names:
-            if random.random() < 0.5:
-                child[name] = p1[name]
-            else:
-                child[name] = p2[name]
-        return child
-
-    # ----------------------------------------------------------------
-    # Mutation
-    # ----------------------------------------------------------------
-    def mutate(ind):
-        """
-        Mutates each parameter with 'mutation_rate', picking a random value in bounds.
-        """
-        for name in param_names:
-            if random.random() < mutation_rate:
-                low, high = param_bounds[name]
-                # If low > high in param_bounds, swap to ensure random.uniform is valid
-                if low > high:
-                    low, high = high, low
-                ind[name] = random.uniform(low, high)
+        return fitness_from_objectives(run_individual(individual), **fitness_params)
 
     # ----------------------------------------------------------------
     # GA main loop
@@ -320,15 +677,18 @@ def ga_multi_criteria_optimization(
             parent2 = tournament_selection(population, fitnesses, k=3)
 
             if random.random() < crossover_rate:
-                child = crossover(parent1, parent2)
+                child = crossover(parent1, parent2, param_names)
             else:
                 child = copy.deepcopy(parent1)
 
-            mutate(child)
+            mutate(child, param_bounds, mutation_rate)
             new_pop.append(child)
 
         population = new_pop
 
+    # Restore the caller's recording profile
+    Hi.set_recording_profile(**saved_recording)
+
     # Final report
     print("==============================================")
     print("Best solution found:")
@@ -0,0 +1,305 @@
+# optim_NSGA2.py
+"""
+NSGA-II multi-objective optimiser for Plantroid model parameters.
+
+Instead of folding the final reproductive biomass, necromass, living biomass
+and stability into one weighted score (optim_GA), the objectives are kept
+separate and a single run returns the whole Pareto front: non-dominated
+sorting with crowding distance (Deb et al., 2002), simulated binary
+crossover and polynomial mutation in the normalised parameter space of
+optim_CMAES (log scale for parameters spanning decades). Each generation is
+evaluated as one batch (optim_GA.evaluate_batch).
+
+The allowed ranges of optim_GA (B_min..BL_max) can be passed as
+constraints: a run that meets them dominates one that does not, and between
+two infeasible runs the smaller violation (optim_GA.constraint_penalty)
+wins. Without them the front covers the unconstrained trade-offs.
+Any weighting of the GA score can then be applied to the front afterwards
+(best_for_weights), without new simulations.
+
+All comments in English, while variable/function names follow the project.
+"""
+
+import numpy as np
+
+import Plant_def as Pl
+import optim_GA as Ga
+import optim_CMAES as Cm
+
+# Objectives kept separate (keys of optim_GA.run_individual), all maximised
+OBJECTIVES = ("repro", "necromass", "living", "stability")
+
+# Constraint arguments of optim_GA.constraint_penalty
+CONSTRAINT_NAMES = ("B_min", "B_max", "BT_min", "BT_max", "BL_min", "BL_max")
+
+
+def dominates(a, b, viol_a=0.0, viol_b=0.0):
+    """
+    Constrained Pareto dominance of objective vector 'a' over 'b'
+    (maximisation).
+    """
+    if viol_a != viol_b:
+        return viol_a < viol_b
+    return bool(np.all(a >= b) and np.any(a > b))
+
+
+def non_dominated_sort(F, violation=None):
+    """
+    Fast non-dominated sorting.
+
+    Parameters
+    ----------
+    F : ndarray (N, M)
+        Objective values, maximised.
+    violation : ndarray (N,), optional
+        Constraint violations (0 = feasible).
+
+    Returns
+    -------
+    list of list
+        Indices of the successive fronts (first front = non-dominated).
+    """
+    N = len(F)
+    violation = np.zeros(N) if violation is None else violation
+    dominated_by = [[] for _ in range(N)]
+    n_dominating = np.zeros(N, dtype=int)
+    for i in range(N):
+        for j in range(i + 1, N):
+            if dominates(F[i], F[j], violation[i], violation[j]):
+                dominated_by[i].append(j)
+                n_dominating[j] += 1
+            elif dominates(F[j], F[i], violation[j], violation[i]):
+                dominated_by[j].append(i)
+                n_dominating[i] += 1
+
+    fronts = [[i for i in range(N) if n_dominating[i] == 0]]
+    while fronts[-1]:
+        next_front = []
+        for i in fronts[-1]:
+            for j in dominated_by[i]:
+                n_dominating[j] -= 1
+                if n_dominating[j] == 0:
+                    next_front.append(j)
+        fronts.append(next_front)
+    return fronts[:-1]
+
+
+def crowding_distance(F):
+    """
+    Crowding distance of the members of one front (inf at the extremes of
+    every objective).
+    """
+    N, M = F.shape
+    distance = np.zeros(N)
+    if N <= 2:
+        distance[:] = np.inf
+        return distance
+    for m in range(M):
+        order = np.argsort(F[:, m], kind="stable")
+        distance[order[0]] = distance[order[-1]] = np.inf
+        span = F[order[-1], m] - F[order[0], m]
+        if span > 0.0:
+            distance[order[1:-1]] += (F[order[2:], m] - F[order[:-2], m]) / span
+    return distance
+
+
+def rank_population(F, violation):
+    """
+    Front rank and crowding distance of every member of a population.
+    """
+    rank = np.zeros(len(F), dtype=int)
+    crowding = np.zeros(len(F))
+    for r, front in enumerate(non_dominated_sort(F, violation)):
+        rank[front] = r
+        crowding[front] = crowding_distance(F[front])
+    return rank, crowding
+
+
+def sbx_crossover(p1, p2, rng, eta=15.0):
+    """
+    Simulated binary crossover of two points of the unit box.
+    """
+    mu = rng.random(len(p1))
+    beta = np.where(mu <= 0.5, (2 * mu) ** (1 / (eta + 1)),
+                    (1 / (2 * (1 - mu))) ** (1 / (eta + 1)))
+    c1 = 0.5 * ((1 + beta) * p1 + (1 - beta) * p2)
+    c2 = 0.5 * ((1 - beta) * p1 + (1 + beta) * p2)
+    return np.clip(c1, 0.0, 1.0), np.clip(c2, 0.0, 1.0)
+
+
+def polynomial_mutation(x, rng, rate, eta=20.0):
+    """
+    Polynomial mutation of a point of the unit box.
+    """
+    x = x.copy()
+    for k in np.flatnonzero(rng.random(len(x)) < rate):
+        mu = rng.random()
+        if mu < 0.5:
+            delta = (2 * mu) ** (1 / (eta + 1)) - 1
+            x[k] += delta * x[k]
+        else:
+            delta = 1 - (2 * (1 - mu)) ** (1 / (eta + 1))
+            x[k] += delta * (1 - x[k])
+    return np.clip(x, 0.0, 1.0)
+
+
+def best_for_weights(front, **fitness_params):
+    """
+    Member of a Pareto front (nsga2_optimization) with the highest GA
+    fitness (optim_GA.fitness_from_objectives) for the given weights and
+    constraints.
+    """
+    return max(front, key=lambda member: Ga.fitness_from_objectives(
+        member["objectives"], **fitness_params))
+
+
+def nsga2_optimization(
+    species_name="Ble",
+    population_size=20,
+    generations=10,
+    crossover_rate=0.9,
+    mutation_rate=None,
+    objectives=OBJECTIVES,
+    param_bounds=None,
+    seed=None,
+    weather_seed=0,
+    n_workers=None,
+    n_hours=None,
+    settings=None,
+    **constraints
+):
+    """
+    NSGA-II run returning the Pareto front of the model objectives.
+
+    Parameters
+    ----------
+    species_name : str
+        Key of the plant species used in Plant_def.species_db.
+    population_size : int
+        Number of individuals per generation.
+    generations : int
+        Number of generations after the initial population.
+    crossover_rate : float
+        Probability of crossing two selected parents.
+    mutation_rate : float, optional
+        Probability of mutating each parameter (default: 1 / number of
+        parameters).
+    objectives : tuple of str
+        Maximised objectives (keys of optim_GA.run_individual).
+    param_bounds : dict, optional
+        Parameter bounds (default: optim_GA.PARAM_BOUNDS).
+    seed : int, optional
+        Seed of the sampling and variation operators.
+    weather_seed : int
+        Weather seed shared by all runs, so that parents and children are
+        compared under the same synthetic weather.
+    n_workers : int, optional
+        If > 1, generations are evaluated on a process pool.
+    n_hours, settings :
+        Horizon and model settings of the runs (optim_GA.run_individual).
+    **constraints
+        Allowed ranges (B_min, B_max, BT_min, BT_max, BL_min, BL_max) of
+        optim_GA.constraint_penalty, applied as constraints when given
+        (the ranges not given keep their optim_GA defaults); other keys
+        are ignored.
+
+    Returns
+    -------
+    tuple
+        (front, info). front is the list of non-dominated members
+        {"parameters", "objectives", "violation"} of the final population;
+        info holds "evaluations" and "front_size" (per generation).
+    """
+    param_bounds = param_bounds or Ga.PARAM_BOUNDS
+    constraints = {k: v for k, v in constraints.items() if k in CONSTRAINT_NAMES}
+    space = Cm.ParameterSpace(param_bounds)
+    rng = np.random.default_rng(seed)
+    mutation_rate = 1.0 / space.dim if mutation_rate is None else mutation_rate
+
+    Pl.set_plant_species(Pl.Plant, species_name, Pl.species_db)
+    pool = Ga.make_pool(species_name, n_workers) if n_workers and n_workers > 1 else None
+
+    def evaluate(U, weather_seed=weather_seed):
+        # Objective matrix, violations and raw objectives of unit-box points
+        individuals = [space.to_individual(u) for u in U]
+        raw = Ga.evaluate_batch(individuals, species_name, n_hours, settings,
+                                pool=pool, seeds=weather_seed)
+        F = np.array([[obj[name] for name in objectives] for obj in raw])
+        if constraints:
+            violation = np.array([Ga.constraint_penalty(obj, **constraints)
+                                  for obj in raw])
+        else:
+            violation = np.zeros(len(raw))
+        return F, violation, raw
+
+    def tournament(rank, crowding):
+        i, j = rng.integers(len(rank), size=2)
+        if rank[i] != rank[j]:
+            return i if rank[i] < rank[j] else j
+        return i if crowding[i] >= crowding[j] else j
+
+    info = {"evaluations": 0, "front_size": []}
+    try:
+        U = rng.random((population_size, space.dim))
+        F, violation, raw = evaluate(U)
+        info["evaluations"] += population_size
+        rank, crowding = rank_population(F, violation)
+
+        for gen in range(generations):
+            # Offspring by tournament selection, SBX and mutation
+            children = []
+            while len(children) < population_size:
+                p1 = U[tournament(rank, crowding)]
+                p2 = U[tournament(rank, crowding)]
+                if rng.random() < crossover_rate:
+                    c1, c2 = sbx_crossover(p1, p2, rng)
+                else:
+                    c1, c2 = p1.copy(), p2.copy()
+                children.append(polynomial_mutation(c1, rng, mutation_rate))
+                children.append(polynomial_mutation(c2, rng, mutation_rate))
+            children = np.array(children[:population_size])
+            F_c, violation_c, raw_c = evaluate(children)
+            info["evaluations"] += population_size
+
+            # Elitist survival: fronts of parents + children, last front cut
+            # by crowding distance
+            U_all = np.vstack([U, children])
+            F_all = np.vstack([F, F_c])
+            violation_all = np.concatenate([violation, violation_c])
+            raw_all = raw + raw_c
+            survivors = []
+            for front in non_dominated_sort(F_all, violation_all):
+                if len(survivors) + len(front) <= population_size:
+                    survivors.extend(front)
+                else:
+                    distance = crowding_distance(F_all[front])
+                    order = np.argsort(-distance, kind="stable")
+                    survivors.extend(np.asarray(front)[order[:population_size - len(survivors)]])
+                    break
+            U, F, violation = U_all[survivors], F_all[survivors], violation_all[survivors]
+            raw = [raw_all[i] for i in survivors]
+            rank, crowding = rank_population(F, violation)
+            info["front_size"].append(int(np.sum(rank == 0)))
+            print(f"Generation {gen + 1}/{generations} | Pareto front: "
+                  f"{info['front_size'][-1]} members")
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    front = [{"parameters": space.to_individual(U[i]),
+              "objectives": raw[i],
+              "violation": float(violation[i])}
+             for i in np.flatnonzero(rank == 0)]
+    return front, info
+
+
+if __name__ == "__main__":
+    pareto_front, nsga_info = nsga2_optimization(
+        species_name="quercus_coccifera",
+        population_size=20,
+        generations=10,
+        seed=0,
+    )
+    for member in pareto_front:
+        print(member["objectives"], member["violation"])
@@ -0,0 +1,205 @@
+# optim_SH.py
+"""
+Multi-fidelity successive-halving optimiser for Plantroid model parameters.
+
+A large set of random candidates is first judged with cheap runs (shorter
+horizon, linearised leaf temperature, coarse leaf-angle search); only the
+best 1/eta of them are promoted to the next, more expensive fidelity, and so
+on up to full-fidelity runs (Gl.max_cycles hours, default model settings).
+The fitness is the GA one (optim_GA.fitness_from_objectives), so results can
+be compared with ga_multi_criteria_optimization.
+
+Night hours already skip the leaf search in the main loop, and the hourly
+processes (turnover, refills) are not time-step independent, so the
+fidelity levels act on the horizon and on the leaf solver/search settings
+only.
+
+All comments in English, while variable/function names follow the project.
+"""
+
+import math
+import random
+import time
+
+import numpy as np
+
+import Plant_def as Pl
+import global_constants as Gl
+import optim_GA as Ga
+
+# Fidelity levels, from the cheapest to full fidelity:
+#   fraction : horizon as a fraction of Gl.max_cycles
+#   settings : model settings of the runs (Ga.model_settings)
+FIDELITIES = [
+    {"fraction": 0.25,
+     "settings": {"leaf_temp_method": "linear", "leaf_search_steps": 1}},
+    {"fraction": 0.5,
+     "settings": {"leaf_temp_method": "Newton", "leaf_search_steps": 1}},
+    {"fraction": 1.0, "settings": {}},
+]
+
+
+def fidelity_hours(fidelity):
+    """
+    Simulated hours of a fidelity level.
+    """
+    return max(1, int(round(fidelity["fraction"] * Gl.max_cycles)))
+
+
+def _ranks(values):
+    # Ranks (0 = smallest) with ties broken by position
+    order = np.argsort(values, kind="stable")
+    ranks = np.empty(len(values))
+    ranks[order] = np.arange(len(values))
+    return ranks
+
+
+def spearman(a, b):
+    """
+    Spearman rank correlation between two sequences.
+    """
+    ra, rb = _ranks(np.asarray(a)), _ranks(np.asarray(b))
+    if np.std(ra) == 0.0 or np.std(rb) == 0.0:
+        return 0.0
+    return float(np.corrcoef(ra, rb)[0, 1])
+
+
+def successive_halving(
+    species_name="Ble",
+    n_candidates=81,
+    eta=3,
+    fidelities=None,
+    param_bounds=None,
+    seed=None,
+    weather_seed=0,
+    n_workers=None,
+    check_full=False,
+    **fitness_params
+):
+    """
+    Successive halving over the fidelity levels.
+
+    Parameters
+    ----------
+    species_name : str
+        Key of the plant species used in Plant_def.species_db.
+    n_candidates : int
+        Number of random candidates judged at the cheapest fidelity.
+    eta : int
+        Only the best ceil(n / eta) candidates of a round are promoted.
+    fidelities : list of dict, optional
+        Fidelity levels (default: FIDELITIES); the last one is taken as the
+        full fidelity.
+    param_bounds : dict, optional
+        Parameter bounds (default: optim_GA.PARAM_BOUNDS).
+    seed : int, optional
+        Seed of the candidate sampling.
+    weather_seed : int
+        Weather seed shared by all runs, so that candidates are compared
+        under the same synthetic weather in every round.
+    n_workers : int, optional
+        If > 1, each round is evaluated as one batch on a process pool.
+    check_full : bool
+        If True, every candidate is also run at full fidelity to check the
+        final ranking against the full-fidelity one (costly: for
+        validation only).
+    **fitness_params
+        Constraints and weights of optim_GA.fitness_from_objectives.
+
+    Returns
+    -------
+    tuple
+        (best_solution, best_fitness, report). best_fitness is the
+        full-fidelity fitness of the best survivor. report holds, per round,
+        the fidelity, the candidates evaluated, their fitness and the wall
+        time; "full_runs" (number of full-fidelity runs) and
+        "equivalent_full_runs" (total simulated hours / full horizon); and,
+        with check_full, "check" (rank of the winner in the full ranking,
+        Spearman correlation of each round with the full fitness).
+    """
+    fidelities = fidelities or FIDELITIES
+    param_bounds = param_bounds or Ga.PARAM_BOUNDS
+    rng = random.Random(seed)
+
+    Pl.set_plant_species(Pl.Plant, species_name, Pl.species_db)
+    candidates = [Ga.random_individual(param_bounds, rng)
+                  for _ in range(n_candidates)]
+
+    pool = Ga.make_pool(species_name, n_workers) if n_workers and n_workers > 1 else None
+    report = {"rounds": [], "full_runs": 0, "equivalent_full_runs": 0.0}
+    full_hours = fidelity_hours(fidelities[-1])
+    survivors = list(range(n_candidates))
+    try:
+        for level, fidelity in enumerate(fidelities):
+            hours = fidelity_hours(fidelity)
+            start = time.perf_counter()
+            objectives = Ga.evaluate_batch([candidates[i] for i in survivors],
+                                           species_name, hours,
+                                           fidelity["settings"], pool=pool,
+                                           seeds=weather_seed)
+            fitness = [Ga.fitness_from_objectives(obj, **fitness_params)
+                       for obj in objectives]
+            report["rounds"].append({
+                "level": level,
+                "hours": hours,
+                "settings": dict(fidelity["settings"]),
+                "candidates": list(survivors),
+                "fitness": fitness,
+                "time": time.perf_counter() - start,
+            })
+            report["equivalent_full_runs"] += len(survivors) * hours / full_hours
+            print(f"Round {level + 1}/{len(fidelities)} | {len(survivors)} candidates"
+                  f" x {hours} h | Best Fitness = {max(fitness):.3f}")
+
+            order = sorted(range(len(survivors)), key=lambda j: fitness[j],
+                           reverse=True)
+            if level < len(fidelities) - 1:
+                keep = max(1, math.ceil(len(survivors) / eta))
+                survivors = [survivors[j] for j in order[:keep]]
+            else:
+                report["full_runs"] = len(survivors)
+                best_index = survivors[order[0]]
+                best_fitness = fitness[order[0]]
+
+        if check_full:
+            objectives = Ga.evaluate_batch(candidates, species_name, full_hours,
+                                           fidelities[-1]["settings"], pool=pool,
+                                           seeds=weather_seed)
+            full_fitness = [Ga.fitness_from_objectives(obj, **fitness_params)
+                            for obj in objectives]
+            full_order = sorted(range(n_candidates), key=lambda i: full_fitness[i],
+                                reverse=True)
+            report["check"] = {
+                "full_fitness": full_fitness,
+                "winner_full_rank": full_order.index(best_index) + 1,
+                "best_full_fitness": full_fitness[full_order[0]],
+                "round_spearman": [
+                    spearman(r["fitness"], [full_fitness[i] for i in r["candidates"]])
+                    for r in report["rounds"]
+                ],
+            }
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    best_solution = dict(candidates[best_index])
+    print("==============================================")
+    print("Best solution found:")
+    for p in best_solution:
+        print(f"{p} = {best_solution[p]:.6f}")
+    print(f"Max score = {best_fitness:.3f}")
+    print(f"Full-fidelity runs: {report['full_runs']} "
+          f"(equivalent: {report['equivalent_full_runs']:.1f})")
+    print("==============================================")
+    return best_solution, best_fitness, report
+
+
+if __name__ == "__main__":
+    best_config, best_score, sh_report = successive_halving(
+        species_name="quercus_coccifera",
+        n_candidates=81,
+        eta=3,
+        seed=0,
+        check_full=False,
+    )
@@ -0,0 +1,278 @@
+# parareal.py
+"""
+Parallel-in-time (Parareal) execution of multi-year runs.
+
+The run is cut into yearly slices. A cheap coarse propagator G predicts the
+state at each year boundary sequentially; the full model F then re-runs
+every year in parallel (one process per slice) from the predicted starting
+states, and the boundaries are corrected with
+
+    U[n+1] <- G(U_new[n]) + F(U_old[n]) - G(U_old[n])
+
+until two successive iterations agree within 'tol'. After k iterations the
+first k years are exactly those of a sequential run, so the method never
+needs more than one iteration per year; the wall time gain comes from
+converging in fewer iterations than years.
+
+Coarse propagator: the hourly model with cheap settings (COARSE_SETTINGS:
+linearised leaf temperature, 2 x 2 leaf search grid, compiled kernels when
+Numba is available). The hourly loop has per-step processes (turnover,
+reserve refills, daily triggers) that do not rescale with a longer time
+step, so a daily-step version of the model is not available as coarse
+propagator.
+
+States are the spin-up states of spinup.py. The correction applies to the
+continuous state variables only (CORRECTED_STATES: biomass compartments,
+reserves, soil water), biomass_total being recomputed from the corrected
+compartments; everything else (allocation ratios, which must keep summing
+to 1, phenology stage, flags, stress history, loop clock) comes from the
+fine run. Runs must be driven by a forcing indexed by absolute hour (forcing
+store, weather file, CyclicForcing), so that every process sees the same
+weather.
+
+All comments in English, while variable/function names follow the project.
+"""
+
+import copy
+from multiprocessing import Pool
+
+import numpy as np
+
+import global_constants as Gl
+import Plant_def as Pl
+import Environnement_def as Ev
+import history_def as Hi
+import kernels as Ke
+import functions as Fu
+import time_loop as Ti
+import spinup as Sp
+
+HOURS_PER_YEAR = Sp.HOURS_PER_YEAR
+
+# Model settings of the coarse propagator
+COARSE_SETTINGS = {
+    "leaf_temp_method": "linear",
+    "leaf_search_steps": 1,
+    "compute_backend": "kernels" if Ke.NUMBA_AVAILABLE else "python",
+}
+
+# Settings copied from the parent process to the fine propagator
+FINE_SETTING_NAMES = ("leaf_temp_method", "leaf_search_steps",
+                      "compute_backend", "leaf_search")
+
+# Continuous state variables corrected by Parareal: (root, path)
+CORRECTED_STATES = (
+    [("Plant", ("biomass", key)) for key in
+     ("transport", "stock", "photo", "absorp", "repro", "necromass")]
+    + [("Plant", ("reserve", key)) for key in ("sugar", "water", "nutrient")]
+    + [("Environment", ("soil", "water"))]
+)
+
+# State of the worker processes (set by _init_worker)
+_worker = {}
+
+
+def slice_bounds(n_years):
+    """
+    Last simulated hour of each yearly slice (years end on the last hour of
+    a day, as in spinup.run_spinup).
+    """
+    return [(year + 1) * HOURS_PER_YEAR - 1 for year in range(n_years)]
+
+
+def propagate(state, end_hour, forcing, settings, recording=None):
+    """
+    Runs the model from 'state' up to the simulated hour 'end_hour'.
+
+    Parameters
+    ----------
+    state : dict
+        Starting state (spinup.current_state); without loop clock the run
+        starts at hour 1.
+    end_hour : int
+    forcing : array-like
+        Hourly forcing indexed by absolute hour.
+    settings : dict
+        Global settings (Gl attributes) used for this run.
+    recording : dict, optional
+        Recording profile of the run (Hi.set_recording_profile arguments);
+        default: no hourly channel.
+
+    Returns
+    -------
+    (state, history)
+        Final state and history of the run (the control windows refilled
+        from 'state' are removed from the hourly channels).
+    """
+    saved = {name: getattr(Gl, name) for name in settings}
+    for name, value in settings.items():
+        setattr(Gl, name, value)
+    try:
+        Hi.set_recording_profile(**(recording or {"profile": "subset",
+                                                  "keys": [],
+                                                  "day_night": False}))
+        Sp.restore_state(state)
+        clock = Ev.Environment.get("clock")
+        start = clock["sim_time"] if clock else 0
+        if Pl.Plant["alive"] and end_hour > start:
+            Ti.run_simulation_collect_data(end_hour - start, forcing,
+                                           resume=clock is not None)
+        history = {key: list(values) for key, values in Hi.history.items()}
+        if Hi.recorder["profile"] == "full" or Hi.recorder["profile"] == "subset":
+            hourly = Hi.recorder["keys"]
+            for key, tail in state["history_tail"].items():
+                if key in hourly:
+                    del history[key][:len(tail)]
+        return Sp.current_state(), history
+    finally:
+        for name, value in saved.items():
+            setattr(Gl, name, value)
+
+
+def _get(tree, path):
+    for key in path:
+        tree = tree[key]
+    return tree
+
+
+def _set(tree, path, value):
+    for key in path[:-1]:
+        tree = tree[key]
+    tree[path[-1]] = value
+
+
+def correct(coarse_new, fine_old, coarse_old):
+    """
+    Parareal update G(U_new) + F(U_old) - G(U_old) of the CORRECTED_STATES;
+    the other entries are those of the fine state, and biomass_total is
+    recomputed from the corrected compartments. Values that are
+    non-negative in the three states are kept non-negative.
+    """
+    state = copy.deepcopy(fine_old)
+    for root, path in CORRECTED_STATES:
+        try:
+            g_new = _get(coarse_new[root], path)
+            g_old = _get(coarse_old[root], path)
+        except (KeyError, TypeError):
+            continue
+        f_old = _get(fine_old[root], path)
+        value = g_new + f_old - g_old
+        if g_new >= 0.0 and f_old >= 0.0 and g_old >= 0.0:
+            value = max(0.0, value)
+        _set(state[root], path, value)
+    Fu.update_biomass_total(state["Plant"])
+    return state
+
+
+def state_difference(a, b, floor=1e-9):
+    """
+    Largest relative difference between the corrected values of two states
+    (inf if their phenology stage or survival differ).
+    """
+    if (a["Plant"]["phenology_stage"] != b["Plant"]["phenology_stage"]
+            or a["Plant"]["alive"] != b["Plant"]["alive"]):
+        return np.inf
+    diff = 0.0
+    for root, path in CORRECTED_STATES:
+        try:
+            x = _get(a[root], path)
+            y = _get(b[root], path)
+        except (KeyError, TypeError):
+            continue
+        diff = max(diff, abs(x - y) / max(abs(x), abs(y), floor))
+    return diff
+
+
+def _init_worker(forcing, settings, recording):
+    _worker.update(forcing=forcing, settings=settings, recording=recording)
+
+
+def _fine_task(args):
+    state, end_hour = args
+    return propagate(state, end_hour, _worker["forcing"], _worker["settings"],
+                     _worker["recording"])
+
+
+def run_parareal(n_years, forcing, n_workers=None, max_iter=None, tol=1e-6,
+                 coarse_settings=None, recording=None):
+    """
+    Parareal run of the current plant (Pl.Plant, Ev.Environment, as set up
+    for run_simulation_collect_data) over 'n_years' years.
+
+    Parameters
+    ----------
+    n_years : int
+        Number of yearly slices.
+    forcing : array-like
+        Hourly forcing indexed by absolute hour, covering n_years years.
+    n_workers : int, optional
+        Number of processes for the fine runs (default: os.cpu_count()).
+    max_iter : int, optional
+        Maximum number of Parareal iterations (default and maximum useful
+        value: n_years).
+    tol : float
+        Convergence threshold on the relative change of the boundary
+        states between two iterations (state_difference).
+    coarse_settings : dict, optional
+        Settings of the coarse propagator (default: COARSE_SETTINGS).
+    recording : dict, optional
+        Recording profile of the fine runs (see propagate).
+
+    Returns
+    -------
+    (history, Plant, Environment, info)
+        The history assembled from the last fine runs, the state that ends
+        it (final state of the last fine run, also made current), and
+        "iterations", "differences" (largest boundary change of each
+        iteration) and "converged".
+    """
+    coarse_settings = dict(COARSE_SETTINGS, **(coarse_settings or {}))
+    fine_settings = {name: getattr(Gl, name) for name in FINE_SETTING_NAMES}
+    max_iter = n_years if max_iter is None else min(max_iter, n_years)
+    bounds = slice_bounds(n_years)
+
+    # Initial coarse prediction, from the state before hour 1 (empty
+    # control windows, as in a run started on a cleared history)
+    U = [Sp.current_state()]
+    U[0]["history_tail"] = {key: [] for key in Hi.CONTROL_KEYS}
+    G = [None]
+    for n in range(n_years):
+        G.append(propagate(U[n], bounds[n], forcing, coarse_settings)[0])
+        U.append(G[n + 1])
+
+    info = {"iterations": 0, "differences": [], "converged": False}
+    histories = [None] * n_years
+    with Pool(n_workers, initializer=_init_worker,
+              initargs=(forcing, fine_settings, recording)) as pool:
+        for k in range(max_iter):
+            # Fine runs of the slices not yet exact, in parallel
+            results = pool.map(_fine_task,
+                               [(U[n], bounds[n]) for n in range(k, n_years)])
+            F = [None] * (n_years + 1)
+            for n, (state, history) in zip(range(k, n_years), results):
+                F[n + 1] = state
+                histories[n] = history
+            final_state = F[n_years]
+
+            # Sequential correction; slice k starts from an exact state
+            U_new = U[:k + 1] + [F[k + 1]]
+            G_new = G[:k + 2]
+            for n in range(k + 1, n_years):
+                G_new.append(propagate(U_new[n], bounds[n], forcing,
+                                       coarse_settings)[0])
+                U_new.append(correct(G_new[n + 1], F[n + 1], G[n + 1]))
+
+            difference = max((state_difference(U_new[n], U[n])
+                              for n in range(k + 1, n_years + 1)), default=0.0)
+            info["iterations"] = k + 1
+            info["differences"].append(difference)
+            U, G = U_new, G_new
+            # After k + 1 iterations the first k + 1 slices are exact
+            if difference < tol or k + 1 == n_years:
+                info["converged"] = True
+                break
+
+    history = {key: [v for h in histories for v in h[key]]
+               for key in histories[0]}
+    Sp.restore_state(final_state, history_tail=False)
+    return history, Pl.Plant, Ev.Environment, info
@@ -0,0 +1,592 @@
+# phenology_def.py
+"""
+Phenology as declarative transition tables.
+
+For each growth type ("annual", "biannual", "perennial") PHENOLOGY_TABLES
+lists the transition rules: a rule leaves one stage ("from") for another
+("to") when all its conditions ("when") hold, and then applies its parameter
+updates ("do"). Rules are checked in table order and, as in the original
+hand-written chains, at most one transition happens per day.
+
+Conditions compare daily indicators (photoperiod, minimum temperature of the
+last week, sugar balance, ...), computed once per day and only when a rule
+of the current stage needs them. The same tables are evaluated
+
+  - on a single Plant dictionary (step_phenology, used by
+    Fu.manage_phenology), with exactly the behaviour of the former
+    phenology_annual / _biannual / _perennial functions;
+  - on a batch of plants as masked array operations (step_phenology_batch),
+    stages being stored as integer codes (STAGE_CODES).
+
+All comments in English, while variable/function names follow the project.
+"""
+
+import operator
+
+import numpy as np
+
+import global_constants as Gl
+import Environnement_def as Ev
+import history_def as Hi
+import functions as Fu
+
+STAGES = ("seed", "vegetative", "reproduction", "making_reserve",
+          "dessication", "dormancy")
+STAGE_CODES = {stage: code for code, stage in enumerate(STAGES)}
+
+# Order of the allocation ratios in the batch arrays
+ALLOC_KEYS = ("photo", "transport", "stock", "absorp", "repro")
+
+OPS = {"<": operator.lt, "<=": operator.le, ">": operator.gt,
+       ">=": operator.ge}
+
+# Plant values the rules read or update, by name (path in the Plant dict)
+PLANT_FIELDS = {
+    "photo_biomass": ("biomass", "photo"),
+    "biomass_total": ("biomass_total",),
+    "dormancy_thrs_temp": ("dormancy_thrs_temp",),
+    "leaf_shredding_ratio": ("leaf_shredding_ratio",),
+    "alloc_repro_max": ("alloc_repro_max",),
+    "reproduction_ref": ("reproduction_ref",),
+    "dormancy_index": ("dormancy_index",),
+    "maintenance_sugar": ("cost_params", "maintenance", "sugar"),
+    "ratio_alloc": ("ratio_alloc",),
+    "save_alloc": ("save_alloc",),
+}
+
+# Germination: the last week was warm enough
+_WARM_WEEK = ("week_min_temp", ">", "dormancy_thrs_temp")
+
+# Rule actions:
+#   ("set", field, value)   field = value (number, indicator name or an
+#                           allocation dict whose entries may be names)
+#   ("copy", field, source) field = source
+#   ("check_alloc",)        renormalise ratio_alloc (Fu.check_alloc)
+#   ("update_params",)      reserve_ratio of the new stage
+#                           (Fu.update_phenological_parameters)
+#   ("reset_counter",)      Gl.count_ph = 0
+PHENOLOGY_TABLES = {
+    "annual": {
+        "counter": True,
+        "rules": [
+            {"from": "seed", "to": "vegetative",
+             "when": [_WARM_WEEK],
+             "do": [("update_params",)]},
+            {"from": "dormancy", "to": "vegetative",
+             "when": [_WARM_WEEK],
+             "do": [("update_params",)]},
+            {"from": "vegetative", "to": "reproduction",
+             "when": [("sugar_mean", "<", "slope_thrs")],
+             "do": [("copy", "reproduction_ref", "biomass_total"),
+                    ("update_params",)]},
+            {"from": "reproduction", "to": "dessication",
+             "when": [("photoperiod", ">=", 15.5)],
+             "do": []},
+        ],
+    },
+    "biannual": {
+        "counter": False,
+        "rules": [
+            {"from": "seed", "to": "vegetative",
+             "when": [_WARM_WEEK],
+             "do": [("update_params",)]},
+            {"from": "dormancy", "to": "reproduction",
+             "when": [("day_index", ">", 365), _WARM_WEEK],
+             "do": [("update_params",)]},
+            {"from": "vegetative", "to": "making_reserve",
+             "when": [("photo_slope", "<", "slope_thrs"),
+                      ("photoperiod", "<", "photoperiod_yesterday")],
+             "do": [("update_params",)]},
+            {"from": "making_reserve", "to": "dessication",
+             "when": [("day_index", "<", 365),
+                      ("sugar_slope", "<", "slope_thrs")],
+             "do": [("update_params",)]},
+            {"from": "dessication", "to": "dormancy",
+             "when": [("photo_biomass", "<", 0.001)],
+             "do": [("update_params",),
+                    ("set", "ratio_alloc",
+                     {"photo": 0.2, "transport": 0.1, "stock": 0.0,
+                      "absorp": 0.2, "repro": "alloc_repro_max"}),
+                    ("check_alloc",)]},
+        ],
+    },
+    "perennial": {
+        "counter": True,
+        "rules": [
+            {"from": "seed", "to": "vegetative",
+             "when": [_WARM_WEEK],
+             "do": [("update_params",)]},
+            {"from": "dormancy", "to": "reproduction",
+             "when": [("day_index", ">", 365), _WARM_WEEK],
+             "do": [("set", "dormancy_index", 1.0),
+                    ("set", "maintenance_sugar", 5e-7),
+                    ("update_params",)]},
+            {"from": "reproduction", "to": "vegetative",
+             "when": [("photoperiod", ">", 14)],
+             "do": [("copy", "ratio_alloc", "save_alloc"),
+                    ("check_alloc",),
+                    # both names share the normalised allocation
+                    ("copy", "save_alloc", "ratio_alloc"),
+                    ("update_params",),
+                    ("reset_counter",)]},
+            {"from": "vegetative", "to": "making_reserve",
+             "when": [("sugar_mean", "<", "slope_thrs")],
+             "do": [("copy", "save_alloc", "ratio_alloc"),
+                    ("set", "ratio_alloc",
+                     {"photo": 0.0, "transport": 0.0, "stock": 1.0,
+                      "absorp": 0.0, "repro": 0.0}),
+                    ("check_alloc",),
+                    ("update_params",),
+                    ("reset_counter",)]},
+            {"from": "making_reserve", "to": "dessication",
+             "when": [("sugar_mean", "<", "slope_thrs")],
+             "do": [("update_params",)]},
+            {"from": "dessication", "to": "dormancy",
+             "when": [("photo_biomass", "<", "leaf_shredding_ratio")],
+             "do": [("update_params",),
+                    ("set", "ratio_alloc",
+                     {"photo": 0.3, "transport": 0.0, "stock": 0.0,
+                      "absorp": 0.3, "repro": 0.1}),
+                    ("check_alloc",)]},
+        ],
+    },
+}
+
+
+###############################################
+#              DAILY INDICATORS               #
+###############################################
+
+_photoperiods = {}
+
+
+def photoperiod(day_index):
+    """
+    Day length (hours) of a day index, computed once per day index
+    (Ev.calc_daily_photoperiod).
+    """
+    value = _photoperiods.get(day_index)
+    if value is None:
+        value = _photoperiods[day_index] = Ev.calc_daily_photoperiod(day_index)
+    return value
+
+
+def _week_min_temp(daily_min_temps):
+    # Minimum of the last week's daily minima (-inf until a week is recorded),
+    # so that "all days above the threshold" becomes a single comparison
+    if len(daily_min_temps) < Gl.ave_week:
+        return -np.inf
+    return min(daily_min_temps[-Gl.ave_week:])
+
+
+def _sugar_balance(history):
+    # Mean maintenance cost minus photosynthesis over the last nb_days
+    cost = np.array(history.get("cost_maintenance_sugar"))
+    photo = np.array(history.get("actual_sugar"))
+    delta = cost - photo
+    if delta.size == 0:
+        return np.nan
+    return np.mean(delta[-Gl.ave_day * Gl.nb_days:])
+
+
+# Indicator name -> function(Plant, day_index, daily_min_temps, history)
+INDICATORS = {
+    "day_index": lambda P, d, m, h: d,
+    "photoperiod": lambda P, d, m, h: photoperiod(d),
+    "photoperiod_yesterday": lambda P, d, m, h: photoperiod(d - 1),
+    "week_min_temp": lambda P, d, m, h: _week_min_temp(m),
+    "sugar_balance": lambda P, d, m, h: _sugar_balance(h),
+    "sugar_slope": lambda P, d, m, h: Fu.slope_last_hours(
+        h["reserve_sugar"], nb_hours=Gl.ave_day * Gl.nb_days),
+    "photo_slope": lambda P, d, m, h: Fu.slope_last_hours(
+        h["pot_sugar"], nb_hours=Gl.ave_day * Gl.nb_days),
+    "slope_thrs": lambda P, d, m, h: Gl.slope_thrs,
+}
+
+
+def _sugar_mean_single(Plant, day_index, daily_min_temps, history):
+    # The sugar balance only counts once the phenology counter has run
+    # for more than ave_day * nb_days calls since the last reset
+    if Gl.count_ph > Gl.ave_day * Gl.nb_days:
+        return _sugar_balance(history)
+    return 0.0
+
+
+INDICATORS["sugar_mean"] = _sugar_mean_single
+
+
+def _get_field(Plant, name):
+    value = Plant
+    for key in PLANT_FIELDS[name]:
+        value = value[key]
+    return value
+
+
+def _set_field(Plant, name, value):
+    path = PLANT_FIELDS[name]
+    target = Plant
+    for key in path[:-1]:
+        target = target[key]
+    target[path[-1]] = value
+
+
+def daily_indicators(Plant, day_index, daily_min_temps, names, history=None):
+    """
+    Values of the given indicators (or Plant fields, see PLANT_FIELDS) for
+    one plant and one day.
+
+    Parameters
+    ----------
+    Plant : dict
+    day_index : int
+    daily_min_temps : list
+        Daily minimum temperatures (last 30 days, as kept by time_loop).
+    names : iterable of str
+    history : dict, optional
+        History of the plant (default: Hi.history).
+
+    Returns
+    -------
+    dict
+    """
+    history = Hi.history if history is None else history
+    values = {}
+    for name in names:
+        if name in INDICATORS:
+            values[name] = INDICATORS[name](Plant, day_index,
+                                            daily_min_temps, history)
+        else:
+            values[name] = _get_field(Plant, name)
+    return values
+
+
+def rule_inputs(growth_type):
+    """
+    Names of the values read by the conditions and actions of a table.
+    """
+    names = []
+    for rule in PHENOLOGY_TABLES[growth_type]["rules"]:
+        refs = [name for cond in rule["when"] for name in (cond[0], cond[2])]
+        for action in rule["do"]:
+            if action[0] in ("set", "copy"):
+                value = action[2]
+                refs.extend(value.values() if isinstance(value, dict) else [value])
+        for name in refs:
+            if isinstance(name, str) and name not in names:
+                names.append(name)
+    return names
+
+
+###############################################
+#              SINGLE PLANT                   #
+###############################################
+
+def _resolve(name, lookup):
+    if isinstance(name, str):
+        return lookup(name)
+    return name
+
+
+def _apply_single(Plant, action, lookup):
+    kind = action[0]
+    if kind == "set":
+        value = action[2]
+        if isinstance(value, dict):
+            value = {key: _resolve(v, lookup) for key, v in value.items()}
+        else:
+            value = _resolve(value, lookup)
+        _set_field(Plant, action[1], value)
+    elif kind == "copy":
+        # Plain assignment, as in the original chains (dicts are shared)
+        _set_field(Plant, action[1], _get_field(Plant, action[2]))
+    elif kind == "check_alloc":
+        Fu.check_alloc(Plant)
+    elif kind == "update_params":
+        Fu.update_phenological_parameters(Plant)
+    elif kind == "reset_counter":
+        Gl.count_ph = 0
+
+
+def step_phenology(Plant, day_index, daily_min_temps, growth_type=None,
+                   history=None):
+    """
+    Daily phenology step of one plant: applies the first rule of its growth
+    type table that leaves the current stage and whose conditions all hold.
+
+    Parameters
+    ----------
+    Plant : dict
+    day_index : int
+    daily_min_temps : list
+    growth_type : str, optional
+        Table to use (default: Plant["growth_type"]).
+    history : dict, optional
+        History read by the sugar indicators (default: Hi.history).
+
+    Returns
+    -------
+    dict or None
+        The rule applied, or None if the stage did not change.
+    """
+    table = PHENOLOGY_TABLES[growth_type or Plant["growth_type"]]
+    history = Hi.history if history is None else history
+    if table["counter"]:
+        Gl.count_ph += 1
+
+    cache = {}
+
+    def lookup(name):
+        if name not in cache:
+            if name in INDICATORS:
+                cache[name] = INDICATORS[name](Plant, day_index,
+                                               daily_min_temps, history)
+            else:
+                cache[name] = _get_field(Plant, name)
+        return cache[name]
+
+    stage = Plant["phenology_stage"]
+    for rule in table["rules"]:
+        if rule["from"] != stage:
+            continue
+        if all(OPS[op](_resolve(lhs, lookup), _resolve(rhs, lookup))
+               for lhs, op, rhs in rule["when"]):
+            Plant["phenology_stage"] = rule["to"]
+            for action in rule["do"]:
+                _apply_single(Plant, action, lookup)
+            return rule
+    return None
+
+
+###############################################
+#              BATCH OF PLANTS                #
+###############################################
+
+def _check_alloc_rows(ra, mask):
+    # Fu.check_alloc on the masked rows (same summation order)
+    k = {key: i for i, key in enumerate(ALLOC_KEYS)}
+    total = (ra[:, k["transport"]] + ra[:, k["photo"]] + ra[:, k["absorp"]]
+             + ra[:, k["repro"]] + ra[:, k["stock"]])
+    rows = mask & (total != 1.0) & (total != 0.0)
+    ra[rows] /= total[rows, None]
+
+
+def step_phenology_batch(growth_type, stages, indicators, state):
+    """
+    Daily phenology step of a batch of plants sharing a growth type.
+
+    Parameters
+    ----------
+    growth_type : str
+    stages : np.ndarray of int
+        Stage codes (STAGE_CODES), shape (n,).
+    indicators : dict
+        Daily indicators (scalars or arrays of shape (n,)), see
+        rule_inputs / batch_indicators. "sugar_mean" may be given as the
+        ungated "sugar_balance", gated here with state["count_ph"].
+    state : dict
+        Per-plant arrays updated in place: "count_ph" (n,), the scalar
+        PLANT_FIELDS entries used by the table (n,), "ratio_alloc" and
+        "save_alloc" (n, 5) in ALLOC_KEYS order, "reserve_ratio" (n,) and
+        "reserve_ratio_ps" (n, len(STAGES)).
+
+    Returns
+    -------
+    (new_stages, fired)
+        New stage codes, and the index of the rule applied to each plant
+        (-1 when the stage did not change).
+    """
+    table = PHENOLOGY_TABLES[growth_type]
+    stages = np.asarray(stages)
+    n = len(stages)
+    if table["counter"]:
+        state["count_ph"] += 1
+
+    def lookup(name):
+        if name in indicators:
+            return indicators[name]
+        if name == "sugar_mean":
+            return np.where(state["count_ph"] > Gl.ave_day * Gl.nb_days,
+                            indicators["sugar_balance"], 0.0)
+        if name == "slope_thrs":
+            return Gl.slope_thrs
+        return state[name]
+
+    new_stages = stages.copy()
+    fired = np.full(n, -1)
+    for index, rule in enumerate(table["rules"]):
+        mask = (stages == STAGE_CODES[rule["from"]]) & (fired < 0)
+        if not mask.any():
+            continue
+        for lhs, op, rhs in rule["when"]:
+            mask &= OPS[op](_resolve(lhs, lookup), _resolve(rhs, lookup))
+        if not mask.any():
+            continue
+        fired[mask] = index
+        code = STAGE_CODES[rule["to"]]
+        new_stages[mask] = code
+        for action in rule["do"]:
+            kind = action[0]
+            if kind == "set":
+                value = action[2]
+                if isinstance(value, dict):
+                    for i, key in enumerate(ALLOC_KEYS):
+                        column = np.broadcast_to(_resolve(value[key], lookup), (n,))
+                        state[action[1]][mask, i] = column[mask]
+                else:
+                    column = np.broadcast_to(_resolve(value, lookup), (n,))
+                    state[action[1]][mask] = column[mask]
+            elif kind == "copy":
+                state[action[1]][mask] = state[action[2]][mask]
+            elif kind == "check_alloc":
+                _check_alloc_rows(state["ratio_alloc"], mask)
+            elif kind == "update_params":
+                state["reserve_ratio"][mask] = state["reserve_ratio_ps"][mask, code]
+            elif kind == "reset_counter":
+                state["count_ph"][mask] = 0
+    return new_stages, fired
+
+
+def batch_indicators(plants, day_index, daily_min_temps, histories, names):
+    """
+    Stacks daily_indicators over a batch of plants: one array (n,) per name.
+    Shared values (day_index, photoperiods, slope_thrs) stay scalars.
+
+    Parameters
+    ----------
+    plants : list of dict
+    day_index : int
+    daily_min_temps : list of list
+        Daily minimum temperatures of each plant.
+    histories : list of dict
+        History of each plant.
+    names : iterable of str
+    """
+    shared = ("day_index", "photoperiod", "photoperiod_yesterday", "slope_thrs")
+    values = {}
+    for name in names:
+        if name == "sugar_mean":
+            name = "sugar_balance"  # gated with the counters in the batch step
+        if name in shared:
+            values[name] = INDICATORS[name](None, day_index, None, None)
+        elif name in INDICATORS:
+            values[name] = np.array([
+                INDICATORS[name](P, day_index, m, h)
+                for P, m, h in zip(plants, daily_min_temps, histories)])
+        # other names are Plant fields, read from the batch state
+    return values
+
+
+def _as_float(value):
+    # Unset Plant values ("none") become NaN in the batch arrays
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def batch_state(plants, count_ph):
+    """
+    Batch arrays (stage codes, state) of a list of Plant dictionaries, for
+    step_phenology_batch.
+
+    Parameters
+    ----------
+    plants : list of dict
+    count_ph : array-like
+        Phenology counter of each plant.
+
+    Returns
+    -------
+    (stages, state)
+    """
+    stages = np.array([STAGE_CODES[P["phenology_stage"]] for P in plants])
+    state = {"count_ph": np.array(count_ph, dtype=np.int64)}
+    for name in PLANT_FIELDS:
+        if name in ("ratio_alloc", "save_alloc"):
+            state[name] = np.array([[_get_field(P, name)[key] for key in ALLOC_KEYS]
+                                    for P in plants], dtype=float)
+        else:
+            state[name] = np.array([_as_float(_get_field(P, name))
+                                    for P in plants])
+    state["reserve_ratio"] = np.array([_as_float(P["reserve_ratio"])
+                                       for P in plants])
+    state["reserve_ratio_ps"] = np.array(
+        [[_as_float(P["reserve_ratio_ps"].get(stage)) for stage in STAGES]
+         for P in plants])
+    return stages, state
+
+
+def _rule_outputs(rule):
+    # Plant entries written by the actions of a rule
+    outputs = []
+    for action in rule["do"]:
+        if action[0] in ("set", "copy"):
+            outputs.append(action[1])
+        elif action[0] == "update_params":
+            outputs.append("reserve_ratio")
+    return outputs
+
+
+def _alloc_sources(rule):
+    # Object held by ratio_alloc / save_alloc after the actions of a rule, as
+    # in the single-plant path where "copy" shares dicts and "set" replaces
+    # them: ("orig", name) is the dict held by 'name' before the rule,
+    # ("new", k) the dict created by action k. None if the rule does not
+    # touch the allocations.
+    sources = {name: ("orig", name) for name in ("ratio_alloc", "save_alloc")}
+    touched = False
+    for k, action in enumerate(rule["do"]):
+        if action[0] == "set" and action[1] in sources:
+            sources[action[1]] = ("new", k)
+            touched = True
+        elif action[0] == "copy" and action[1] in sources:
+            sources[action[1]] = sources[action[2]]
+            touched = True
+        elif action[0] == "check_alloc":
+            touched = True
+    return sources if touched else None
+
+
+def apply_batch_state(plants, growth_type, stages, state, fired):
+    """
+    Writes the new stages and the entries updated by the applied rules back
+    to the Plant dictionaries (inverse of batch_state).
+
+    Parameters
+    ----------
+    plants : list of dict
+    growth_type : str
+    stages, fired : np.ndarray
+        Outputs of step_phenology_batch.
+    state : dict
+        Batch state updated by step_phenology_batch.
+    """
+    rules = PHENOLOGY_TABLES[growth_type]["rules"]
+    for i, P in enumerate(plants):
+        if fired[i] < 0:
+            continue
+        P["phenology_stage"] = STAGES[stages[i]]
+        for name in _rule_outputs(rules[fired[i]]):
+            if name == "reserve_ratio":
+                P["reserve_ratio"] = float(state["reserve_ratio"][i])
+            elif name not in ("ratio_alloc", "save_alloc"):
+                _set_field(P, name, float(state[name][i]))
+
+        # Allocations: same dict sharing as the single-plant path (a dict
+        # kept from before the rule is updated in place, names that end up
+        # sharing a dict get the same one)
+        sources = _alloc_sources(rules[fired[i]])
+        if sources is None:
+            continue
+        original = {name: _get_field(P, name) for name in sources}
+        objects = {}
+        for name, source in sources.items():
+            values = {key: float(state[name][i, k])
+                      for k, key in enumerate(ALLOC_KEYS)}
+            if source not in objects:
+                if source[0] == "orig":
+                    objects[source] = original[source[1]]
+                    objects[source].update(values)
+                else:
+                    objects[source] = values
+            _set_field(P, name, objects[source])
@@ -13,8 +13,7 @@ def run_simulation_and_collect_data(species_name, total_days=365):
     Pl.set_plant_species(Pl.Plant, species_name, Pl.species_db)
 
     # Réinitialisation de l'historique
-    for k in Hi.history:
-        Hi.history[k].clear()
+    Hi.clear_history(Hi.history)
 
     # Exécution de la simulation
     max_cycles = total_days * 24
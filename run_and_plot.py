@@ -3,6 +3,7 @@ import matplotlib.pyplot as plt
 import time_loop as Ti
 import global_constants as Gl
 import Plant_def as Pl
+import history_def as Hi
 
 def aggregate_day_night(history, threshold_light=1.0):
     """
@@ -17,6 +18,9 @@ def aggregate_day_night(history, threshold_light=1.0):
          - day_data["time"] = [1, 2, 3, ...]
          - day_data["biomass_total"] = [moyenne du jour 1, ...]
          - etc.
+
+    Pour une simulation qui vient de se terminer, Hi.day_night_tables()
+    fournit directement ces tables, agrégées pendant la simulation.
     """
 
     # 1) Prépare deux structures identiques à l’historique 
@@ -94,8 +98,11 @@ def simulate_and_plot(species_name):
     """
     Pl.set_plant_species(Pl.Plant, species_name, Pl.species_db)
 
+    # Toutes les voies, avec les moyennes jour/nuit accumulées en ligne
+    Hi.set_recording_profile(day_night=True)
     data, final_Plant, final_env = Ti.run_simulation_collect_data(Gl.max_cycles)
-    day_data, night_data = aggregate_day_night(data)
+    # Tables jour/nuit agrégées en ligne par l'enregistreur
+    day_data, night_data = Hi.day_night_tables()
 
     day_fig, day_axes = plt.subplots(nrows=5, ncols=4, figsize=(65, 35))
     day_fig.suptitle("", fontsize=16)
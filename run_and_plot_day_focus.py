@@ -12,8 +12,7 @@ def simulate_entire_period(species_name="ble", total_days=365):
     Renvoie l'historique complet, ainsi que l'état final de la plante et de l'environnement.
     """
     # 1) Réinitialise l'historique global pour partir d'une base propre
-    for k in Hi.history:
-        Hi.history[k].clear()
+    Hi.clear_history(Hi.history)
 
     # 2) Initialise l'espèce
     Pl.set_plant_species(Pl.Plant, species_name, Pl.species_db)
@@ -13,6 +13,7 @@ import matplotlib.pyplot as plt
 import time_loop as Ti
 import global_constants as Gl
 import Plant_def as Pl
+import history_def as Hi
 
 from datetime import datetime, timedelta
 import matplotlib.dates as mdates
@@ -40,6 +41,12 @@ def aggregate_day_night(history, threshold_light=1.0):
         day_data["time"] = [1..total_days].
         If a value is numeric, we average it; if it's a string, we overwrite
         with the last encountered value in that day segment.
+
+    Notes
+    -----
+    For a run that just finished, Hi.day_night_tables() returns the same
+    tables, accumulated online by the recorder at no post-processing cost.
+    This function remains for histories loaded or built elsewhere.
     """
     day_data = {}
     night_data = {}
@@ -52,54 +59,58 @@ def aggregate_day_night(history, threshold_light=1.0):
     max_time = max(history["time"])
     total_days = (max_time // Gl.ave_day) + 1
 
-    # Prepare lists
-    for key in history:
-        # If the stored values are numeric, init with 0.0
-        # If they are strings, we init with "" so we can store last state
-        if isinstance(history[key][0], (int, float)):
+    # Only channels recorded hour by hour can be aggregated (other channels
+    # may be empty or rolling windows under a reduced recording profile)
+    keys = [key for key in history if len(history[key]) == total_points]
+
+    # Decide once per channel whether it is numeric or a label
+    # (e.g. phenology_stage), instead of testing every value
+    numeric = {key: isinstance(history[key][0], (int, float)) for key in keys}
+    for key in keys:
+        if numeric[key]:
             day_data[key] = [0.0] * total_days
             night_data[key] = [0.0] * total_days
         else:
-            # e.g. phenology_stage
             day_data[key] = [""] * total_days
             night_data[key] = [""] * total_days
 
     day_counts = [0] * total_days
     night_counts = [0] * total_days
 
+    atmos_light = history["atmos_light"]
+    day_index = [hour // Gl.ave_day for hour in history["time"]]
+    is_day = [light > threshold_light for light in atmos_light]
+
     for i in range(total_points):
-        hour = history["time"][i]  # e.g. 0.., in hours
-        day_index = hour // Gl.ave_day
-        atm_light = history["atmos_light"][i]
-        is_day = (atm_light > threshold_light)
-
-        for key in history:
-            val = history[key][i]
-            if isinstance(val, (int, float)):
-                # Accumulate numeric data
-                if is_day:
-                    day_data[key][day_index] += val
-                else:
-                    night_data[key][day_index] += val
-            else:
-                # Non-numeric, e.g. string
-                if is_day:
-                    day_data[key][day_index] = val
+        if is_day[i]:
+            day_counts[day_index[i]] += 1
+        else:
+            night_counts[day_index[i]] += 1
+
+    for key in keys:
+        values = history[key]
+        day_vals = day_data[key]
+        night_vals = night_data[key]
+        if numeric[key]:
+            # Accumulate numeric data
+            for i in range(total_points):
+                if is_day[i]:
+                    day_vals[day_index[i]] += values[i]
                 else:
-                    night_data[key][day_index] = val
-
-        if is_day:
-            day_counts[day_index] += 1
+                    night_vals[day_index[i]] += values[i]
+            # Average
+            for d in range(total_days):
+                if day_counts[d] > 0:
+                    day_vals[d] /= day_counts[d]
+                if night_counts[d] > 0:
+                    night_vals[d] /= night_counts[d]
         else:
-            night_counts[day_index] += 1
-
-    # Average the numeric fields
-    for key in history:
-        for d in range(total_days):
-            if isinstance(day_data[key][d], (int, float)) and day_counts[d] > 0:
-                day_data[key][d] /= day_counts[d]
-            if isinstance(night_data[key][d], (int, float)) and night_counts[d] > 0:
-                night_data[key][d] /= night_counts[d]
+            # Non-numeric, e.g. string: keep the last value of the segment
+            for i in range(total_points):
+                if is_day[i]:
+                    day_vals[day_index[i]] = values[i]
+                else:
+                    night_vals[day_index[i]] = values[i]
 
     # The "time" array: 1.. total_days
     day_data["time"] = list(range(1, total_days + 1))
@@ -125,10 +136,12 @@ def simulate_and_plot(species_name, start_date=datetime(2025, 1, 1)):
     """
     # 1) Setup species and run the simulation
     Pl.set_plant_species(Pl.Plant, species_name, Pl.species_db)
+    # Day/night means accumulated online during the run
+    Hi.set_recording_profile(day_night=True)
     data, final_plant, final_env = Ti.run_simulation_collect_data(Gl.max_cycles)
 
-    # 2) Aggregate data (day vs night)
-    day_data, night_data = aggregate_day_night(data)
+    # 2) Day vs night tables, aggregated online by the recorder
+    day_data, night_data = Hi.day_night_tables()
 
     # 3) Convert day indices => real calendar dates
     day_date_list = [start_date + timedelta(days=int(d - 1)) for d in day_data["time"]]
@@ -0,0 +1,217 @@
+# sensitivity_Morris.py
+"""
+Morris elementary-effects screening of the species parameters.
+
+Every numeric entry of a species of Plant_def.species_db is screened,
+nested ones included (cost_params, reserve_ratio_ps, storage_fraction),
+under their dotted path ("cost_params.photo.sugar", see
+optim_GA.set_parameter). Each parameter varies by +/- 'rel_range' around its
+species value; values in (0, 1] are treated as fractions and kept <= 1.
+Entries that are initial states rather than parameters (INITIAL_STATES) and
+zero-valued entries (no relative range) are left out unless a range is
+given explicitly.
+
+r trajectories of k + 1 runs each (k parameters) are built on a p-level
+grid, one parameter moving by delta = p / (2 (p - 1)) at each step (Morris,
+1991). All runs are evaluated as one batch (optim_GA.evaluate_batch,
+optionally on a process pool) with a shared weather seed. For each output,
+parameters are ranked by mu* (mean absolute elementary effect, overall
+influence); sigma (standard deviation) flags non-linear effects and
+interactions. Elementary effects are expressed in output units per unit of
+the normalised range, so that parameters are comparable.
+
+All comments in English, while variable/function names follow the project.
+"""
+
+import numbers
+
+import numpy as np
+
+import Plant_def as Pl
+import optim_GA as Ga
+import optim_CMAES as Cm
+
+# Species entries that set the initial state of the plant, not parameters
+INITIAL_STATES = ("ratio_alloc", "reserve", "size", "biomass_total")
+
+# Analysed outputs (keys of optim_GA.run_individual)
+OUTPUTS = ("repro", "necromass", "living")
+
+
+def numeric_paths(tree, prefix=""):
+    """
+    Dotted paths and values of the numeric leaves of nested dictionaries
+    (booleans and strings excluded).
+    """
+    for key, value in tree.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from numeric_paths(value, path + ".")
+        elif isinstance(value, numbers.Real) and not isinstance(value, bool):
+            yield path, float(value)
+
+
+def species_parameters(species_name, rel_range=0.5, exclude=INITIAL_STATES):
+    """
+    Ranges of the numeric parameters of a species.
+
+    Returns
+    -------
+    (dict, list)
+        {path: (low, high)} and the paths skipped because their value is 0.
+    """
+    ranges, skipped = {}, []
+    for path, value in numeric_paths(Pl.species_db[species_name]):
+        if path.split(".")[0] in exclude:
+            continue
+        if value == 0.0:
+            skipped.append(path)
+            continue
+        low, high = sorted((value * (1 - rel_range), value * (1 + rel_range)))
+        if 0.0 < value <= 1.0:
+            high = min(high, 1.0)
+        ranges[path] = (low, high)
+    return ranges, skipped
+
+
+def morris_trajectories(n_traj, dim, levels=4, seed=None):
+    """
+    Morris trajectories in the unit box.
+
+    Returns
+    -------
+    (ndarray, ndarray, ndarray)
+        Points (n_traj, dim + 1, dim), index of the parameter moved at each
+        step (n_traj, dim) and signed step (n_traj, dim).
+    """
+    rng = np.random.default_rng(seed)
+    delta = levels / (2.0 * (levels - 1))
+    grid = np.arange(levels) / (levels - 1)
+    points = np.empty((n_traj, dim + 1, dim))
+    moved = np.empty((n_traj, dim), dtype=int)
+    steps = np.empty((n_traj, dim))
+    for t in range(n_traj):
+        x = rng.choice(grid, size=dim)
+        points[t, 0] = x
+        order = rng.permutation(dim)
+        for s, i in enumerate(order):
+            step = delta if x[i] + delta <= 1.0 + 1e-12 else -delta
+            x = x.copy()
+            x[i] += step
+            points[t, s + 1] = x
+            moved[t, s] = i
+            steps[t, s] = step
+    return points, moved, steps
+
+
+def elementary_effects(Y, moved, steps):
+    """
+    Elementary effects (n_traj, dim) from the outputs Y (n_traj, dim + 1)
+    of the trajectories.
+    """
+    n_traj, dim = moved.shape
+    effects = np.empty((n_traj, dim))
+    for t in range(n_traj):
+        diffs = np.diff(Y[t]) / steps[t]
+        effects[t, moved[t]] = diffs
+    return effects
+
+
+def morris_screening(
+    species_name="Ble",
+    parameters=None,
+    n_traj=10,
+    levels=4,
+    rel_range=0.5,
+    outputs=OUTPUTS,
+    weather_seed=0,
+    seed=None,
+    n_workers=None,
+    n_hours=None,
+    settings=None,
+):
+    """
+    Morris screening of the parameters of 'species_name'.
+
+    Parameters
+    ----------
+    species_name : str
+        Key of the plant species used in Plant_def.species_db.
+    parameters : dict, optional
+        Parameter ranges {path: (low, high)}; default: every numeric
+        species parameter (species_parameters).
+    n_traj : int
+        Number of trajectories r; the model is run r (k + 1) times.
+    levels : int
+        Number of grid levels p (even).
+    rel_range : float
+        Relative half-range of the default parameters.
+    outputs : tuple of str
+        Analysed outputs (keys of optim_GA.run_individual).
+    weather_seed : int
+        Weather seed shared by all runs.
+    seed : int, optional
+        Seed of the trajectories.
+    n_workers : int, optional
+        If > 1, the runs are spread over a process pool.
+    n_hours, settings :
+        Horizon and model settings of the runs (optim_GA.run_individual).
+
+    Returns
+    -------
+    dict
+        "parameters" (paths), "ranges", "skipped", "runs", and for each
+        output "mu", "mu_star", "sigma" (arrays over the parameters) and
+        "ranking" (paths by decreasing mu*).
+    """
+    skipped = []
+    if parameters is None:
+        parameters, skipped = species_parameters(species_name, rel_range)
+    space = Cm.ParameterSpace(parameters)
+    dim = space.dim
+
+    points, moved, steps = morris_trajectories(n_traj, dim, levels, seed)
+    individuals = [space.to_individual(u) for u in points.reshape(-1, dim)]
+
+    Pl.set_plant_species(Pl.Plant, species_name, Pl.species_db)
+    results = Ga.evaluate_batch(individuals, species_name, n_hours, settings,
+                                n_workers=n_workers, seeds=weather_seed)
+
+    report = {"parameters": space.names, "ranges": parameters,
+              "skipped": skipped, "runs": len(individuals)}
+    for name in outputs:
+        Y = np.array([res[name] for res in results], dtype=float)
+        effects = elementary_effects(Y.reshape(n_traj, dim + 1), moved, steps)
+        mu_star = np.mean(np.abs(effects), axis=0)
+        report[name] = {
+            "mu": np.mean(effects, axis=0),
+            "mu_star": mu_star,
+            "sigma": np.std(effects, axis=0, ddof=1) if n_traj > 1 else np.zeros(dim),
+            "ranking": [space.names[i] for i in np.argsort(-mu_star, kind="stable")],
+        }
+    return report
+
+
+def print_report(report, top=None):
+    """
+    Prints mu* and sigma of a morris_screening report, by decreasing mu*.
+    """
+    names = report["parameters"]
+    for output in OUTPUTS:
+        if output not in report:
+            continue
+        result = report[output]
+        print(f"--- {output} ({report['runs']} runs) ---")
+        print(f"{'parameter':36s} {'mu*':>12s} {'mu':>12s} {'sigma':>12s}")
+        for name in result["ranking"][:top]:
+            i = names.index(name)
+            print(f"{name:36s} {result['mu_star'][i]:12.4g} "
+                  f"{result['mu'][i]:12.4g} {result['sigma'][i]:12.4g}")
+    if report["skipped"]:
+        print("Skipped (zero value): " + ", ".join(report["skipped"]))
+
+
+if __name__ == "__main__":
+    morris_report = morris_screening(species_name="quercus_coccifera",
+                                     n_traj=10, seed=0)
+    print_report(morris_report, top=10)
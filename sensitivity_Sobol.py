@@ -0,0 +1,217 @@
+# sensitivity_Sobol.py
+"""
+Variance-based global sensitivity analysis (Sobol indices, Saltelli
+sampling) of the final state of Plantroid runs.
+
+The parameters (species or environment, see optim_GA.set_parameter) vary
+together over their ranges. With N base samples and d parameters, the model
+is run N (d + 2) times: matrices A and B (one quasi-random Sobol sequence
+of dimension 2d, when scipy is available), and the d matrices AB_i (A with
+column i taken from B). For each output Y, with V = Var(Y):
+
+    first-order index  S_i  = mean(f(B) (f(AB_i) - f(A))) / V
+    total index        ST_i = mean((f(A) - f(AB_i))^2) / (2 V)
+
+(Saltelli et al., 2010, Jansen estimator for ST). Confidence intervals come
+from bootstrapping the N rows. Every run uses the same weather seed, so
+that the indices measure the parameters, not the weather noise.
+
+All comments in English, while variable/function names follow the project.
+"""
+
+import numpy as np
+
+try:
+    from scipy.stats import qmc
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+import Plant_def as Pl
+import optim_GA as Ga
+import optim_CMAES as Cm
+
+# Default parameters and ranges (dotted paths: optim_GA.set_parameter);
+# positive ranges spanning a decade or more are sampled on a log scale
+PARAMETERS = {
+    "watt_to_sugar_coeff": (1e-5, 1e-4),
+    "alloc_repro_max": (0.01, 0.5),
+    "stomatal_density": (5.0e6, 5.0e8),
+    "Environment.base_temp": (5.0, 20.0),
+    "Environment.base_light": (400.0, 1200.0),
+    "Environment.precipitation_base": (0.5, 3.0),
+    "Environment.soil.water": (1e5, 2e6),
+}
+
+# Analysed outputs (keys of optim_GA.run_individual)
+OUTPUTS = ("repro", "necromass", "living")
+
+
+def saltelli_sample(n_base, dim, seed=None):
+    """
+    Matrices A and B (n_base x dim, in the unit box) of a Saltelli design:
+    the two halves of a scrambled Sobol sequence of dimension 2 dim, or of
+    uniform random numbers without scipy.
+    """
+    if SCIPY_AVAILABLE:
+        sampler = qmc.Sobol(2 * dim, scramble=True, seed=seed)
+        base = sampler.random(n_base)
+    else:
+        base = np.random.default_rng(seed).random((n_base, 2 * dim))
+    return base[:, :dim], base[:, dim:]
+
+
+def saltelli_matrix(A, B):
+    """
+    Design of the runs: rows of A, then B, then AB_1 ... AB_d.
+    """
+    n_base, dim = A.shape
+    blocks = [A, B]
+    for i in range(dim):
+        AB = A.copy()
+        AB[:, i] = B[:, i]
+        blocks.append(AB)
+    return np.vstack(blocks)
+
+
+def sobol_indices(fA, fB, fAB):
+    """
+    First-order and total indices from the outputs of A (n), B (n) and
+    AB (n x d).
+    """
+    variance = np.var(np.concatenate([fA, fB]))
+    if variance == 0.0:
+        zeros = np.zeros(fAB.shape[1])
+        return zeros, zeros.copy()
+    S1 = np.mean(fB[:, None] * (fAB - fA[:, None]), axis=0) / variance
+    ST = 0.5 * np.mean((fA[:, None] - fAB) ** 2, axis=0) / variance
+    return S1, ST
+
+
+def analyse(Y, n_base, dim, n_bootstrap=1000, confidence=0.95, seed=None):
+    """
+    Sobol indices and bootstrap confidence intervals of one output.
+
+    Parameters
+    ----------
+    Y : ndarray (n_base (dim + 2),)
+        Outputs of the runs of saltelli_matrix.
+
+    Returns
+    -------
+    dict
+        "S1", "ST" (arrays of dim values) and "S1_conf", "ST_conf"
+        (arrays dim x 2: lower and upper bounds).
+    """
+    fA = Y[:n_base]
+    fB = Y[n_base:2 * n_base]
+    fAB = Y[2 * n_base:].reshape(dim, n_base).T
+    S1, ST = sobol_indices(fA, fB, fAB)
+
+    rng = np.random.default_rng(seed)
+    boot_S1 = np.empty((n_bootstrap, dim))
+    boot_ST = np.empty((n_bootstrap, dim))
+    for b in range(n_bootstrap):
+        rows = rng.integers(n_base, size=n_base)
+        boot_S1[b], boot_ST[b] = sobol_indices(fA[rows], fB[rows], fAB[rows])
+    q = [50 * (1 - confidence), 50 * (1 + confidence)]
+    return {
+        "S1": S1,
+        "ST": ST,
+        "S1_conf": np.percentile(boot_S1, q, axis=0).T,
+        "ST_conf": np.percentile(boot_ST, q, axis=0).T,
+    }
+
+
+def sobol_analysis(
+    species_name="Ble",
+    parameters=None,
+    n_base=64,
+    outputs=OUTPUTS,
+    weather_seed=0,
+    seed=None,
+    n_workers=None,
+    n_hours=None,
+    settings=None,
+    n_bootstrap=1000,
+    confidence=0.95,
+):
+    """
+    Global sensitivity analysis of the final state of runs of 'species_name'.
+
+    Parameters
+    ----------
+    species_name : str
+        Key of the plant species used in Plant_def.species_db.
+    parameters : dict, optional
+        Parameter ranges {name: (low, high)} (default: PARAMETERS).
+    n_base : int
+        Base sample size N (a power of 2 keeps the Sobol sequence
+        balanced); the model is run N (d + 2) times.
+    outputs : tuple of str
+        Analysed outputs (keys of optim_GA.run_individual).
+    weather_seed : int
+        Weather seed shared by all runs.
+    seed : int, optional
+        Seed of the scrambling and of the bootstrap.
+    n_workers : int, optional
+        If > 1, the runs are spread over a process pool.
+    n_hours, settings :
+        Horizon and model settings of the runs (optim_GA.run_individual).
+    n_bootstrap : int
+        Number of bootstrap resamples.
+    confidence : float
+        Level of the confidence intervals.
+
+    Returns
+    -------
+    dict
+        "parameters" (names), "runs" (number of simulations), and for each
+        output a dict of analyse() results plus "ranking" (parameter names
+        by decreasing total index).
+    """
+    parameters = parameters or PARAMETERS
+    space = Cm.ParameterSpace(parameters)
+    dim = space.dim
+
+    A, B = saltelli_sample(n_base, dim, seed)
+    design = saltelli_matrix(A, B)
+    individuals = [space.to_individual(u) for u in design]
+
+    Pl.set_plant_species(Pl.Plant, species_name, Pl.species_db)
+    results = Ga.evaluate_batch(individuals, species_name, n_hours, settings,
+                                n_workers=n_workers, seeds=weather_seed)
+
+    report = {"parameters": space.names, "runs": len(individuals)}
+    for name in outputs:
+        Y = np.array([res[name] for res in results], dtype=float)
+        indices = analyse(Y, n_base, dim, n_bootstrap, confidence, seed)
+        indices["ranking"] = [space.names[i] for i in np.argsort(-indices["ST"])]
+        report[name] = indices
+    return report
+
+
+def print_report(report):
+    """
+    Prints the indices of a sobol_analysis report, by decreasing total
+    index.
+    """
+    names = report["parameters"]
+    for output in report:
+        if output in ("parameters", "runs"):
+            continue
+        indices = report[output]
+        print(f"--- {output} ({report['runs']} runs) ---")
+        print(f"{'parameter':32s} {'S1':>22s} {'ST':>22s}")
+        for name in indices["ranking"]:
+            i = names.index(name)
+            s1_low, s1_high = indices["S1_conf"][i]
+            st_low, st_high = indices["ST_conf"][i]
+            print(f"{name:32s} {indices['S1'][i]:6.3f} [{s1_low:6.3f},{s1_high:6.3f}]"
+                  f" {indices['ST'][i]:6.3f} [{st_low:6.3f},{st_high:6.3f}]")
+
+
+if __name__ == "__main__":
+    sobol_report = sobol_analysis(species_name="quercus_coccifera", n_base=64,
+                                  seed=0)
+    print_report(sobol_report)
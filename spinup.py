@@ -0,0 +1,361 @@
+# spinup.py
+"""
+Accelerated spin-up of perennial plants.
+
+Perennials need several simulated years before their reserves and
+allocation settle. run_spinup simulates year by year (time_loop resume mode)
+and stops as soon as the annual cycle repeats: the tracked states (stock
+biomass, reserves, allocation ratios), read at the end of each year, change
+by less than 'tol' (relative) from one year to the next. Slow geometric
+drifts of the stock biomass and reserves can optionally be extrapolated to
+their limit (Aitken delta-squared) instead of being simulated.
+
+The spun-up state (Plant, Environment with its loop clock, control windows
+of the history) can be saved and restored, and cached_spinup reuses it
+between runs and sessions, keyed by the initial plant and environment and
+the spin-up options.
+
+A spin-up converges in the strict sense when every year has the same
+weather: pass one forcing year wrapped in CyclicForcing. With a weather that
+changes every year, 'tol' must be above the interannual variability.
+
+All comments in English, while variable/function names follow the project.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import random
+
+import numpy as np
+
+import global_constants as Gl
+import Plant_def as Pl
+import Environnement_def as Ev
+import history_def as Hi
+import state_clone as Sc
+import functions as Fu
+import time_loop as Ti
+
+HOURS_PER_YEAR = Gl.ave_day * 365
+
+# Default location of saved spin-up states (overridable with
+# PLANTROID_SPINUP_DIR)
+SPINUP_DIR = os.environ.get(
+    "PLANTROID_SPINUP_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "plantroid", "spinup"),
+)
+
+# Global model settings (Gl) that change the results, part of the cache key
+MODEL_SETTINGS = ("compute_backend", "leaf_search", "leaf_temp_method",
+                  "leaf_search_steps")
+
+# States compared from one year to the next (name -> path in Plant)
+TRACKED_STATES = {
+    "biomass_stock": ("biomass", "stock"),
+    "reserve_sugar": ("reserve", "sugar"),
+    "reserve_nutrient": ("reserve", "nutrient"),
+    "reserve_water": ("reserve", "water"),
+    "ratio_transport": ("ratio_alloc", "transport"),
+    "ratio_stock": ("ratio_alloc", "stock"),
+    "ratio_photo": ("ratio_alloc", "photo"),
+    "ratio_absorp": ("ratio_alloc", "absorp"),
+    "ratio_repro": ("ratio_alloc", "repro"),
+}
+
+# Slow pools whose drift may be extrapolated
+EXTRAPOLATED_STATES = ("biomass_stock", "reserve_sugar", "reserve_nutrient")
+
+
+class CyclicForcing:
+    """
+    Forcing view repeating the same period (e.g. one forcing year of
+    HOURS_PER_YEAR rows) indefinitely: forcing[i] = base[i % period].
+    """
+
+    def __init__(self, base, period=None):
+        self.base = base
+        self.period = len(base) if period is None else period
+
+    def __getitem__(self, i):
+        return self.base[i % self.period]
+
+
+def cycle_signature(Plant):
+    """
+    Values of the TRACKED_STATES of a plant.
+    """
+    return {name: Plant[path[0]][path[1]]
+            for name, path in TRACKED_STATES.items()}
+
+
+def cycle_change(previous, current, floor=1e-6):
+    """
+    Relative change of each tracked state between two signatures:
+    |current - previous| / max(|previous|, |current|, floor).
+    """
+    return {name: abs(current[name] - previous[name])
+            / max(abs(previous[name]), abs(current[name]), floor)
+            for name in current}
+
+
+def extrapolate_drift(Plant, signatures, max_ratio=0.9):
+    """
+    Moves the slow pools (EXTRAPOLATED_STATES) to the limit of their drift
+    when the last three yearly values decrease geometrically:
+    with d1 = x1 - x0, d2 = x2 - x1 and r = d2 / d1 in (0, max_ratio),
+    x_inf = x2 + d2 * r / (1 - r).
+
+    Returns
+    -------
+    dict
+        Extrapolated states and their new values.
+    """
+    x0, x1, x2 = signatures[-3:]
+    moved = {}
+    for name in EXTRAPOLATED_STATES:
+        d1 = x1[name] - x0[name]
+        d2 = x2[name] - x1[name]
+        if d1 == 0.0:
+            continue
+        r = d2 / d1
+        if 0.0 < r < max_ratio:
+            value = max(0.0, x2[name] + d2 * r / (1.0 - r))
+            path = TRACKED_STATES[name]
+            Plant[path[0]][path[1]] = value
+            moved[name] = value
+    if "biomass_stock" in moved:
+        Fu.update_biomass_total(Plant)
+    return moved
+
+
+def run_spinup(max_years=50, forcing=None, tol=1e-3, n_stable=2, min_years=3,
+               extrapolate=False, max_ratio=0.9, resume=False):
+    """
+    Spins up the current plant (Pl.Plant, Ev.Environment) year by year until
+    its annual cycle repeats.
+
+    Parameters
+    ----------
+    max_years : int
+        Maximum number of simulated years.
+    forcing : array-like, optional
+        Hourly forcing (see run_simulation_collect_data), indexed by absolute
+        hour; e.g. CyclicForcing(one_year). None: synthetic weather.
+    tol : float
+        Maximum relative year-to-year change of every tracked state.
+    n_stable : int
+        Number of consecutive years below 'tol' needed to stop.
+    min_years : int
+        Minimum number of simulated years.
+    extrapolate : bool
+        If True, slow geometric drifts of the stock biomass and reserves are
+        extrapolated (extrapolate_drift) as soon as three yearly values
+        are available since the last extrapolation.
+    max_ratio : float
+        Largest year-to-year drift ratio that is extrapolated.
+    resume : bool
+        Continue from Ev.Environment["clock"] instead of starting at hour 1.
+
+    Returns
+    -------
+    dict
+        Spun-up state (see save_state / restore_state), with "info":
+        status ("converged", "max_years" or "dead"), years simulated, the
+        largest relative change of each year, and the extrapolations done.
+
+    Notes
+    -----
+    The history is recorded with the "subset" profile and no hourly channel
+    during the spin-up (only the model's rolling control windows), then the
+    previous recording settings are restored, which clears the history.
+    """
+    settings = Hi.recording_settings()
+    Hi.set_recording_profile("subset", keys=[], day_night=False)
+    info = {"status": "max_years", "years": 0, "changes": [],
+            "extrapolations": []}
+    try:
+        clock = Ev.Environment.get("clock") if resume else None
+        sim_time = clock["sim_time"] if clock else 0
+        signatures = []
+        stable = 0
+        for year in range(max_years):
+            # Years end on the last hour of a day (sim_time = k * 8760 - 1)
+            year_end = (sim_time // HOURS_PER_YEAR + 1) * HOURS_PER_YEAR - 1
+            if year_end <= sim_time:
+                year_end += HOURS_PER_YEAR
+            Ti.run_simulation_collect_data(year_end - sim_time, forcing,
+                                           resume=(year > 0 or resume))
+            sim_time = Ev.Environment["clock"]["sim_time"]
+            if not Pl.Plant["alive"] or sim_time < year_end:
+                info["status"] = "dead"
+                break
+            info["years"] += 1
+
+            signatures.append(cycle_signature(Pl.Plant))
+            if len(signatures) >= 2:
+                change = max(cycle_change(signatures[-2], signatures[-1]).values())
+                info["changes"].append(change)
+                stable = stable + 1 if change < tol else 0
+                if stable >= n_stable and info["years"] >= min_years:
+                    info["status"] = "converged"
+                    break
+
+            if extrapolate and len(signatures) >= 3:
+                moved = extrapolate_drift(Pl.Plant, signatures, max_ratio)
+                if moved:
+                    info["extrapolations"].append({"year": info["years"], **moved})
+                    signatures = [cycle_signature(Pl.Plant)]
+                    stable = 0
+
+        state = current_state(info)
+    finally:
+        Hi.set_recording_profile(**settings)
+    return state
+
+
+def current_state(info=None):
+    """
+    Copy of the current simulation state (Pl.Plant, Ev.Environment with its
+    loop clock, last CONTROL_WINDOW hours of the control channels), in the
+    format of save_state / restore_state.
+    """
+    return {
+        "Plant": Sc.clone_plant(Pl.Plant),
+        "Environment": Sc.clone_environment(Ev.Environment),
+        "history_tail": {key: list(Hi.history[key][-Hi.CONTROL_WINDOW:])
+                         for key in Hi.CONTROL_KEYS},
+        "count_ph": Gl.count_ph,
+        "info": info or {},
+    }
+
+
+def restore_state(state, history_tail=True):
+    """
+    Makes a spun-up state the current one: Pl.Plant and Ev.Environment are
+    updated in place and the phenology counter is restored. Continue with
+    run_simulation_collect_data(..., resume=True) (a state taken before
+    the first hour has no clock: start it with resume=False).
+
+    With history_tail=True, the history channels read by the model
+    (Hi.CONTROL_KEYS) are refilled with the last CONTROL_WINDOW hours of the
+    spin-up, so that the continued run is identical to an uninterrupted
+    one; those channels then start CONTROL_WINDOW hours before "time".
+    With False the history is left as is (daily slopes restart from an
+    empty window, as at the start of a run).
+    """
+    Pl.Plant.clear()
+    Pl.Plant.update(Sc.clone_plant(state["Plant"]))
+    Ev.Environment.clear()
+    Ev.Environment.update(Sc.clone_environment(state["Environment"]))
+    if "count_ph" in state:
+        Gl.count_ph = state["count_ph"]
+    else:
+        Gl.count_ph = Ev.Environment["clock"]["count_ph"]
+    if history_tail:
+        for key, values in state["history_tail"].items():
+            Hi.history[key][:] = values
+
+
+def save_state(path, state):
+    """
+    Writes a spun-up state to 'path' (pickle), atomically.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_state(path):
+    """
+    Reads a state written by save_state.
+    """
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def spinup_key(Plant, Env, forcing_id=None, **options):
+    """
+    Hash identifying a spin-up: initial plant and environment, forcing,
+    model settings (MODEL_SETTINGS) and spin-up options.
+    """
+    content = {
+        "plant": Plant,
+        "environment": {k: v for k, v in Env.items() if k != "clock"},
+        "forcing": forcing_id,
+        "settings": {name: getattr(Gl, name) for name in MODEL_SETTINGS},
+        "options": options,
+        "model_version": Gl.MODEL_VERSION,
+    }
+    text = json.dumps(content, sort_keys=True, default=str)
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+
+def cached_spinup(directory=None, forcing=None, forcing_id=None, seed=None,
+                  **options):
+    """
+    run_spinup with a cache: the state reached from the current plant and
+    environment is saved in 'directory' and restored, instead of being
+    recomputed, by later calls with the same setup.
+
+    The history channels read by the model are refilled (restore_state):
+    select the recording profile of the continued run before calling.
+
+    Parameters
+    ----------
+    directory : str, optional
+        Cache directory (default: SPINUP_DIR).
+    forcing : array-like, optional
+        Forcing of the spin-up (see run_spinup).
+    forcing_id : str, optional
+        Identifier of the forcing in the cache key (e.g. a forcing store
+        key). By default the forcing content is hashed (its 'base' year for
+        a CyclicForcing). With synthetic weather, the weather seed is used,
+        or without seed a hash of the state of the random generator (which
+        draws the weather).
+    seed : int, optional
+        Seed of the synthetic weather of the spin-up (random.seed before
+        the run; the random state is restored afterwards).
+    **options
+        Other run_spinup arguments.
+
+    Returns
+    -------
+    dict
+        The spun-up state, also made current (restore_state).
+    """
+    directory = directory or SPINUP_DIR
+    if forcing_id is None and forcing is not None:
+        base = forcing.base if isinstance(forcing, CyclicForcing) else forcing
+        data = np.ascontiguousarray(
+            base[:options.get("max_years", 50) * HOURS_PER_YEAR], dtype=np.float64)
+        forcing_id = hashlib.sha1(data.tobytes()).hexdigest()
+        if isinstance(forcing, CyclicForcing):
+            forcing_id = f"cyclic-{forcing.period}-{forcing_id}"
+    elif forcing_id is None:
+        if seed is not None:
+            forcing_id = f"synthetic-seed-{seed}"
+        else:
+            forcing_id = "synthetic-" + hashlib.sha1(
+                repr(random.getstate()).encode()).hexdigest()
+    key = spinup_key(Pl.Plant, Ev.Environment, forcing_id, **options)
+    path = os.path.join(directory, f"spinup_{key}.pkl")
+
+    if os.path.exists(path):
+        state = load_state(path)
+    else:
+        random_state = random.getstate()
+        if seed is not None:
+            random.seed(seed)
+        try:
+            state = run_spinup(forcing=forcing, **options)
+        finally:
+            if seed is not None:
+                random.setstate(random_state)
+        save_state(path, state)
+    restore_state(state)
+    return state
@@ -0,0 +1,67 @@
+# state_clone.py
+"""
+Fast copies of the simulation state (Plant, Environment) for the runs of
+optimisers, sweeps and sensitivity analyses.
+
+The state is a tree of dictionaries whose leaves are numbers, strings,
+booleans and a few short lists (stress and success histories, daily minimum
+temperatures). clone_state copies the dictionaries and lists and shares the
+immutable leaves, which is much cheaper than copy.deepcopy (no memo, no
+dispatch per leaf). Subtrees that the model only reads (the species tables
+of SHARED_PLANT_KEYS) are not copied at all: optim_GA.set_parameter copies
+the dictionaries along a path before writing into it, so that sharing them
+is copy-on-write. The history (history_def) is never part of the state.
+
+All comments in English, while variable/function names follow the project.
+"""
+
+import copy
+
+import numpy as np
+
+# Species tables read, never written, by the model: shared between clones
+SHARED_PLANT_KEYS = ("storage_fraction", "reserve_ratio_ps")
+
+# Leaf types shared as they are
+_IMMUTABLE = {float, int, str, bool, type(None), np.float64, np.int64,
+              np.bool_, tuple}
+
+
+def _clone(value):
+    kind = type(value)
+    if kind in _IMMUTABLE:
+        return value
+    if kind is dict:
+        return {key: item if type(item) in _IMMUTABLE else _clone(item)
+                for key, item in value.items()}
+    if kind is list:
+        return [item if type(item) in _IMMUTABLE else _clone(item)
+                for item in value]
+    if kind is np.ndarray:
+        return value.copy()
+    return copy.deepcopy(value)
+
+
+def clone_state(state, shared=()):
+    """
+    Copy of a state dictionary: nested dictionaries, lists and arrays are
+    copied, immutable leaves and the top-level entries listed in 'shared'
+    are shared with 'state'.
+    """
+    return {key: value if key in shared or type(value) in _IMMUTABLE
+            else _clone(value)
+            for key, value in state.items()}
+
+
+def clone_plant(Plant):
+    """
+    Copy of a Plant dictionary sharing its read-only species tables.
+    """
+    return clone_state(Plant, SHARED_PLANT_KEYS)
+
+
+def clone_environment(Environment):
+    """
+    Copy of an Environment dictionary.
+    """
+    return clone_state(Environment)
@@ -0,0 +1,165 @@
+# sweep_journal.py
+"""
+Append-only journal of the runs of a long sweep (grid search, replicates of
+a gradient, ...), so that an interrupted sweep resumes where it stopped.
+
+The journal is a local JSON Lines file. Its first line describes the sweep
+(metadata: function, horizon, model version, ...); every completed run then
+appends one line {"key": ..., "summary": ...} and flushes it. On restart,
+SweepJournal reads the completed keys back and the sweep only runs the
+others; a sweep restarted with different metadata is refused, since its
+cached summaries would not be comparable. A line cut by a crash is ignored.
+
+read_journal reads a journal without opening it for writing, e.g. to compute
+partial aggregates while the sweep is still running.
+
+All comments in English, while variable/function names follow the project.
+"""
+
+import json
+import os
+
+import numpy as np
+
+import global_constants as Gl
+
+
+def _json_default(obj):
+    # NumPy scalars and arrays in keys and summaries
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Not JSON serialisable: {type(obj).__name__}")
+
+
+def _dumps(obj):
+    return json.dumps(obj, sort_keys=True, default=_json_default)
+
+
+def _ends_mid_line(path):
+    # True if the file is not empty and does not end with a newline
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return False
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+
+def run_key(**fields):
+    """
+    Key of a run: canonical JSON of its defining fields (parameter values,
+    seed, replicate index, ...).
+    """
+    return _dumps(fields)
+
+
+def read_journal(path):
+    """
+    Metadata and completed runs of a journal.
+
+    Returns
+    -------
+    (dict, dict)
+        Sweep metadata (None for an empty file) and {key: summary} of the
+        completed runs (the last record wins for a repeated key).
+    """
+    metadata, done = None, {}
+    if not os.path.exists(path):
+        return metadata, done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Line cut by an interrupted write
+                continue
+            if "sweep" in record:
+                metadata = record["sweep"]
+            elif "key" in record:
+                done[record["key"]] = record["summary"]
+    return metadata, done
+
+
+class SweepJournal:
+    """
+    Journal of a sweep opened for resuming and recording runs.
+
+    Parameters
+    ----------
+    path : str
+        Journal file (created if needed).
+    metadata : dict, optional
+        Description of the sweep; must match the one of an existing journal.
+        "model_version" is added.
+    sync : bool
+        If True, every record is also fsync-ed (survives a system crash, not
+        only a crash of the process).
+    """
+
+    def __init__(self, path, metadata=None, sync=False):
+        self.path = path
+        self.sync = sync
+        self.metadata = json.loads(_dumps(
+            dict(metadata or {}, model_version=Gl.MODEL_VERSION)))
+        previous, self.done = read_journal(path)
+        if previous is not None and previous != self.metadata:
+            raise ValueError(
+                f"Journal {path} belongs to another sweep: {previous}")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        if _ends_mid_line(path):
+            # Terminates a record cut by a crash, so that it stays alone on
+            # its (ignored) line
+            self._file.write("\n")
+        if previous is None:
+            self._write({"sweep": self.metadata})
+
+    def _write(self, record):
+        self._file.write(_dumps(record) + "\n")
+        self._file.flush()
+        if self.sync:
+            os.fsync(self._file.fileno())
+
+    def __contains__(self, key):
+        return key in self.done
+
+    def __len__(self):
+        return len(self.done)
+
+    def get(self, key, default=None):
+        """
+        Summary of a completed run.
+        """
+        return self.done.get(key, default)
+
+    def record(self, key, summary):
+        """
+        Records a completed run; returns its summary as stored (JSON types).
+        """
+        summary = json.loads(_dumps(summary))
+        self._write({"key": key, "summary": summary})
+        self.done[key] = summary
+        return summary
+
+    def run(self, key, function, *args, **kwargs):
+        """
+        Summary of the run 'key': from the journal if it is completed,
+        otherwise function(*args, **kwargs), recorded.
+        """
+        if key in self.done:
+            return self.done[key]
+        return self.record(key, function(*args, **kwargs))
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
@@ -0,0 +1,70 @@
+# test_Env_sensitivity_test.py
+"""
+Tests of the common-weather replicates of the gradient tests:
+replicate_weather, the weather passed to each simulation, and
+gradient_effects.
+"""
+
+import numpy as np
+import pytest
+
+import Env_sensitivity_test as Es
+
+
+def test_replicate_weather():
+    assert Es.replicate_weather(3) == [(None, False)] * 3
+    assert Es.replicate_weather(3, seed=10) == [(10, False), (11, False), (12, False)]
+    assert Es.replicate_weather(4, seed=10, antithetic=True) == [
+        (10, False), (10, True), (11, False), (11, True)]
+    with pytest.raises(ValueError):
+        Es.replicate_weather(3, seed=10, antithetic=True)
+
+
+def test_replicates_share_the_weather_across_the_gradient(monkeypatch):
+    calls = []
+
+    def fake_run(species_name, seed=None, antithetic=False, **changed):
+        # Outcome = value + weather noise of the replicate
+        calls.append((changed, seed, antithetic))
+        value = next(iter(changed.values()))
+        noise = 0.0 if seed is None else (seed % 7) * (-1.0 if antithetic else 1.0)
+        return {"biomass": {"necromass": 0.0, "repro": value + noise}}, {}
+
+    monkeypatch.setattr(Es, "run_simulation_with_modified_env", fake_run)
+    stats = Es.run_replicates_for_gradient([1.0, 2.0, 4.0], nb_rep=4,
+                                           species_name="quercus_coccifera",
+                                           mode="temp", seed=3, antithetic=True)
+    assert stats["weather"] == Es.replicate_weather(4, seed=3, antithetic=True)
+    assert [c[1:] for c in calls] == stats["weather"] * 3
+    assert all(list(c[0]) == ["base_temp"] for c in calls)
+
+    # Common weather: the noise cancels out of the paired differences
+    effects = Es.gradient_effects(stats)
+    assert effects["x_from"] == [1.0, 2.0] and effects["x_to"] == [2.0, 4.0]
+    assert effects["effect"] == pytest.approx([1.0, 2.0])
+    assert effects["std_err"] == pytest.approx([0.0, 0.0])
+
+
+def test_gradient_effects_paired_and_independent():
+    values = [[1.0, 2.0, 3.0, 6.0], [2.0, 4.0, 3.0, 7.0]]
+    stats = {"x_values": [0, 1], "repro_values": values,
+             "weather": Es.replicate_weather(4, seed=0)}
+    paired = Es.gradient_effects(stats)
+    diff = np.array(values[1]) - np.array(values[0])
+    assert paired["effect"] == pytest.approx([diff.mean()])
+    assert paired["std_err"] == pytest.approx([diff.std(ddof=1) / 2.0])
+
+    # Antithetic pairs count as one unit, the mean of the two members
+    stats["weather"] = Es.replicate_weather(4, seed=0, antithetic=True)
+    pairs = Es.gradient_effects(stats)
+    pair_diff = np.array([3.0 - 1.5, 5.0 - 4.5])
+    assert pairs["effect"] == pytest.approx([pair_diff.mean()])
+    assert pairs["std_err"] == pytest.approx([pair_diff.std(ddof=1) / np.sqrt(2)])
+
+    # Without a seed: independent samples
+    stats["weather"] = Es.replicate_weather(4)
+    independent = Es.gradient_effects(stats)
+    a, b = np.array(values[0]), np.array(values[1])
+    assert independent["effect"] == pytest.approx([diff.mean()])
+    assert independent["std_err"] == pytest.approx(
+        [np.sqrt(a.var(ddof=1) / 4 + b.var(ddof=1) / 4)])
@@ -0,0 +1,90 @@
+# test_calib_ABC.py
+"""
+Tests of the ABC calibration summaries: stage_transitions, distance, and
+the summary of a short run.
+"""
+
+import pytest
+
+import Environnement_def as Ev
+import Plant_def as Pl
+import calib_ABC as Ca
+import global_constants as Gl
+import history_def as Hi
+import state_clone as Sc
+
+
+def test_stage_transitions():
+    stages = ["seed", "seed", "vegetative", "vegetative", "reproduction",
+              "vegetative", "dormancy"]
+    # 1-based day of the first entry; the initial stage is not a transition
+    assert Ca.stage_transitions(stages) == {"vegetative": 3, "reproduction": 5,
+                                            "dormancy": 7}
+    assert Ca.stage_transitions(["seed"] * 4) == {}
+    assert Ca.stage_transitions([]) == {}
+
+
+def _summary():
+    return {"biomass_total": [1.0, 2.0, 3.0, 4.0],
+            "biomass_repro": [0.0, 0.0, 0.5, 1.0],
+            "transitions": {"vegetative": 2, "reproduction": 3}}
+
+
+def test_distance_is_zero_on_the_observed_values():
+    simulated = _summary()
+    observed = {"days": [1, 3, 4], "biomass_total": [1.0, 3.0, 4.0],
+                "biomass_repro": [0.0, 0.5, 1.0],
+                "transitions": {"vegetative": 2, "reproduction": 3}}
+    assert Ca.distance(simulated, observed) == 0.0
+
+
+def test_distance_terms():
+    simulated = _summary()
+    # Relative RMSE of one series
+    observed = {"days": [2, 4], "biomass_total": [3.0, 5.0]}
+    assert Ca.distance(simulated, observed) == pytest.approx(1.0 / 4.0)
+
+    # After the end of the run (dead plant) the biomass counts as 0
+    observed = {"days": [4, 6], "biomass_total": [4.0, 2.0]}
+    assert Ca.distance(simulated, observed) == pytest.approx(
+        (2.0 ** 2 / 2) ** 0.5 / 3.0)
+
+    # Transition days: mean absolute error over day_scale
+    observed = {"transitions": {"vegetative": 4, "reproduction": 3}}
+    assert Ca.distance(simulated, observed, day_scale=2.0) == pytest.approx(0.5)
+
+    # A stage never reached: run length, or missing_days, of error
+    observed = {"transitions": {"dormancy": 3}}
+    assert Ca.distance(simulated, observed, day_scale=1.0) == 4.0
+    assert Ca.distance(simulated, observed, day_scale=1.0, missing_days=30) == 30.0
+
+    # Series and transitions terms are averaged
+    observed = {"days": [2, 4], "biomass_total": [3.0, 5.0],
+                "transitions": {"vegetative": 4, "reproduction": 3}}
+    assert Ca.distance(simulated, observed, day_scale=2.0) == pytest.approx(
+        (0.25 + 0.5) / 2)
+
+
+@pytest.fixture
+def quercus(monkeypatch):
+    Pl.set_plant_species(Pl.Plant, "quercus_coccifera", Pl.species_db)
+    monkeypatch.setattr(Pl, "Plant", Sc.clone_plant(Pl.Plant))
+    monkeypatch.setattr(Ev, "Environment", Sc.clone_environment(Ev.Environment))
+    monkeypatch.setattr(Hi, "history", {key: [] for key in Hi.history})
+    monkeypatch.setattr(Gl, "count_ph", 0)
+
+
+def test_simulate_summary(quercus):
+    recording = Hi.recording_settings()
+    n_days = 120
+    summary = Ca.simulate({}, n_hours=24 * n_days, seed=2)
+    assert Hi.recording_settings() == recording
+    # Hours 1..24 * n_days: the last hour opens day n_days + 1
+    assert len(summary["biomass_total"]) == len(summary["biomass_repro"]) == n_days + 1
+    assert set(summary["transitions"]) == {"vegetative", "making_reserve"}
+    # Its own trajectory is at distance 0, and a seeded run is repeatable
+    observed = {"days": list(range(1, n_days + 2)),
+                "biomass_total": summary["biomass_total"],
+                "transitions": summary["transitions"]}
+    assert Ca.distance(summary, observed) == 0.0
+    assert Ca.simulate({}, n_hours=24 * n_days, seed=2) == summary
@@ -0,0 +1,73 @@
+# test_decision_table.py
+"""
+Tests of the decision table: plant-size axis and search settings check.
+"""
+
+import numpy as np
+import pytest
+
+import decision_table as Dt
+import kernels as Ke
+
+# Two values per axis around a point where the plant size changes the decision
+AXES = {"light": [300.0, 900.0], "temperature": [15.0, 30.0], "wind": [1.0, 3.0],
+        "RH": [0.5, 0.8], "photo_frac": [0.3, 0.5], "transport_frac": [0.1, 0.3],
+        "absorp_frac": [0.3, 0.5], "soil_moisture": [0.02, 0.2],
+        "biomass": [-2.0, 0.0], "reserve_frac": [0.1, 1.0]}
+
+
+@pytest.fixture(scope="module")
+def table():
+    return Dt.build_decision_table("quercus_coccifera", axes=AXES)
+
+
+def test_table_follows_the_online_search_at_every_size(table):
+    meta = table["metadata"]
+    env_ref = np.array(meta["reference"]["env"])
+    leaf_ref = np.array(meta["reference"]["leaf"])
+    points = np.stack(np.meshgrid(*table["grid"], indexing="ij"), axis=-1)
+    points = points.reshape(-1, len(Dt.TABLE_INPUTS))
+    envs, leaves = Dt._vectors(points, env_ref, leaf_ref,
+                               meta["reference"]["soil_volume"])
+    best = Ke.candidate_scores(envs, leaves, table["candidates"],
+                               1.0, 1.0, 0.0, False).max(axis=1)
+
+    choices = []
+    for point, env, leaf, best_score in zip(points, envs, leaves, best):
+        choice = int(np.argmax(Dt.interpolate_scores(table, point)))
+        got = Ke.candidate_scores(env[None], leaf[None], table["candidates"][[choice]],
+                                  1.0, 1.0, 0.0, False)[0, 0]
+        assert got == pytest.approx(best_score, abs=1e-6)
+        choices.append(choice)
+
+    # The biomass axis is not a dummy one: some decisions depend on it
+    choices = np.array(choices).reshape(table["scores"].shape[:-1])
+    assert np.any(choices[..., 0, :] != choices[..., 1, :])
+
+
+def test_lookup_reads_the_plant_size(table):
+    Plant, Env = Dt.reference_state("quercus_coccifera")
+    inputs = Dt.decision_inputs(Plant, Env)
+    assert inputs[8] == pytest.approx(np.log10(Plant["biomass_total"]))
+    assert inputs[9] == pytest.approx(Plant["reserve"]["water"] / Plant["biomass_total"])
+
+
+def test_lookup_rejects_other_search_settings(table, tmp_path):
+    Plant, Env = Dt.reference_state("quercus_coccifera")
+    search = {"steps": 3, "angle_max": np.pi/2, "alpha": 1.0, "beta": 1.0,
+              "gamma": 0.0, "method": "Newton"}
+    sc, angle = Dt.lookup(Plant, Env, search, table)
+    assert (sc, angle) in {tuple(c) for c in table["candidates"]}
+
+    for change in ({"steps": 5}, {"gamma": 1.0}, {"method": "linear"},
+                   {"angle_max": np.pi/4}):
+        with pytest.raises(ValueError, match=next(iter(change))):
+            Dt.lookup(Plant, Env, dict(search, **change), table)
+
+    # The settings survive a save / load
+    path = str(tmp_path / "table.npz")
+    Dt.save_table(path, table)
+    loaded = Dt.load_table(path)
+    assert loaded["metadata"]["search"] == table["metadata"]["search"]
+    with pytest.raises(ValueError):
+        Dt.lookup(Plant, Env, dict(search, steps=4), loaded)
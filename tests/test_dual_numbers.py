@@ -0,0 +1,121 @@
+# test_dual_numbers.py
+"""
+Tests of the dual-number derivatives of the process functions against
+central finite differences.
+"""
+
+import copy
+import warnings
+
+import pytest
+
+import dual_numbers as Du
+import functions as Fu
+import functions_BE as Be
+import Plant_def as Pl
+import Environnement_def as Ev
+
+
+def _state():
+    # Daylight state of a quercus seedling with every process active
+    Plant = copy.deepcopy(Pl.Plant)
+    Pl.set_plant_species(Plant, "quercus_coccifera", copy.deepcopy(Pl.species_db))
+    Env = copy.deepcopy(Ev.Environment)
+    Env["atmos"].update(light=600.0, temperature=20.0, RH=0.5, wind=1.5)
+    Plant["temperature"]["photo"] = 24.0
+    Plant["leaf_angle"] = 0.3
+    Plant["stomatal_conductance"] = 0.6
+    Plant["r_stomatal"] = 200.0
+    return Plant, Env
+
+
+def _check(evaluate, value, rel=1e-6):
+    # d evaluate / d value: dual number vs central finite difference
+    dual = Du.tangent_of(evaluate(Du.Dual.variable(value, 0, 1)), 1)[0]
+    h = abs(value) * 1e-6
+    fd = (evaluate(value + h) - evaluate(value - h)) / (2.0 * h)
+    assert fd != 0.0
+    assert dual == pytest.approx(fd, rel=rel)
+
+
+@pytest.mark.parametrize("name", ["T_optim", "nutrient_index",
+                                  "watt_to_sugar_coeff"])
+def test_photosynthesis(name):
+    def sugar(x):
+        Plant, Env = _state()
+        Plant[name] = x
+        Fu.photosynthesis(Plant, Env)
+        return Plant["flux_in"]["sugar"]
+    Plant, _ = _state()
+    _check(sugar, Plant[name])
+
+
+@pytest.mark.parametrize("process", ["maintenance", "extension", "secondary"])
+def test_calculate_cost(process):
+    def sugar_cost(x):
+        Plant, _ = _state()
+        Plant["cost_params"]["maintenance"]["sugar"] *= x
+        Plant["cost_params"]["photo"]["sugar"] *= x
+        Plant["new_biomass"] = 1e-3 * x
+        Plant["cost"][process]["sugar"] = 0.0
+        Fu.calculate_cost(Plant, process)
+        return Plant["cost"][process]["sugar"]
+    _check(sugar_cost, 1.3)
+
+
+def test_allocate_biomass():
+    def biomass_total(x):
+        Plant, _ = _state()
+        Plant["ratio_alloc"]["photo"] = x
+        Fu.allocate_biomass(Plant, 2e-3 * x)
+        return Plant["biomass_total"]
+    Plant, _ = _state()
+    _check(biomass_total, Plant["ratio_alloc"]["photo"])
+
+
+@pytest.mark.parametrize("name", ["leaf_size", "leaf_albedo", "r_stomatal"])
+def test_leaf_energy_balance(name):
+    def balance(x):
+        Plant, Env = _state()
+        Plant[name] = x
+        return Be.leaf_energy_balance_plantroid(299.0, Plant, Env)
+
+    def water(x):
+        Plant, Env = _state()
+        Plant[name] = x
+        Be.leaf_energy_balance_plantroid(299.0, Plant, Env)
+        return Plant["cost"]["transpiration"]["water"]
+
+    Plant, _ = _state()
+    _check(balance, Plant[name])
+    if name != "leaf_albedo":
+        _check(water, Plant[name])
+
+
+@pytest.mark.parametrize("solve", [Be.solve_leaf_temperature_Newton,
+                                   Be.approximate_leaf_temperature])
+def test_leaf_temperature(solve):
+    def T_leaf(x):
+        Plant, Env = _state()
+        Plant["leaf_size"] = x
+        return solve(Plant, Env)
+    Plant, _ = _state()
+    _check(T_leaf, Plant["leaf_size"])
+
+
+def test_cell_water_draw():
+    def draw(x):
+        Plant, _ = _state()
+        Plant["max_turgor_loss_frac"] = x
+        return Fu.compute_cell_water_draw(Plant)
+    Plant, _ = _state()
+    _check(draw, Plant["max_turgor_loss_frac"])
+
+
+def test_forward_sensitivities_warns_about_the_switches():
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        values, derivatives = Du.forward_sensitivities(
+            "quercus_coccifera", ["T_optim"], n_hours=48, seed=0)
+    assert any("success/fail" in str(w.message) for w in caught)
+    assert set(derivatives) == set(values)
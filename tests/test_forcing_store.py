@@ -0,0 +1,76 @@
+# test_forcing_store.py
+"""
+Tests of the precomputed forcing store against the live synthetic weather.
+"""
+
+import copy
+import random
+
+import numpy as np
+
+import Environnement_def as Ev
+import Plant_def as Pl
+import forcing_store as Fs
+import history_def as Hi
+import state_clone as Sc
+import time_loop as Ti
+
+
+def _live_rows(Env, seed, n_hours):
+    random.seed(seed)
+    return np.array([Ev.synthetic_forcing(t, Env) for t in range(1, n_hours + 1)])
+
+
+def test_stored_forcing_matches_synthetic_forcing(tmp_path):
+    Env = copy.deepcopy(Ev.Environment)
+    random.seed(123)
+    caller_state = random.getstate()
+    stored = Fs.get_forcing(Env, 4, 24 * 20, directory=str(tmp_path))
+    # The caller's random stream is left untouched
+    assert random.getstate() == caller_state
+
+    assert isinstance(stored, np.memmap)
+    assert stored.shape == (24 * 20, len(Ev.FORCING_COLUMNS))
+    assert np.array_equal(stored, _live_rows(Env, 4, 24 * 20))
+
+    # Shorter request: same file; longer one: rebuilt, same first rows
+    again = Fs.get_forcing(Env, 4, 24 * 5, directory=str(tmp_path))
+    assert again.shape[0] == 24 * 20
+    longer = Fs.get_forcing(Env, 4, 24 * 30, directory=str(tmp_path))
+    assert np.array_equal(longer[:24 * 20], stored)
+    assert np.array_equal(longer, _live_rows(Env, 4, 24 * 30))
+
+
+def test_forcing_key_follows_climate_and_seed():
+    Env = copy.deepcopy(Ev.Environment)
+    key = Fs.forcing_key(Env, 1)
+    assert Fs.forcing_key(copy.deepcopy(Env), 1) == key
+    assert Fs.forcing_key(Env, 2) != key
+    warmer = copy.deepcopy(Env)
+    warmer["base_temp"] += 1.0
+    assert Fs.forcing_key(warmer, 1) != key
+    antithetic = dict(Env, antithetic=True)
+    assert Fs.forcing_key(antithetic, 1) != key
+
+
+def test_run_on_stored_forcing_equals_live_run(tmp_path):
+    Pl.set_plant_species(Pl.Plant, "quercus_coccifera", Pl.species_db)
+    n_hours = 24 * 90
+    forcing = Fs.get_forcing(Ev.Environment, 0, n_hours, directory=str(tmp_path))
+
+    finals = []
+    for use_store in (False, True):
+        original = Pl.Plant, Ev.Environment
+        Pl.Plant = Sc.clone_plant(original[0])
+        Ev.Environment = Sc.clone_environment(original[1])
+        random.seed(0)
+        try:
+            history, plant, _ = Ti.run_simulation_collect_data(
+                n_hours, forcing=forcing if use_store else None)
+            finals.append((copy.deepcopy(history["biomass_total"]),
+                           plant["biomass_total"], plant["phenology_stage"]))
+        finally:
+            Pl.Plant, Ev.Environment = original
+            Hi.clear_history(Hi.history)
+    assert len(finals[0][0]) == n_hours
+    assert finals[0] == finals[1]
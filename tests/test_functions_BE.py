@@ -0,0 +1,63 @@
+# test_functions_BE.py
+"""
+Tests of the leaf (stomata, angle) search of functions_BE: the warm-started
+local mode against the full grid.
+"""
+
+import numpy as np
+
+import Plant_def as Pl
+import functions_BE as Be
+import functions as Fu
+import global_constants as Gl
+import optim_GA as Ga
+import state_clone as Sc
+
+
+def _grid_score(Plant, Env, steps, angle_max, method, alpha, beta, gamma):
+    # Best grid score at the current hour, on a copy of the plant
+    plant = Sc.clone_plant(Plant)
+    plant["solver_stats"] = {}
+    gsmax = Fu.compute_stomatal_conductance_max(plant)
+    c_min = plant["stomatal_conductance_min"]
+    return max(
+        Be.evaluate_leaf_candidate(plant, Env, c_min + i * (1.0 - c_min) / steps,
+                                   j * angle_max / steps, gsmax,
+                                   alpha, beta, gamma, method)[0]
+        for i in range(steps + 1) for j in range(steps + 1))
+
+
+def test_local_search_matches_grid_with_fewer_evaluations(monkeypatch):
+    Pl.set_plant_species(Pl.Plant, "quercus_coccifera", Pl.species_db)
+    adjust = Be.adjust_leaf_params_angle
+    differences = []
+    stats = {}
+
+    def compared(Plant, Env, alpha=1.0, beta=1.0, gamma=1.0, steps=3,
+                 angle_max=np.pi / 2, method="Newton", search="grid",
+                 *args, **kwargs):
+        # Top-level call of the loop: local search, scored against the grid
+        monkeypatch.setattr(Be, "adjust_leaf_params_angle", adjust)
+        try:
+            grid = _grid_score(Plant, Env, steps, angle_max, method,
+                               alpha, beta, gamma)
+            adjust(Plant, Env, alpha, beta, gamma, steps, angle_max, method,
+                   "local", *args, **kwargs)
+        finally:
+            monkeypatch.setattr(Be, "adjust_leaf_params_angle", compared)
+        differences.append(Plant["leaf_search"]["score"] - grid)
+        stats.update(Be.total_solver_stats(Plant))
+
+    monkeypatch.setattr(Be, "adjust_leaf_params_angle", compared)
+    Ga.run_individual({}, n_hours=120 * Gl.ave_day, seed=0)
+
+    differences = np.array(differences)
+    steps = Gl.leaf_search_steps
+    # As good as the grid on average, never much worse
+    assert differences.mean() > -1e-3
+    assert differences.min() > -0.1
+    # Far fewer candidates, and the grid stays the exception
+    candidates = stats["grid_candidates"] + stats["local_candidates"]
+    assert candidates / len(differences) < 0.5 * (steps + 1) ** 2
+    assert stats["local_candidates"] <= 8 * stats["local_searches"]
+    assert stats["grid_fallbacks"] < 0.05 * stats["local_searches"]
@@ -0,0 +1,36 @@
+# test_history_def.py
+"""
+Tests of the recording profiles of history_def.
+"""
+
+import Plant_def as Pl
+import history_def as Hi
+import optim_GA as Ga
+
+
+def _run(**profile):
+    Pl.set_plant_species(Pl.Plant, "quercus_coccifera", Pl.species_db)
+    saved = Hi.recording_settings()
+    Hi.set_recording_profile(**profile)
+    try:
+        Ga.run_individual({}, n_hours=72, seed=0)
+        return {key: list(values) for key, values in Hi.history.items()}, \
+            Hi.day_night_tables()
+    finally:
+        Hi.set_recording_profile(**saved)
+
+
+def test_day_night_is_opt_in():
+    history, (day_data, night_data) = _run()
+    assert len(history["time"]) == 72
+    assert day_data == {"time": []} and night_data == {"time": []}
+
+
+def test_day_night_means():
+    history, (day_data, night_data) = _run(day_night=True)
+    assert day_data["time"] == night_data["time"] == [1, 2, 3, 4]
+    # Mean of the daytime hours of the second day (hours 24..47)
+    hours = [i for i, t in enumerate(history["time"]) if t // 24 == 1
+             and history["atmos_light"][i] > 1.0]
+    expected = sum(history["biomass_total"][i] for i in hours) / len(hours)
+    assert abs(day_data["biomass_total"][1] - expected) < 1e-12
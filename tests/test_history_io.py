@@ -0,0 +1,61 @@
+# test_history_io.py
+"""
+Tests of the columnar history export: save / load round trips.
+"""
+
+import numpy as np
+import pytest
+
+import history_io as Io
+
+FORMATS = ["run.npz", "run_dir", "run.parquet", "run.arrow"]
+
+
+def _history(n, shift=0.0):
+    # History-like dictionary: numbers, strings, and a channel recorded
+    # less often than "time" (not exported)
+    return {
+        "time": list(range(n)),
+        "biomass_total": [0.01 + shift + 1e-4 * i for i in range(n)],
+        "phenology_stage": ["germination"] * (n // 2) + ["vegetative"] * (n - n // 2),
+        "reserve_used_maintenance": [i % 3 == 0 for i in range(n)],
+        "daily_mean": [1.0],
+    }
+
+
+def _require(name):
+    if name.endswith((".parquet", ".arrow")):
+        pytest.importorskip("pyarrow")
+
+
+@pytest.mark.parametrize("name", FORMATS)
+def test_history_round_trip(tmp_path, name):
+    _require(name)
+    path = str(tmp_path / name)
+    history = _history(30)
+    metadata = Io.run_metadata("quercus_coccifera", seed=5, weather="synthetic")
+    Io.save_history(path, history, metadata)
+
+    columns, meta = Io.load_history(path)
+    assert set(columns) == set(history) - {"daily_mean"}
+    for key in columns:
+        assert np.asarray(columns[key]).tolist() == history[key]
+    assert meta == metadata
+
+
+@pytest.mark.parametrize("name", FORMATS)
+def test_batch_round_trip(tmp_path, name):
+    _require(name)
+    path = str(tmp_path / name)
+    runs = [(_history(n, shift=n), {"rep": k}) for k, n in enumerate((12, 7, 20))]
+    Io.save_batch(path, runs)
+
+    columns, metadata = Io.load_batch(path)
+    assert metadata["offsets"] == [0, 12, 19, 39]
+    assert np.asarray(columns["run_index"]).tolist() == [0] * 12 + [1] * 7 + [2] * 20
+    loaded = list(Io.iter_runs(columns, metadata))
+    assert len(loaded) == len(runs)
+    for (run_columns, meta), (history, expected_meta) in zip(loaded, runs):
+        assert meta == expected_meta
+        for key in run_columns:
+            assert np.asarray(run_columns[key]).tolist() == history[key]
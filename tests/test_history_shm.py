@@ -0,0 +1,115 @@
+# test_history_shm.py
+"""
+Tests of the shared-memory histories: export / attach round trip, and no
+block left in /dev/shm after a release, a discarded handle, garbage
+collection or a failed batch.
+"""
+
+import gc
+import os
+
+import numpy as np
+import pytest
+
+import Environnement_def as Ev
+import Plant_def as Pl
+import global_constants as Gl
+import history_def as Hi
+import history_shm as Hs
+import optim_GA as Ga
+import phenology_def as Ph
+import state_clone as Sc
+
+pytestmark = pytest.mark.skipif(not os.path.isdir("/dev/shm"),
+                                reason="needs /dev/shm")
+
+N_HOURS = 24 * 30
+
+
+def _blocks():
+    return {name for name in os.listdir("/dev/shm") if name.startswith("psm_")}
+
+
+@pytest.fixture
+def no_leak():
+    # Fails the test if it leaves a block behind
+    before = _blocks()
+    yield
+    assert _blocks() == before
+
+
+@pytest.fixture
+def quercus(monkeypatch):
+    Pl.set_plant_species(Pl.Plant, "quercus_coccifera", Pl.species_db)
+    monkeypatch.setattr(Pl, "Plant", Sc.clone_plant(Pl.Plant))
+    monkeypatch.setattr(Ev, "Environment", Sc.clone_environment(Ev.Environment))
+    monkeypatch.setattr(Hi, "history", {key: [] for key in Hi.history})
+    monkeypatch.setattr(Gl, "count_ph", 0)
+
+
+def _columns():
+    return {"time": np.arange(5, dtype=np.int64),
+            "biomass_total": np.linspace(0.01, 0.05, 5),
+            "phenology_stage": np.array([0, 0, 1, 1, Hs.UNKNOWN_STAGE], dtype=np.int8),
+            "reserve_used_maintenance": np.array([True, False, True, False, True])}
+
+
+def test_export_attach_release(no_leak):
+    columns = _columns()
+    handle = Hs.export_columns(columns)
+    assert handle["name"] in _blocks()
+
+    shared = Hs.SharedHistory(handle)
+    assert shared.length == 5
+    for key, values in columns.items():
+        assert shared.columns[key].dtype == values.dtype
+        assert np.array_equal(shared.columns[key], values)
+    assert shared.stages() == [Ph.STAGES[0]] * 2 + [Ph.STAGES[1]] * 2 + [None]
+    shared.release()
+    assert handle["name"] not in _blocks()
+
+    # with block, and garbage collection of a history never released
+    with Hs.SharedHistory(Hs.export_columns(columns)) as shared:
+        assert np.array_equal(shared.columns["time"], columns["time"])
+    shared = Hs.SharedHistory(Hs.export_columns(columns))
+    del shared
+    gc.collect()
+
+
+def test_text_channel_and_discarded_handle(no_leak):
+    with pytest.raises(ValueError):
+        Hs.export_columns({"time": np.arange(3), "label": np.array(["a", "b", "c"])})
+    handle = Hs.export_columns(_columns())
+    Hs.discard_handle(handle)
+    assert handle["name"] not in _blocks()
+    # Discarding twice is harmless
+    Hs.discard_handle(handle)
+
+
+def test_batch_histories_match_the_runs(quercus, no_leak):
+    individuals = [{"alloc_repro_max": a} for a in (0.3, 0.9)]
+    batch = Hs.evaluate_batch_with_histories(individuals, "quercus_coccifera",
+                                             n_hours=N_HOURS, seeds=0)
+    saved_recording = Hi.recording_settings()
+    Hi.set_recording_profile(**Hs.RECORDING)
+    try:
+        for individual, (objectives, shared) in zip(individuals, batch):
+            with shared:
+                assert objectives == Ga.run_individual(individual, N_HOURS, seed=0)
+                history = shared.to_history()
+                assert shared.length == len(Hi.history["time"]) == N_HOURS
+                for key in ("time", "biomass_total", "phenology_stage"):
+                    assert history[key] == Hi.history[key], key
+    finally:
+        Hi.set_recording_profile(**saved_recording)
+
+
+@pytest.mark.parametrize("n_workers", [None, 2])
+def test_failed_batch_leaves_no_block(quercus, no_leak, n_workers):
+    # The second run fails (unknown nested parameter)
+    individuals = [{"alloc_repro_max": 0.3}, {"Plant.no_such_table.x": 1.0},
+                   {"alloc_repro_max": 0.9}]
+    with pytest.raises(KeyError):
+        Hs.evaluate_batch_with_histories(individuals, "quercus_coccifera",
+                                         n_hours=24 * 5, seeds=0,
+                                         n_workers=n_workers)
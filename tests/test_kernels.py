@@ -0,0 +1,88 @@
+# test_kernels.py
+"""
+Tests of the compiled backend (Gl.compute_backend = "kernels") against the
+dictionary backend.
+"""
+
+import random
+
+import Environnement_def as Ev
+import Plant_def as Pl
+import history_def as Hi
+import optim_GA as Ga
+import state_clone as Sc
+import time_loop as Ti
+
+
+def _numbers(tree, prefix=""):
+    # Numeric leaves of a state, by dotted path (the solver counters are
+    # not compared: the kernels do not report Newton convergence)
+    values = {}
+    for key, value in tree.items():
+        if key == "solver_stats":
+            continue
+        if isinstance(value, dict):
+            values.update(_numbers(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[prefix + key] = float(value)
+    return values
+
+
+def _run(plant, env, hours, settings, resume=False, seed=0):
+    # Runs the loop on clones of (plant, env); returns the final clones
+    original = Pl.Plant, Ev.Environment
+    Pl.Plant, Ev.Environment = Sc.clone_plant(plant), Sc.clone_environment(env)
+    random.seed(seed)
+    try:
+        with Ga.model_settings(settings):
+            Ti.run_simulation_collect_data(hours, resume=resume)
+        return Pl.Plant, Ev.Environment
+    finally:
+        Pl.Plant, Ev.Environment = original
+
+
+def test_hourly_steps_match_python_backend():
+    Pl.set_plant_species(Pl.Plant, "quercus_coccifera", Pl.species_db)
+    # Grown plant, at 8:00 of a spring day
+    plant, env = _run(Pl.Plant, Ev.Environment, 130 * 24 + 8,
+                      {"compute_backend": "python"})
+    for method in ("Newton", "linear"):
+        results = [_numbers(_run(plant, env, 8, {"compute_backend": backend,
+                                                 "leaf_temp_method": method},
+                                 resume=True, seed=1)[0])
+                   for backend in ("python", "kernels")]
+        python, kernels = results
+        assert python.keys() == kernels.keys()
+        for path, value in python.items():
+            assert abs(kernels[path] - value) <= 1e-9 * max(abs(value), 1e-12), \
+                (method, path)
+
+
+def test_short_run_matches_python_backend():
+    Pl.set_plant_species(Pl.Plant, "quercus_coccifera", Pl.species_db)
+    saved = Hi.recording_settings()
+    runs = {}
+    try:
+        for method in ("linear", "Newton"):
+            for backend in ("python", "kernels"):
+                Hi.set_recording_profile("subset", keys=["phenology_stage"])
+                objectives = Ga.run_individual(
+                    {}, 2000, {"compute_backend": backend,
+                               "leaf_temp_method": method}, seed=0)
+                runs[method, backend] = (objectives,
+                                         list(Hi.history["phenology_stage"]))
+    finally:
+        Hi.set_recording_profile(**saved)
+
+    # Linear leaf temperature: same arithmetic, same results
+    python, kernels = runs["linear", "python"][0], runs["linear", "kernels"][0]
+    for key, value in python.items():
+        assert abs(kernels[key] - value) <= 1e-12 * max(abs(value), 1e-12), key
+
+    # Newton: compiled exp/pow differ at the last ulp and can flip a few
+    # exact-threshold branches; same phenology, biomass within 0.5 %
+    (python, python_stages), (kernels, kernels_stages) = \
+        runs["Newton", "python"], runs["Newton", "kernels"]
+    assert python_stages == kernels_stages
+    for key in ("living", "necromass", "repro"):
+        assert abs(kernels[key] - python[key]) <= 5e-3 * max(abs(python[key]), 1e-12), key
@@ -0,0 +1,68 @@
+# test_optim_BrutForce.py
+"""
+Tests of the journaled grid search: interruption, resume and refused
+changes of the sweep.
+"""
+
+import pytest
+
+import global_constants as Gl
+import optim_BrutForce as Bf
+import Plant_def as Pl
+import time_loop as Ti
+
+GRID = {"r_max": [0.001, 0.01], "alpha": [0.0001, 0.001]}
+SPECIES = "quercus_coccifera"
+
+
+@pytest.fixture
+def short_runs(monkeypatch):
+    # Short horizon, and a count of the simulations actually run
+    monkeypatch.setattr(Gl, "max_cycles", 24 * 80)
+    calls = []
+    run = Ti.run_simulation_collect_data
+
+    def counted(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == counted.interrupt_at:
+            raise KeyboardInterrupt
+        return run(*args, **kwargs)
+
+    counted.interrupt_at = None
+    monkeypatch.setattr(Ti, "run_simulation_collect_data", counted)
+    return counted, calls
+
+
+def test_interrupted_sweep_resumes_where_it_stopped(tmp_path, short_runs):
+    counted, calls = short_runs
+    expected = Bf.optimize_parameters(seed=3, species_name=SPECIES, grid=GRID)
+    assert len(calls) == 4
+
+    journal = str(tmp_path / "sweep.jsonl")
+    calls.clear()
+    counted.interrupt_at = 3
+    with pytest.raises(KeyboardInterrupt):
+        Bf.optimize_parameters(journal, seed=3, species_name=SPECIES, grid=GRID)
+
+    # Only the interrupted combination and the last one are simulated again
+    calls.clear()
+    counted.interrupt_at = None
+    assert Bf.optimize_parameters(journal, seed=3, species_name=SPECIES,
+                                  grid=GRID) == expected
+    assert len(calls) == 2
+
+
+def test_journal_refuses_another_sweep(tmp_path, short_runs, monkeypatch):
+    # Same parameters under another name: only the metadata differs
+    monkeypatch.setitem(Pl.species_db, "quercus_copy", Pl.species_db[SPECIES])
+    journal = str(tmp_path / "sweep.jsonl")
+    Bf.optimize_parameters(journal, seed=3, species_name=SPECIES, grid=GRID)
+    for changed in ({"species_name": "quercus_copy"},
+                    {"grid": dict(GRID, alpha=[0.0001, 0.002])},
+                    {"seed": 4}):
+        arguments = dict({"seed": 3, "species_name": SPECIES, "grid": GRID},
+                         **changed)
+        with pytest.raises(ValueError, match="another sweep"):
+            Bf.optimize_parameters(journal, **arguments)
+    with pytest.raises(ValueError):
+        Bf.optimize_parameters(journal, seed=3, grid=GRID)
@@ -0,0 +1,17 @@
+# test_optim_GA.py
+"""
+Tests of the run helpers of optim_GA.
+"""
+
+import Plant_def as Pl
+import optim_GA as Ga
+
+
+def test_run_individual_is_repeatable():
+    # A run must not depend on the runs made before it in the process
+    # (phenology counter, global Plant / Environment, history)
+    Pl.set_plant_species(Pl.Plant, "quercus_coccifera", Pl.species_db)
+    individual = {"alloc_repro_max": 0.3}
+    first = Ga.run_individual(individual, n_hours=2500, seed=0)
+    second = Ga.run_individual(individual, n_hours=2500, seed=0)
+    assert first == second
@@ -0,0 +1,79 @@
+# test_parareal.py
+"""
+Tests of the Parareal driver against a sequential run.
+"""
+
+import copy
+
+import numpy as np
+import pytest
+
+import Environnement_def as Ev
+import Plant_def as Pl
+import forcing_store as Fs
+import global_constants as Gl
+import history_def as Hi
+import parareal as Pa
+import state_clone as Sc
+import time_loop as Ti
+
+N_YEARS = 2
+RECORDING = {"profile": "subset", "keys": ["biomass_total", "phenology_stage"],
+             "day_night": False}
+
+
+@pytest.fixture
+def setup(monkeypatch, tmp_path):
+    # Clones of the global state, stored forcing, recording restored after
+    Pl.set_plant_species(Pl.Plant, "quercus_coccifera", Pl.species_db)
+    monkeypatch.setattr(Pl, "Plant", Sc.clone_plant(Pl.Plant))
+    monkeypatch.setattr(Ev, "Environment", Sc.clone_environment(Ev.Environment))
+    monkeypatch.setattr(Hi, "history", {key: [] for key in Hi.history})
+    monkeypatch.setattr(Gl, "count_ph", 0)
+    saved_recording = Hi.recording_settings()
+    forcing = Fs.get_forcing(Ev.Environment, 0, N_YEARS * Pa.HOURS_PER_YEAR,
+                             directory=str(tmp_path))
+
+    # Sequential reference
+    plant, env = Sc.clone_plant(Pl.Plant), Sc.clone_environment(Ev.Environment)
+    Hi.set_recording_profile(**RECORDING)
+    history, final_plant, _ = Ti.run_simulation_collect_data(
+        Pa.slice_bounds(N_YEARS)[-1], forcing)
+    serial = (copy.deepcopy(history), copy.deepcopy(final_plant))
+
+    Pl.Plant.clear()
+    Pl.Plant.update(plant)
+    Ev.Environment.clear()
+    Ev.Environment.update(env)
+    Hi.clear_history(Hi.history)
+    yield forcing, serial
+    Hi.set_recording_profile(**saved_recording)
+
+
+def _without_counters(plant):
+    plant = dict(plant)
+    plant.pop("solver_stats")
+    return plant
+
+
+def test_parareal_with_all_iterations_equals_serial(setup):
+    forcing, (serial_history, serial_plant) = setup
+    history, plant, _, info = Pa.run_parareal(N_YEARS, forcing, n_workers=2,
+                                              tol=0.0, recording=RECORDING)
+    assert info["iterations"] == N_YEARS and info["converged"]
+    assert _without_counters(plant) == _without_counters(serial_plant)
+    assert history["biomass_total"] == serial_history["biomass_total"]
+    assert history["phenology_stage"] == serial_history["phenology_stage"]
+
+
+def test_parareal_converged_result_is_close_to_serial(setup):
+    forcing, (serial_history, serial_plant) = setup
+    history, plant, _, info = Pa.run_parareal(N_YEARS, forcing, n_workers=2,
+                                              tol=1e-3, recording=RECORDING)
+    assert info["converged"]
+    assert plant["phenology_stage"] == serial_plant["phenology_stage"]
+    assert plant["biomass_total"] == pytest.approx(serial_plant["biomass_total"],
+                                                   rel=1e-2)
+    assert len(history["biomass_total"]) == len(serial_history["biomass_total"])
+    assert np.allclose(history["biomass_total"], serial_history["biomass_total"],
+                       rtol=1e-2)
@@ -0,0 +1,228 @@
+# test_phenology_def.py
+"""
+Tests of the phenology transition tables against the hand-written
+phenology_annual / _biannual / _perennial chains they replaced (copied
+below as the reference), for one plant and for a batch.
+"""
+
+import copy
+import random
+
+import numpy as np
+import pytest
+
+import Environnement_def as Ev
+import Plant_def as Pl
+import functions as Fu
+import global_constants as Gl
+import history_def as Hi
+import phenology_def as Ph
+
+
+###############################################
+#      REFERENCE: FORMER IF-CHAINS            #
+###############################################
+
+def _warm_week(Plant, daily_min_temps):
+    return (len(daily_min_temps) >= Gl.ave_week
+            and all(t > Plant["dormancy_thrs_temp"]
+                    for t in daily_min_temps[-Gl.ave_week:]))
+
+
+def _sugar_mean():
+    cost = np.array(Hi.history.get("cost_maintenance_sugar"))
+    photo = np.array(Hi.history.get("actual_sugar"))
+    return np.mean((cost - photo)[-Gl.ave_day * Gl.nb_days:])
+
+
+def legacy_annual(Plant, day_index, daily_min_temps):
+    photoperiod_today = Ev.calc_daily_photoperiod(day_index)
+    Gl.count_ph += 1
+    if Plant["phenology_stage"] == "vegetative" and Gl.count_ph > Gl.ave_day * Gl.nb_days:
+        sugar_mean = _sugar_mean()
+    else:
+        sugar_mean = 0.0
+
+    if Plant["phenology_stage"] in ["seed", "dormancy"]:
+        if _warm_week(Plant, daily_min_temps):
+            Plant["phenology_stage"] = "vegetative"
+            Fu.update_phenological_parameters(Plant)
+        return
+    if sugar_mean < Gl.slope_thrs and Plant["phenology_stage"] == "vegetative":
+        Plant["reproduction_ref"] = Plant["biomass_total"]
+        Plant["phenology_stage"] = "reproduction"
+        Fu.update_phenological_parameters(Plant)
+        return
+    if photoperiod_today >= 15.5 and Plant["phenology_stage"] == "reproduction":
+        Plant["phenology_stage"] = "dessication"
+        return
+
+
+def legacy_biannual(Plant, day_index, daily_min_temps):
+    photoperiod_today = Ev.calc_daily_photoperiod(day_index)
+    photoperiod_yesterday = Ev.calc_daily_photoperiod(day_index - 1)
+    sugar_slope = Fu.slope_last_hours(Hi.history["reserve_sugar"], nb_hours=Gl.ave_day * Gl.nb_days)
+    photo_slope = Fu.slope_last_hours(Hi.history["pot_sugar"], nb_hours=Gl.ave_day * Gl.nb_days)
+
+    if Plant["phenology_stage"] in ["seed"]:
+        if _warm_week(Plant, daily_min_temps):
+            Plant["phenology_stage"] = "vegetative"
+            Fu.update_phenological_parameters(Plant)
+        return
+    if Plant["phenology_stage"] in ["dormancy"] and day_index > 365:
+        if _warm_week(Plant, daily_min_temps):
+            Plant["phenology_stage"] = "reproduction"
+            Fu.update_phenological_parameters(Plant)
+        return
+    if (photo_slope < Gl.slope_thrs and photoperiod_today < photoperiod_yesterday
+            and Plant["phenology_stage"] == "vegetative"):
+        Plant["phenology_stage"] = "making_reserve"
+        Fu.update_phenological_parameters(Plant)
+        return
+    if (day_index < 365 and sugar_slope < Gl.slope_thrs
+            and Plant["phenology_stage"] == "making_reserve"):
+        Plant["phenology_stage"] = "dessication"
+        Fu.update_phenological_parameters(Plant)
+        return
+    if Plant["biomass"]["photo"] < 0.001 and Plant["phenology_stage"] == "dessication":
+        Plant["phenology_stage"] = "dormancy"
+        Fu.update_phenological_parameters(Plant)
+        Plant["ratio_alloc"] = {"photo": 0.2, "transport": 0.1, "stock": 0.0,
+                                "absorp": 0.2, "repro": Plant["alloc_repro_max"]}
+        Fu.check_alloc(Plant)
+
+
+def legacy_perennial(Plant, day_index, daily_min_temps):
+    photoperiod_today = Ev.calc_daily_photoperiod(day_index)
+    Gl.count_ph += 1
+    if Gl.count_ph > Gl.ave_day * Gl.nb_days:
+        sugar_mean = _sugar_mean()
+    else:
+        sugar_mean = 0.0
+
+    if Plant["phenology_stage"] == "seed":
+        if _warm_week(Plant, daily_min_temps):
+            Plant["phenology_stage"] = "vegetative"
+            Fu.update_phenological_parameters(Plant)
+        return
+    if Plant["phenology_stage"] == "dormancy" and day_index > 365:
+        if _warm_week(Plant, daily_min_temps):
+            Plant["phenology_stage"] = "reproduction"
+            Plant["dormancy_index"] = 1.0
+            Plant["cost_params"]["maintenance"]["sugar"] = 5e-7
+            Fu.update_phenological_parameters(Plant)
+        return
+    if Plant["phenology_stage"] == "reproduction" and photoperiod_today > 14:
+        Plant["phenology_stage"] = "vegetative"
+        Plant["ratio_alloc"] = Plant["save_alloc"]
+        Fu.check_alloc(Plant)
+        Fu.update_phenological_parameters(Plant)
+        Gl.count_ph = 0
+        return
+    if sugar_mean < Gl.slope_thrs and Plant["phenology_stage"] == "vegetative":
+        Plant["phenology_stage"] = "making_reserve"
+        Plant["save_alloc"] = Plant["ratio_alloc"]
+        Plant["ratio_alloc"] = {"photo": 0.0, "transport": 0.0, "stock": 1.0,
+                                "absorp": 0.0, "repro": 0.0}
+        Fu.check_alloc(Plant)
+        Fu.update_phenological_parameters(Plant)
+        Gl.count_ph = 0
+        return
+    if sugar_mean < Gl.slope_thrs and Plant["phenology_stage"] == "making_reserve":
+        Plant["phenology_stage"] = "dessication"
+        Fu.update_phenological_parameters(Plant)
+        return
+    if (Plant["biomass"]["photo"] < Plant["leaf_shredding_ratio"]
+            and Plant["phenology_stage"] == "dessication"):
+        Plant["phenology_stage"] = "dormancy"
+        Fu.update_phenological_parameters(Plant)
+        Plant["ratio_alloc"] = {"photo": 0.3, "transport": 0.0, "stock": 0.0,
+                                "absorp": 0.3, "repro": 0.1}
+        Fu.check_alloc(Plant)
+
+
+LEGACY = {"annual": legacy_annual, "biannual": legacy_biannual,
+          "perennial": legacy_perennial}
+
+
+###############################################
+#               RANDOM STATES                 #
+###############################################
+
+def _random_case(rng, base, growth_type):
+    # One plant, its history, daily minima, counter, near the thresholds
+    P = copy.deepcopy(base)
+    P["growth_type"] = growth_type
+    P["phenology_stage"] = rng.choice(Ph.STAGES)
+    P["reserve_ratio_ps"] = {s: rng.random() for s in Ph.STAGES}
+    P["biomass"]["photo"] = rng.choice([0.0005, 0.002, 0.5])
+    P["biomass_total"] = rng.random()
+    P["ratio_alloc"] = {k: rng.random() for k in Ph.ALLOC_KEYS}
+    P["save_alloc"] = {k: rng.random() for k in Ph.ALLOC_KEYS}
+    P["alloc_repro_max"] = rng.random()
+    P["leaf_shredding_ratio"] = 0.001
+    n = rng.choice([0, 10, 24 * Gl.nb_days + 5])
+    history = {k: [rng.gauss(0, 1e-8) for _ in range(n)]
+               for k in ("cost_maintenance_sugar", "actual_sugar",
+                         "reserve_sugar", "pot_sugar")}
+    mins = [rng.uniform(-2, 10) for _ in range(rng.choice([3, 10, 30]))]
+    count = rng.choice([0, 50, 24 * Gl.nb_days + 3])
+    return P, history, mins, count
+
+
+@pytest.fixture
+def base_plant(monkeypatch):
+    # The legacy chains and the tables read and write these globals
+    monkeypatch.setattr(Hi, "history", Hi.history)
+    monkeypatch.setattr(Gl, "count_ph", Gl.count_ph)
+    base = copy.deepcopy(Pl.Plant)
+    Pl.set_plant_species(base, "quercus_coccifera", copy.deepcopy(Pl.species_db))
+    return base
+
+
+# Empty histories give NaN sugar means (warnings), as in the former chains
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+@pytest.mark.parametrize("growth_type", ["annual", "biannual", "perennial"])
+def test_tables_match_legacy_chains(base_plant, growth_type):
+    rng = random.Random(1)
+    transitions = 0
+    for trial in range(60):
+        day = rng.choice([100, 200, 364, 366, 400, 500])
+        cases = [_random_case(rng, base_plant, growth_type) for _ in range(10)]
+        plants = [case[0] for case in cases]
+
+        # Batch evaluation of the same cases
+        stages, state = Ph.batch_state(plants, [case[3] for case in cases])
+        names = Ph.rule_inputs(growth_type)
+        indicators = Ph.batch_indicators(plants, day, [case[2] for case in cases],
+                                         [case[1] for case in cases], names)
+        new_stages, fired = Ph.step_phenology_batch(growth_type, stages,
+                                                    indicators, state)
+        batch = copy.deepcopy(plants)
+        Ph.apply_batch_state(batch, growth_type, new_stages, state, fired)
+
+        for i, (P, history, mins, count) in enumerate(cases):
+            legacy, table = copy.deepcopy(P), copy.deepcopy(P)
+            Hi.history = history
+            Gl.count_ph = count
+            LEGACY[growth_type](legacy, day, mins)
+            legacy_count = Gl.count_ph
+            Gl.count_ph = count
+            Ph.step_phenology(table, day, mins, growth_type)
+
+            transitions += legacy["phenology_stage"] != P["phenology_stage"]
+            assert table == legacy
+            assert Gl.count_ph == legacy_count == state["count_ph"][i]
+            # perennial regrowth shares the allocation dicts, as before
+            assert (table["ratio_alloc"] is table["save_alloc"]) == \
+                (legacy["ratio_alloc"] is legacy["save_alloc"])
+
+            for key in ("phenology_stage", "reserve_ratio", "reproduction_ref",
+                        "dormancy_index", "ratio_alloc", "save_alloc"):
+                assert batch[i][key] == legacy[key], key
+            assert (batch[i]["cost_params"]["maintenance"]["sugar"]
+                    == legacy["cost_params"]["maintenance"]["sugar"])
+            assert (batch[i]["ratio_alloc"] is batch[i]["save_alloc"]) == \
+                (legacy["ratio_alloc"] is legacy["save_alloc"])
+    # The random states do exercise the transitions
+    assert transitions > 20
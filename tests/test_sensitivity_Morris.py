@@ -0,0 +1,56 @@
+# test_sensitivity_Morris.py
+"""
+Tests of the trajectories and elementary effects of sensitivity_Morris on
+analytic functions.
+"""
+
+import numpy as np
+
+import sensitivity_Morris as Mo
+
+
+def _outputs(function, points):
+    n_traj, n_points, dim = points.shape
+    return function(points.reshape(-1, dim)).reshape(n_traj, n_points)
+
+
+def test_trajectories_move_each_parameter_once():
+    levels = 4
+    points, moved, steps = Mo.morris_trajectories(20, 5, levels=levels, seed=0)
+    assert points.shape == (20, 6, 5)
+    delta = levels / (2.0 * (levels - 1))
+    grid = np.arange(levels) / (levels - 1)
+    for t in range(20):
+        assert sorted(moved[t]) == list(range(5))
+        np.testing.assert_allclose(np.abs(steps[t]), delta)
+        jumps = np.diff(points[t], axis=0)
+        for s in range(5):
+            expected = np.zeros(5)
+            expected[moved[t, s]] = steps[t, s]
+            np.testing.assert_allclose(jumps[s], expected)
+        # Every point stays on the grid of the unit box
+        assert np.all(np.min(np.abs(points[t][..., None] - grid), axis=-1) < 1e-12)
+
+
+def test_linear_function_effects_are_its_coefficients():
+    coefficients = np.array([3.0, -1.5, 0.0, 0.25])
+    points, moved, steps = Mo.morris_trajectories(10, 4, seed=1)
+    effects = Mo.elementary_effects(_outputs(lambda X: X @ coefficients, points),
+                                    moved, steps)
+    np.testing.assert_allclose(effects, np.tile(coefficients, (10, 1)),
+                               atol=1e-12)
+
+
+def test_nonlinear_function_effects():
+    # f = x0^2 + 2 x1 + x0 x2: the effect of x0 depends on x0 and x2,
+    # the one of x1 is constant, the one of x2 is x0
+    def function(X):
+        return X[:, 0] ** 2 + 2.0 * X[:, 1] + X[:, 0] * X[:, 2]
+
+    points, moved, steps = Mo.morris_trajectories(50, 3, seed=2)
+    effects = Mo.elementary_effects(_outputs(function, points), moved, steps)
+    np.testing.assert_allclose(effects[:, 1], 2.0)
+    assert np.std(effects[:, 0]) > 0.1
+    for t in range(50):
+        s = list(moved[t]).index(2)
+        np.testing.assert_allclose(effects[t, 2], points[t, s, 0])
@@ -0,0 +1,45 @@
+# test_sensitivity_Sobol.py
+"""
+Tests of the Saltelli design and Sobol estimators of sensitivity_Sobol on
+the Ishigami function, whose indices are known analytically.
+"""
+
+import numpy as np
+
+import sensitivity_Sobol as So
+
+# Ishigami function, a = 7, b = 0.1, inputs uniform on [-pi, pi]
+A_ISHIGAMI, B_ISHIGAMI = 7.0, 0.1
+S1_ISHIGAMI = [0.3139, 0.4424, 0.0]
+ST_ISHIGAMI = [0.5576, 0.4424, 0.2437]
+
+
+def ishigami(X):
+    x = -np.pi + 2.0 * np.pi * X
+    return (np.sin(x[:, 0]) + A_ISHIGAMI * np.sin(x[:, 1]) ** 2
+            + B_ISHIGAMI * x[:, 2] ** 4 * np.sin(x[:, 0]))
+
+
+def test_saltelli_matrix_layout():
+    A, B = So.saltelli_sample(8, 3, seed=0)
+    X = So.saltelli_matrix(A, B)
+    assert X.shape == (8 * 5, 3)
+    np.testing.assert_array_equal(X[:8], A)
+    np.testing.assert_array_equal(X[8:16], B)
+    for i in range(3):
+        AB = X[16 + 8 * i:24 + 8 * i]
+        np.testing.assert_array_equal(AB[:, i], B[:, i])
+        np.testing.assert_array_equal(np.delete(AB, i, axis=1),
+                                      np.delete(A, i, axis=1))
+
+
+def test_ishigami_indices():
+    n_base, dim = 2 ** 14, 3
+    A, B = So.saltelli_sample(n_base, dim, seed=0)
+    Y = ishigami(So.saltelli_matrix(A, B))
+    indices = So.analyse(Y, n_base, dim, n_bootstrap=100, seed=0)
+    np.testing.assert_allclose(indices["S1"], S1_ISHIGAMI, atol=0.03)
+    np.testing.assert_allclose(indices["ST"], ST_ISHIGAMI, atol=0.03)
+    # The confidence intervals bracket the estimates
+    assert np.all(indices["S1_conf"][:, 0] <= indices["S1"])
+    assert np.all(indices["S1"] <= indices["S1_conf"][:, 1])
@@ -0,0 +1,110 @@
+# test_spinup.py
+"""
+Tests of the spin-up states: restoring a saved state, and the cache key of
+cached_spinup.
+"""
+
+import copy
+
+import pytest
+
+import Environnement_def as Ev
+import Plant_def as Pl
+import forcing_store as Fs
+import global_constants as Gl
+import history_def as Hi
+import spinup as Sp
+import state_clone as Sc
+import time_loop as Ti
+
+
+@pytest.fixture
+def fresh_state(monkeypatch):
+    # Runs on clones of the global plant / environment / history
+    Pl.set_plant_species(Pl.Plant, "quercus_coccifera", Pl.species_db)
+    monkeypatch.setattr(Pl, "Plant", Sc.clone_plant(Pl.Plant))
+    monkeypatch.setattr(Ev, "Environment", Sc.clone_environment(Ev.Environment))
+    monkeypatch.setattr(Hi, "history", {key: [] for key in Hi.history})
+    monkeypatch.setattr(Gl, "count_ph", 0)
+    return Sc.clone_plant(Pl.Plant), Sc.clone_environment(Ev.Environment)
+
+
+def _reset(plant, env):
+    Pl.Plant.clear()
+    Pl.Plant.update(Sc.clone_plant(plant))
+    Ev.Environment.clear()
+    Ev.Environment.update(Sc.clone_environment(env))
+    Hi.clear_history(Hi.history)
+
+
+def test_restored_state_continues_like_an_uninterrupted_run(fresh_state, tmp_path):
+    plant, env = fresh_state
+    first, second = 24 * 100 + 7, 24 * 60
+    forcing = Fs.get_forcing(env, 0, first + second, directory=str(tmp_path))
+
+    Ti.run_simulation_collect_data(first + second, forcing)
+    expected = copy.deepcopy(Pl.Plant)
+    # Solver counters are per call of the loop
+    expected.pop("solver_stats")
+
+    _reset(plant, env)
+    Ti.run_simulation_collect_data(first, forcing)
+    path = str(tmp_path / "state.pkl")
+    Sp.save_state(path, Sp.current_state())
+
+    # Anything may happen in between: another run from scratch
+    _reset(plant, env)
+    Ti.run_simulation_collect_data(24 * 3, forcing)
+    Hi.clear_history(Hi.history)
+
+    Sp.restore_state(Sp.load_state(path))
+    assert Gl.count_ph == Ev.Environment["clock"]["count_ph"]
+    Ti.run_simulation_collect_data(second, forcing, resume=True)
+    Pl.Plant.pop("solver_stats")
+    assert Pl.Plant == expected
+
+
+def test_spinup_key_follows_the_setup(fresh_state, monkeypatch):
+    plant, env = fresh_state
+    key = Sp.spinup_key(plant, env, "synthetic-seed-0", max_years=2)
+    assert Sp.spinup_key(copy.deepcopy(plant), copy.deepcopy(env),
+                         "synthetic-seed-0", max_years=2) == key
+    # The loop clock is not part of the setup
+    assert Sp.spinup_key(plant, dict(env, clock={"sim_time": 5}),
+                         "synthetic-seed-0", max_years=2) == key
+
+    other_plant = dict(plant, T_optim=plant["T_optim"] + 1.0)
+    other_env = dict(env, base_temp=env["base_temp"] + 1.0)
+    assert Sp.spinup_key(other_plant, env, "synthetic-seed-0", max_years=2) != key
+    assert Sp.spinup_key(plant, other_env, "synthetic-seed-0", max_years=2) != key
+    assert Sp.spinup_key(plant, env, "synthetic-seed-1", max_years=2) != key
+    assert Sp.spinup_key(plant, env, "synthetic-seed-0", max_years=3) != key
+    monkeypatch.setattr(Gl, "leaf_temp_method", "linear")
+    assert Sp.spinup_key(plant, env, "synthetic-seed-0", max_years=2) != key
+
+
+def test_cached_spinup_reuses_the_saved_state(fresh_state, tmp_path, monkeypatch):
+    plant, env = fresh_state
+    runs = []
+    run_spinup = Sp.run_spinup
+
+    def counted(**options):
+        runs.append(options)
+        return run_spinup(**options)
+
+    monkeypatch.setattr(Sp, "run_spinup", counted)
+    directory = str(tmp_path / "cache")
+
+    first = Sp.cached_spinup(directory, seed=3, max_years=1)
+    first_plant = copy.deepcopy(Pl.Plant)
+    assert len(runs) == 1 and first["info"]["years"] == 1
+
+    _reset(plant, env)
+    again = Sp.cached_spinup(directory, seed=3, max_years=1)
+    assert len(runs) == 1
+    assert Pl.Plant == first_plant == again["Plant"]
+
+    # Another weather seed is another spin-up
+    _reset(plant, env)
+    Sp.cached_spinup(directory, seed=4, max_years=1)
+    assert len(runs) == 2
@@ -0,0 +1,94 @@
+# test_state_clone.py
+"""
+Tests of the state clones: a clone equals its original, and nothing done
+to a clone (writes, set_parameter, a whole run) reaches the original.
+"""
+
+import copy
+
+import numpy as np
+
+import Environnement_def as Ev
+import Plant_def as Pl
+import global_constants as Gl
+import history_def as Hi
+import optim_GA as Ga
+import state_clone as Sc
+import time_loop as Ti
+
+
+def _quercus():
+    Plant = copy.deepcopy(Pl.Plant)
+    Pl.set_plant_species(Plant, "quercus_coccifera", Pl.species_db)
+    return Plant
+
+
+def _mutable_paths(value, path=()):
+    # Every nested dictionary, list or array of a state
+    if isinstance(value, (dict, list, np.ndarray)):
+        yield path, value
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _mutable_paths(item, path + (key,))
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            yield from _mutable_paths(item, path + (i,))
+
+
+def test_clone_equals_original_and_shares_only_species_tables():
+    Plant = _quercus()
+    clone = Sc.clone_plant(Plant)
+    assert clone == Plant
+    for key in Sc.SHARED_PLANT_KEYS:
+        assert clone[key] is Plant[key]
+
+    original = dict(_mutable_paths(Plant))
+    for path, value in _mutable_paths(clone):
+        if path and path[0] in Sc.SHARED_PLANT_KEYS:
+            continue
+        assert value is not original[path], path
+
+
+def test_writes_to_a_clone_leave_the_original_untouched():
+    for state, clone_function in ((_quercus(), Sc.clone_plant),
+                                  (copy.deepcopy(Ev.Environment), Sc.clone_environment)):
+        expected = copy.deepcopy(state)
+        clone = clone_function(state)
+        for path, value in _mutable_paths(clone):
+            if path and path[0] in Sc.SHARED_PLANT_KEYS:
+                continue
+            if isinstance(value, dict):
+                value["__written__"] = 1.0
+            elif isinstance(value, list):
+                value.append(1.0)
+            else:
+                value += 1.0
+        assert state == expected
+
+
+def test_set_parameter_on_a_clone_copies_shared_tables():
+    Plant = _quercus()
+    expected = copy.deepcopy(Plant)
+    species = copy.deepcopy(Pl.species_db["quercus_coccifera"])
+    clone, env = Sc.clone_plant(Plant), Sc.clone_environment(Ev.Environment)
+
+    stage = next(iter(Plant["reserve_ratio_ps"]))
+    Ga.set_parameter(clone, env, "Plant.reserve_ratio_ps." + stage, 0.123)
+    Ga.set_parameter(clone, env, "Plant.cost_params.maintenance.sugar", 1.0)
+    assert clone["reserve_ratio_ps"][stage] == 0.123
+    assert Plant == expected
+    assert Pl.species_db["quercus_coccifera"] == species
+
+
+def test_run_on_clones_leaves_the_originals_untouched(monkeypatch):
+    Plant = _quercus()
+    Env = copy.deepcopy(Ev.Environment)
+    expected = copy.deepcopy(Plant), copy.deepcopy(Env)
+    monkeypatch.setattr(Pl, "Plant", Sc.clone_plant(Plant))
+    monkeypatch.setattr(Ev, "Environment", Sc.clone_environment(Env))
+    monkeypatch.setattr(Hi, "history", {key: [] for key in Hi.history})
+    monkeypatch.setattr(Gl, "count_ph", 0)
+
+    _, final_plant, _ = Ti.run_simulation_collect_data(24 * 120)
+    assert final_plant["phenology_stage"] != Plant["phenology_stage"]
+    assert (Plant, Env) == expected
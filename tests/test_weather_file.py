@@ -0,0 +1,51 @@
+# test_weather_file.py
+"""
+Tests of the weather-file forcing: units and alignment on the model calendar.
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import Environnement_def as Ev
+import weather_file as Wf
+
+
+def _write_record(path, start, n_hours):
+    # Temperature column = row number, to find which row is served
+    with open(path, "w") as f:
+        f.write("date,temperature,shortwave,precipitation,RH,wind\n")
+        for r in range(n_hours):
+            moment = start + timedelta(hours=r)
+            f.write(f"{moment.isoformat()},{r},100,0,50,2\n")
+
+
+def test_file_starting_in_june_follows_the_model_calendar(tmp_path):
+    path = str(tmp_path / "june.csv")
+    start = datetime(2023, 6, 1)
+    _write_record(path, start, Wf.HOURS_PER_YEAR + 500)
+    forcing = Wf.WeatherFileForcing(path, Ev.Environment, chunk_hours=1000,
+                                    time_column="date")
+    for i in (0, 23, 2000, 400):
+        r = int(forcing[i][0])
+        served = start + timedelta(hours=r)
+        assert Wf.hour_of_year(served.isoformat()) == i + 1
+    first = forcing[0]
+    assert first[1] == 100.0 and first[4] == 0.5 and first[5] == 2.0
+
+    # Same alignment from an explicit start hour and from the binary cache
+    by_hour = Wf.WeatherFileForcing(path, Ev.Environment,
+                                    start_hour=Wf.hour_of_year(start.isoformat()))
+    cached = Wf.cache_weather_file(path, Ev.Environment,
+                                   cache_dir=str(tmp_path / "cache"),
+                                   time_column="date")
+    for i in (0, 200):
+        np.testing.assert_array_equal(by_hour[i], forcing[i])
+        np.testing.assert_array_equal(cached[i], forcing[i])
+
+
+def test_file_without_start_begins_at_the_first_hour(tmp_path):
+    path = str(tmp_path / "plain.csv")
+    _write_record(path, datetime(2023, 6, 1), 48)
+    forcing = Wf.WeatherFileForcing(path, Ev.Environment)
+    assert forcing[0][0] == 0.0 and forcing[47][0] == 47.0
@@ -19,7 +19,7 @@ from datetime import datetime, timedelta
 
 
 
-def run_simulation_collect_data(max_cycles):
+def run_simulation_collect_data(max_cycles, forcing=None, resume=False):
     """
     Main simulation loop that runs up to 'max_cycles' hours.
 
@@ -31,30 +31,62 @@ def run_simulation_collect_data(max_cycles):
     ----------
     max_cycles : int
         Maximum number of simulation steps (hours) to be performed.
+    forcing : array-like, optional
+        Precomputed hourly forcing (e.g. from forcing_store.get_forcing, or a
+        weather record from weather_file), row sim_time - 1 holding hour
+        sim_time in Ev.FORCING_COLUMNS order. If None, the synthetic weather
+        is drawn on the fly.
+    resume : bool
+        If True, continue from the loop state saved in Environment["clock"]
+        by the previous run (simulated hour, daily minimum temperatures,
+        phenology counter) instead of starting a new run at hour 1: the soil
+        water is not re-initialised and 'max_cycles' more hours are run.
+        Used by spinup.py to run a simulation year by year.
 
     Returns
     -------
     tuple
         A tuple (history, Plant, Environment):
           - history : the dictionary tracking simulation variables over time
-          - Plant   : the final plant state at the end of simulation
+                      (what it holds depends on the recording profile set with
+                      Hi.set_recording_profile; daily aggregates go to Hi.daily)
+          - Plant   : the final plant state at the end of simulation; its
+                      "solver_stats" entry holds the leaf solver and search
+                      counters of the run per phenology stage (see
+                      Be.SOLVER_COUNTERS and Be.total_solver_stats)
           - Environment : the final state of environment
     """
-    # Local time counter (in hours)
-    sim_time = 0
-
     # Loop counter if needed (could be the same as sim_time)
     cycle_count = 0
 
-    # Initialize soil water content to 50% of the soil volume
-    Ev.Environment["soil"]["water"] = (
-        Ev.Environment["soil_volume"] * 1000.0 * 1000.0 * 0.01
-    )
-
-    # Track minimum daily temperatures
-    daily_min_temps = []
-    day_min_temp = float('inf')
-    previous_day_index = 0
+    # Solver and search counters of this run, per phenology stage
+    Pl.Plant["solver_stats"] = {}
+
+    clock = Ev.Environment.get("clock")
+    if resume and clock is not None:
+        # Continue the previous run where it stopped
+        sim_time = clock["sim_time"]
+        daily_min_temps = list(clock["daily_min_temps"])
+        day_min_temp = clock["day_min_temp"]
+        previous_day_index = clock["previous_day_index"]
+        Gl.count_ph = clock["count_ph"]
+    else:
+        # Local time counter (in hours)
+        sim_time = 0
+
+        # Phenology counter of a new run (a resumed run reads it from the
+        # clock)
+        Gl.count_ph = 0
+
+        # Initialize soil water content to 50% of the soil volume
+        Ev.Environment["soil"]["water"] = (
+            Ev.Environment["soil_volume"] * 1000.0 * 1000.0 * 0.01
+        )
+
+        # Track minimum daily temperatures
+        daily_min_temps = []
+        day_min_temp = float('inf')
+        previous_day_index = 0
 
     # Run the simulation loop until max_cycles or the plant dies
     while Pl.Plant["alive"] and cycle_count < max_cycles:
@@ -66,7 +98,10 @@ def run_simulation_collect_data(max_cycles):
         day_index = sim_time // Gl.ave_day
 
         # Update environment (temperature, light, rain, etc.)
-        Ev.update_environment(sim_time, Ev.Environment)
+        if forcing is None:
+            Ev.update_environment(sim_time, Ev.Environment)
+        else:
+            Ev.apply_forcing(Ev.Environment, forcing[sim_time - 1].tolist())
 
         # If we moved to a new day, reset the daily minimum temperature
         if day_index != previous_day_index:
@@ -110,6 +145,8 @@ def run_simulation_collect_data(max_cycles):
             # Reset stomatal conductance and leaf angle each day
             Pl.Plant["stomatal_conductance"] = 1.0
             Pl.Plant["leaf_angle"] = 0.0
+            # The warm-started leaf search restarts from the grid each day
+            Pl.Plant.pop("leaf_search", None)
             if sugar_slope < Gl.slope_thrs:
                 Fu.ajust_maintenance_cost(Pl.Plant, "bad")
             else:
@@ -151,7 +188,10 @@ def run_simulation_collect_data(max_cycles):
                 Ev.Environment,
                 alpha=1.0,
                 beta=1.0,
-                gamma=0.0
+                gamma=0.0,
+                steps=Gl.leaf_search_steps,
+                method=Gl.leaf_temp_method,
+                search=Gl.leaf_search
             )
 
         # 4) Soil nutrient absorption
@@ -208,5 +248,17 @@ def run_simulation_collect_data(max_cycles):
         if Pl.Plant["biomass_total"] <= 0.005:
             Pl.Plant["alive"] = False
 
+    # Close the online daily aggregates (last, possibly partial, day)
+    Hi.history_flush()
+
+    # Loop state, to resume the run later (resume=True)
+    Ev.Environment["clock"] = {
+        "sim_time": sim_time,
+        "daily_min_temps": list(daily_min_temps),
+        "day_min_temp": day_min_temp,
+        "previous_day_index": previous_day_index,
+        "count_ph": Gl.count_ph,
+    }
+
     # Return final results
     return Hi.history, Pl.Plant, Ev.Environment
@@ -0,0 +1,300 @@
+# weather_file.py
+"""
+Forcing backend driven by real hourly weather records (station CSV files).
+
+The file is read in chunks, converted into the Environment["atmos"] units
+and served hour by hour to the main loop (same row layout as the forcing
+store, Ev.FORCING_COLUMNS), so multi-decade records never have to be held
+in memory. An optional binary cache stores the parsed file as a ".npy"
+array that later runs open memory mapped, skipping the parsing.
+
+Expected input: one row per hour, in chronological order, with a header.
+Extra columns (station id, ...) are ignored.
+
+The model calendar starts on January 1st: hour sim_time falls on day
+(sim_time // 24) % 365 of the synthetic seasons and of the photoperiod. A
+file starting on another date is aligned on that calendar: its start is
+read from a timestamp column (time_column) or given as start_hour, and the
+leading rows up to the next January 1st, 01:00 are skipped, so that row
+dates and model days agree. The model year has 365 days: over a record
+with leap years the alignment drifts by one day every fourth year.
+
+All comments in English, while variable/function names follow the project.
+"""
+
+import csv
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+
+import Environnement_def as Ev
+import forcing_store as Fs
+import global_constants as Gl
+
+# Default CSV column names for each forcing variable
+DEFAULT_COLUMNS = {
+    "temperature": "temperature",
+    "shortwave": "shortwave",
+    "precipitation": "precipitation",
+    "RH": "RH",
+    "wind": "wind",
+    "co2": "co2",
+}
+
+# Default units of the CSV columns
+DEFAULT_UNITS = {
+    "temperature": "C",      # "C" or "K"
+    "shortwave": "W/m2",     # "W/m2" (hourly mean), "J/m2" or "MJ/m2" (hourly sum)
+    "precipitation": "mm",   # "mm" or "m" per hour
+    "RH": "%",               # "%" or "fraction"
+    "wind": "m/s",           # "m/s" or "km/h"
+}
+
+# Hours of a model year
+HOURS_PER_YEAR = 365 * Gl.ave_day
+
+# Conversion of each unit to the model unit: value * scale + offset
+_CONVERSIONS = {
+    "temperature": {"C": (1.0, 0.0), "K": (1.0, -273.15)},
+    "shortwave": {"W/m2": (1.0, 0.0), "J/m2": (1.0 / 3600.0, 0.0),
+                  "MJ/m2": (1e6 / 3600.0, 0.0)},
+    "precipitation": {"mm": (1.0, 0.0), "m": (1000.0, 0.0)},
+    "RH": {"%": (0.01, 0.0), "fraction": (1.0, 0.0)},
+    "wind": {"m/s": (1.0, 0.0), "km/h": (1.0 / 3.6, 0.0)},
+}
+
+
+def read_weather_chunks(path, Env, chunk_hours=24 * 365, columns=None,
+                        units=None, co2=400.0):
+    """
+    Streams a weather CSV file as forcing arrays of at most 'chunk_hours' rows.
+
+    Parameters
+    ----------
+    path : str
+        CSV file, one row per hour.
+    Env : dict
+        Environment dictionary; its "soil_volume" converts rain depth (mm)
+        into grams of water, as the synthetic rain model does.
+    chunk_hours : int
+        Number of hours parsed at a time.
+    columns : dict, optional
+        CSV column name of each variable (overrides DEFAULT_COLUMNS).
+    units : dict, optional
+        Units of the CSV columns (overrides DEFAULT_UNITS).
+    co2 : float
+        CO2 (ppm) used when the file has no CO2 column.
+
+    Yields
+    ------
+    np.ndarray
+        Arrays of shape (k, len(Ev.FORCING_COLUMNS)).
+
+    Notes
+    -----
+    Empty or unparsable fields repeat the previous hour's value
+    (precipitation falls back to 0).
+    """
+    columns = dict(DEFAULT_COLUMNS, **(columns or {}))
+    units = dict(DEFAULT_UNITS, **(units or {}))
+    conv = {var: _CONVERSIONS[var][units[var]] for var in _CONVERSIONS}
+    rain_to_grams = 1000.0 * Env["soil_volume"]
+
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = [name.strip() for name in next(reader)]
+        index = {}
+        for var, name in columns.items():
+            if name in header:
+                index[var] = header.index(name)
+            elif var != "co2":
+                raise ValueError(f"Column '{name}' ({var}) not found in {path}")
+
+        # Previous values, used to fill gaps
+        last = {"temperature": Env["atmos"]["temperature"], "shortwave": 0.0,
+                "precipitation": 0.0, "RH": Env["atmos"]["RH"],
+                "wind": Env["atmos"]["wind"], "co2": co2}
+
+        chunk = np.empty((chunk_hours, len(Ev.FORCING_COLUMNS)))
+        n = 0
+        for row in reader:
+            if not row:
+                continue
+            values = {}
+            for var, col in index.items():
+                try:
+                    raw = float(row[col])
+                except (ValueError, IndexError):
+                    values[var] = 0.0 if var == "precipitation" else last[var]
+                    continue
+                if var == "co2":
+                    values[var] = raw
+                else:
+                    scale, offset = conv[var]
+                    values[var] = raw * scale + offset
+            values.setdefault("co2", co2)
+            last.update(values)
+
+            chunk[n] = (values["temperature"],
+                        max(0.0, values["shortwave"]),
+                        max(0.0, values["precipitation"]) * rain_to_grams,
+                        values["co2"],
+                        min(1.0, max(0.0, values["RH"])),
+                        max(0.0, values["wind"]))
+            n += 1
+            if n == chunk_hours:
+                yield chunk
+                chunk = np.empty_like(chunk)
+                n = 0
+        if n > 0:
+            yield chunk[:n]
+
+
+def hour_of_year(timestamp):
+    """
+    Hour of the year (0 = January 1st, 00:00) of an ISO 8601 timestamp.
+    """
+    moment = datetime.fromisoformat(timestamp.strip())
+    return (moment.timetuple().tm_yday - 1) * Gl.ave_day + moment.hour
+
+
+def file_start_hour(path, time_column):
+    """
+    Hour of the year of the first record of a weather file, read from its
+    timestamp column.
+    """
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = [name.strip() for name in next(reader)]
+        if time_column not in header:
+            raise ValueError(f"Column '{time_column}' (time) not found in {path}")
+        for row in reader:
+            if row:
+                return hour_of_year(row[header.index(time_column)])
+    raise ValueError(f"{path} holds no record")
+
+
+def calendar_offset(path, start_hour=None, time_column=None):
+    """
+    Number of leading rows of a weather file to skip so that its rows fall
+    on the model calendar (row 0 of the result at sim_time = 1, i.e.
+    January 1st, 01:00).
+
+    Parameters
+    ----------
+    start_hour : int, optional
+        Hour of the year of the first row (0 = January 1st, 00:00).
+    time_column : str, optional
+        Timestamp column (ISO 8601) giving the start when start_hour is None.
+        Without either, the file is taken to start at sim_time = 1.
+    """
+    if start_hour is None:
+        if time_column is None:
+            return 0
+        start_hour = file_start_hour(path, time_column)
+    return (1 - start_hour) % HOURS_PER_YEAR
+
+
+class WeatherFileForcing:
+    """
+    Hour-indexed view of a weather file for run_simulation_collect_data
+    (forcing argument): forcing[i] returns the record of hour i + 1 of the
+    model calendar (see calendar_offset) while only one chunk of the file
+    is held in memory. Access is expected to be sequential; going backwards
+    restarts the reading from the top of the file.
+    """
+
+    def __init__(self, path, Env, chunk_hours=24 * 365, start_hour=None,
+                 time_column=None, **kwargs):
+        self.path = path
+        self.Env = Env
+        self.chunk_hours = chunk_hours
+        self.kwargs = kwargs
+        self.offset = calendar_offset(path, start_hour, time_column)
+        self._restart()
+
+    def _restart(self):
+        self._chunks = read_weather_chunks(self.path, self.Env,
+                                           self.chunk_hours, **self.kwargs)
+        self._chunk = np.empty((0, len(Ev.FORCING_COLUMNS)))
+        self._start = 0
+
+    def __getitem__(self, i):
+        i += self.offset
+        if i < self._start:
+            self._restart()
+        while i >= self._start + len(self._chunk):
+            self._start += len(self._chunk)
+            try:
+                self._chunk = next(self._chunks)
+            except StopIteration:
+                raise IndexError(f"{self.path} holds only "
+                                 f"{self._start - self.offset} hours from "
+                                 f"the start of the model calendar")
+        return self._chunk[i - self._start]
+
+
+def cache_weather_file(path, Env, cache_dir=None, chunk_hours=24 * 365,
+                       start_hour=None, time_column=None, **kwargs):
+    """
+    Returns the parsed weather file as a read-only memory-mapped forcing
+    array aligned on the model calendar, parsing it only the first time.
+
+    The cache file is keyed by the CSV path, size and modification time, the
+    conversion options and the soil volume; it is filled chunk by chunk, so
+    memory use stays bounded even for very long records.
+
+    Parameters
+    ----------
+    path : str
+        CSV file.
+    Env : dict
+        Environment dictionary (see read_weather_chunks).
+    cache_dir : str, optional
+        Cache directory (default: the forcing store directory).
+    start_hour, time_column :
+        Start of the record (see calendar_offset); the leading rows before
+        the model calendar are left out of the returned view, not of the
+        cache.
+    **kwargs
+        columns, units, co2 (see read_weather_chunks).
+
+    Returns
+    -------
+    np.memmap
+    """
+    offset = calendar_offset(path, start_hour, time_column)
+    cache_dir = cache_dir or Fs.FORCING_DIR
+    stat = os.stat(path)
+    content = {
+        "file": os.path.abspath(path),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "soil_volume": Env["soil_volume"],
+        "options": kwargs,
+    }
+    key = hashlib.sha1(json.dumps(content, sort_keys=True).encode()).hexdigest()[:16]
+    cache_path = os.path.join(cache_dir, f"weather_{key}.npy")
+    if os.path.exists(cache_path):
+        return np.load(cache_path, mmap_mode="r")[offset:]
+
+    # First pass: count the hours, to size the output file
+    with open(path, newline="") as f:
+        n_hours = sum(1 for row in csv.reader(f) if row) - 1
+
+    # Second pass: parse and write chunk by chunk
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float64,
+                                    shape=(n_hours, len(Ev.FORCING_COLUMNS)))
+    start = 0
+    for chunk in read_weather_chunks(path, Env, chunk_hours, **kwargs):
+        out[start:start + len(chunk)] = chunk
+        start += len(chunk)
+    out.flush()
+    del out
+    os.replace(tmp_path, cache_path)
+    return np.load(cache_path, mmap_mode="r")[offset:]